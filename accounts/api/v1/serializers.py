@@ -3,7 +3,7 @@ from rest_framework import serializers
 from accounts.api.v1.utils import generate_code
 from accounts.models import EmailConfirmation, StaffMembers, Supplier, User
 from marketplace import settings
-from marketplace.choices import ConfirmationType, TypeEmailMessage
+from marketplace.choices import ConfirmationType, TokenType, TypeEmailMessage
 from marketplace.errors import SendException
 
 
@@ -96,6 +96,11 @@ class CredentialsSerializer(serializers.Serializer):
         trim_whitespace=False,
         write_only=True,
     )
+    token_type = serializers.ChoiceField(
+        choices=TokenType.choices,
+        default=TokenType.TOKEN,
+        write_only=True,
+    )
 
     def validate(self, attrs):
         email = attrs.get("email")
@@ -111,6 +116,10 @@ class CredentialsSerializer(serializers.Serializer):
         return attrs
 
 
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True)
+
+
 class RestorePasswordSerializer(serializers.Serializer):
     email = serializers.EmailField(required=True, allow_blank=False, allow_null=False)
 
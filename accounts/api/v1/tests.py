@@ -1,19 +1,40 @@
 from unittest import mock
 
 from _decimal import Decimal
+from django.core.cache import cache
 from django.urls import reverse
-from rest_framework import status
-from rest_framework.test import APIClient, APITestCase
+from rest_framework import exceptions, status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 
 from accounts.api.v1.serializers import StaffMembersSerializers, SupplierSerializers
+from accounts.authentication import (
+    TOKEN_USER_KEY,
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+    get_token_cache_stats,
+    reset_token_cache_stats,
+)
 from accounts.models import (
     EmailConfirmation,
     LoginHistory,
+    RefreshToken,
     StaffMembers,
     Supplier,
     User,
 )
+from accounts.permissions import (
+    IsDeliveryPointWorker,
+    IsManager,
+    IsSupplier,
+    IsSupport,
+    IsWarehouseWorker,
+)
+from accounts.roles import get_roles
+from accounts.utils import token_digest
 from marketplace.choices import ConfirmationType, PositionsStatus
+from marketplace.testing import clear_redis
+from marketplace.throttling import SlidingWindowThrottle
 
 
 class AccountsTestCase(APITestCase):
@@ -25,8 +46,12 @@ class AccountsTestCase(APITestCase):
     supplier_create = reverse("supplier_create")
     staff_members = reverse("staff_members")
     staff_members_create = reverse("staff_members_create")
+    token_refresh = reverse("token_refresh")
+    token_revoke = reverse("token_revoke")
 
     def setUp(self) -> None:
+        clear_redis()
+        self.addCleanup(clear_redis)
         self.client = APIClient()
         self.user = User.objects.create(
             first_name="test",
@@ -165,6 +190,8 @@ class AccountsTestCase(APITestCase):
             self.assertEqual(EmailConfirmation.objects.count(), 4)
 
     def test_user_recovery(self):
+        user = User.objects.get(email=self.confirmation3.email)
+        sessions = [RefreshToken.objects.issue(user) for _ in range(2)]
         with mock.patch("accounts.models.EmailConfirmation.create_confirmation"):
             response = self.client.patch(
                 reverse("user_recovery", kwargs={"code": self.confirmation3.code}),
@@ -177,6 +204,10 @@ class AccountsTestCase(APITestCase):
                 data={"email": self.confirmation3.email, "password": "Test123"},
             )
             self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # A password reset signs every session out.
+        for refresh in sessions:
+            response = self.client.post(self.token_refresh, data={"refresh": refresh})
+            self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
     def test_supplier_list(self):
         response = self.client.get(self.supplier_list)
@@ -273,3 +304,167 @@ class AccountsTestCase(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(StaffMembers.objects.count(), 0)
+
+    def permission_request(self):
+        # A fresh user object, as authentication builds one per request.
+        request = APIRequestFactory().get("/")
+        request.user = User.objects.get(pk=self.user.pk)
+        return request
+
+    def test_roles_cached(self):
+        get_roles(User.objects.get(pk=self.user.pk))
+        request = self.permission_request()
+        permission = (IsManager | IsWarehouseWorker | IsDeliveryPointWorker)()
+        with self.assertNumQueries(0):
+            self.assertTrue(permission.has_permission(request, None))
+            self.assertTrue(IsSupplier().has_permission(request, None))
+        self.assertEqual(
+            get_roles(request.user).suppliers,
+            {self.supplier1.id, self.supplier2.id},
+        )
+
+    def test_roles_invalidated(self):
+        self.assertTrue(IsManager().has_permission(self.permission_request(), None))
+        self.staff_members_user.job_title = PositionsStatus.SUPPORT
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff_members_user.save()
+            # Not bumped until the change commits.
+            request = self.permission_request()
+            self.assertTrue(IsManager().has_permission(request, None))
+        request = self.permission_request()
+        self.assertFalse(IsManager().has_permission(request, None))
+        self.assertTrue(IsSupport().has_permission(request, None))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Supplier.objects.filter(user=self.user).delete()
+        self.assertFalse(IsSupplier().has_permission(self.permission_request(), None))
+
+    def test_inactive_user_denied(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertFalse(IsManager().has_permission(self.permission_request(), None))
+
+    def test_token_authentication_cached(self):
+        reset_token_cache_stats()
+        token = Token.objects.create(user=self.user)
+        authentication = CachedTokenAuthentication()
+        user, key = authentication.authenticate_credentials(token.key)
+        self.assertEqual(
+            (user.pk, user.email, key), (self.user.pk, self.user.email, token.key)
+        )
+        with self.assertNumQueries(0):
+            authentication.authenticate_credentials(token.key)
+        self.assertEqual(
+            get_token_cache_stats(),
+            {"local_hits": 1, "hits": 0, "misses": 1, "hit_rate": 0.5},
+        )
+
+        response = APIClient().get(
+            self.supplier_list, HTTP_AUTHORIZATION=f"Token {token.key}"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_token_authentication_invalidated(self):
+        key = Token.objects.create(user=self.user).key
+        authentication = CachedTokenAuthentication()
+        authentication.authenticate_credentials(key)
+
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            authentication.authenticate_credentials(key)
+
+        self.user.is_active = True
+        self.user.save()
+        authentication.authenticate_credentials(key)
+        stale = cache.get(TOKEN_USER_KEY.format(digest=token_digest(key)))
+        with self.captureOnCommitCallbacks(execute=True):
+            Token.objects.get(key=key).delete()
+            # A request that read the token before the delete committed.
+            cache.set(TOKEN_USER_KEY.format(digest=token_digest(key)), stale)
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            authentication.authenticate_credentials(key)
+
+    def test_sign_in_signed_tokens(self):
+        self.user.set_password("Wwe123qwe1")
+        self.user.save()
+        response = self.client.post(
+            self.sign_in,
+            data={
+                "email": self.user.email,
+                "password": "Wwe123qwe1",
+                "token_type": "signed",
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data), {"access", "refresh", "expires_in"})
+
+        request = APIRequestFactory().get(
+            "/", HTTP_AUTHORIZATION=f"Bearer {response.data['access']}"
+        )
+        with self.assertNumQueries(0):
+            user, _ = SignedTokenAuthentication().authenticate(request)
+            request.user = user
+            self.assertTrue(IsManager().has_permission(request, None))
+            self.assertTrue(IsSupplier().has_permission(request, None))
+        self.assertEqual(user.pk, self.user.pk)
+
+        response = APIClient().get(
+            self.supplier_list,
+            HTTP_AUTHORIZATION=f"Bearer {response.data['access']}",
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = APIClient().get(
+            self.supplier_list, HTTP_AUTHORIZATION="Bearer forged"
+        )
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_rotation(self):
+        first = RefreshToken.objects.issue(self.user)
+        response = self.client.post(self.token_refresh, data={"refresh": first})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        second = response.data["refresh"]
+        self.assertNotEqual(first, second)
+
+        # Reusing a rotated token revokes the whole family.
+        response = self.client.post(self.token_refresh, data={"refresh": first})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.post(self.token_refresh, data={"refresh": second})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        third = RefreshToken.objects.issue(self.user)
+        response = self.client.post(self.token_revoke, data={"refresh": third})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.post(self.token_refresh, data={"refresh": third})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_sign_in_throttled(self):
+        rates = {"sign_in_ip": "4/min", "sign_in_email": "2/min"}
+        wrong = {"email": self.user.email, "password": "wrong"}
+        with mock.patch.dict(SlidingWindowThrottle.THROTTLE_RATES, rates):
+            for _ in range(2):
+                response = self.client.post(self.sign_in, data=wrong)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            with mock.patch.object(User, "check_password") as check_password:
+                response = self.client.post(self.sign_in, data=wrong)
+                self.assertEqual(
+                    response.status_code, status.HTTP_429_TOO_MANY_REQUESTS
+                )
+                check_password.assert_not_called()
+
+            # Another email still has budget, until the address runs out.
+            other = {"email": "other@gmail.com", "password": "wrong"}
+            response = self.client.post(self.sign_in, data=other)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.client.post(self.sign_in, data=other)
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_user_recovery_throttled(self):
+        url = reverse("user_recovery", kwargs={"code": self.confirmation3.code})
+        mismatch = {"password": "Test123", "password_confirmation": "Test321"}
+        rates = {"restore_password_confirm_ip": "2/min"}
+        with mock.patch.dict(SlidingWindowThrottle.THROTTLE_RATES, rates):
+            for _ in range(2):
+                response = self.client.patch(url, data=mismatch)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.client.patch(url, data=mismatch)
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
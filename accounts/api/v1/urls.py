@@ -12,6 +12,8 @@ from accounts.api.v1.views import (
     SupplierApiView,
     SupplierCreateApiView,
     SupplierRetrieveApiView,
+    TokenRefreshView,
+    TokenRevokeView,
 )
 
 urlpatterns = [
@@ -22,6 +24,8 @@ urlpatterns = [
         name="sms_confirmation",
     ),
     path("sign-in/", SignInView.as_view(), name="sign-in"),
+    path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("token/revoke/", TokenRevokeView.as_view(), name="token_revoke"),
     path("restore_password/", RestorePasswordView.as_view(), name="restore_password"),
     path(
         "user_recovery/<int:code>/",
@@ -12,6 +12,7 @@ from rest_framework.response import Response
 from accounts.api.v1.serializers import (
     CredentialsSerializer,
     EmailConfirmationCreateSerializer,
+    RefreshTokenSerializer,
     RestorePasswordConfirmSerializer,
     RestorePasswordSerializer,
     SignUpSerializer,
@@ -22,13 +23,16 @@ from accounts.api.v1.utils import generate_code
 from accounts.models import (
     EmailConfirmation,
     LoginHistory,
+    RefreshToken,
     StaffMembers,
     Supplier,
     User,
 )
 from accounts.permissions import IsHeadOfWarehouse, IsManager
-from marketplace.choices import TypeEmailMessage
+from accounts.tokens import issue_tokens
+from marketplace.choices import TokenType, TypeEmailMessage
 from marketplace.errors import SendException
+from marketplace.throttling import ClientIPThrottle, EmailThrottle
 
 
 class SignUpView(CreateAPIView):
@@ -37,6 +41,8 @@ class SignUpView(CreateAPIView):
 
 class SignUpConfirmationCreateView(CreateAPIView, UpdateAPIView):
     serializer_class = EmailConfirmationCreateSerializer
+    throttle_classes = [ClientIPThrottle, EmailThrottle]
+    throttle_scope = "sign_up_confirmation"
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -60,14 +66,15 @@ class SignUpConfirmationCreateView(CreateAPIView, UpdateAPIView):
 
 class SignInView(CreateAPIView, UpdateAPIView):
     serializer_class = CredentialsSerializer
+    throttle_classes = [ClientIPThrottle, EmailThrottle]
+    throttle_scope = "sign_in"
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = User.objects.get(email=request.data.get("email"))
         if not user.email_2fa:
-            token, _ = Token.objects.get_or_create(user=user)
-            return Response({"token": token.key}, status=status.HTTP_200_OK)
+            return self.token_response(user, serializer.validated_data["token_type"])
         else:
             try:
                 code = generate_code()
@@ -92,21 +99,62 @@ class SignInView(CreateAPIView, UpdateAPIView):
                 return Response(
                     {"error": "user_is_not_active"}, status.HTTP_400_BAD_REQUEST
                 )
-            token, _ = Token.objects.get_or_create(user=user)
+            token_type = self.request.data.get("token_type", TokenType.TOKEN)
+            if token_type not in TokenType.values:
+                return Response(
+                    {"error": "token_type_is_not_valid"}, status.HTTP_400_BAD_REQUEST
+                )
             LoginHistory.objects.create_history(request=request, user=user)
-            return Response({"token": token.key}, status=status.HTTP_200_OK)
+            return self.token_response(user, token_type)
         except EmailConfirmation.DoesNotExist:
             return Response({"error": "code_is_not_valid"}, status.HTTP_400_BAD_REQUEST)
         except User.DoesNotExist:
             return Response({"error": "user_is_not_found"}, status.HTTP_400_BAD_REQUEST)
 
+    @staticmethod
+    def token_response(user, token_type):
+        if token_type == TokenType.SIGNED:
+            return Response(issue_tokens(user), status=status.HTTP_200_OK)
+        token, _ = Token.objects.get_or_create(user=user)
+        return Response({"token": token.key}, status=status.HTTP_200_OK)
+
+
+class TokenRefreshView(CreateAPIView):
+    serializer_class = RefreshTokenSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        rotated = RefreshToken.objects.rotate(serializer.validated_data["refresh"])
+        if rotated is None:
+            return Response(
+                {"error": "refresh_token_is_not_valid"}, status.HTTP_401_UNAUTHORIZED
+            )
+        user, refresh = rotated
+        return Response(issue_tokens(user, refresh), status=status.HTTP_200_OK)
+
+
+class TokenRevokeView(CreateAPIView):
+    serializer_class = RefreshTokenSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        RefreshToken.objects.revoke(serializer.validated_data["refresh"])
+        return Response({})
+
 
 class RestorePasswordView(CreateAPIView):
     serializer_class = RestorePasswordSerializer
+    throttle_classes = [ClientIPThrottle, EmailThrottle]
+    throttle_scope = "restore_password"
 
 
 class RestorePasswordConfirmView(UpdateAPIView):
     serializer_class = RestorePasswordConfirmSerializer
+    # The code is short; without a budget it can be guessed.
+    throttle_classes = [ClientIPThrottle]
+    throttle_scope = "restore_password_confirm"
 
     def get_object(self):
         return EmailConfirmation.objects.get(code=self.kwargs["code"])
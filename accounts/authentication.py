@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from accounts.models import User
+from accounts.roles import Roles
+from accounts.tokens import read_access_token
+from accounts.utils import token_digest
+from marketplace import settings
+from marketplace.cache import count
+
+TOKEN_USER_KEY = "auth:token:{digest}"
+TOKEN_STATS = "auth:token"
+TOKEN_REDIS_HITS = f"{TOKEN_STATS}:hits"
+TOKEN_MISSES = f"{TOKEN_STATS}:misses"
+# Everything the permission classes read; other fields load lazily if used.
+# Kept in model field order, which is the order ``Model.from_db`` expects.
+USER_FIELDS = ("id", "is_superuser", "email", "is_active", "role", "is_staff")
+
+
+class LocalCache:
+    """Small per-process LRU whose entries expire after ``timeout`` seconds."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+
+
+local_tokens = LocalCache(
+    maxsize=settings.TOKEN_CACHE_LOCAL_SIZE, timeout=settings.TOKEN_CACHE_LOCAL_TTL
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` that resolves a token to its user from a local
+    LRU, then Redis, and only then from the Token and User tables.
+
+    Deleting a token or saving its user drops the Redis entry; other
+    processes may keep their local copy for ``TOKEN_CACHE_LOCAL_TTL`` seconds.
+    """
+
+    def authenticate_credentials(self, key):
+        digest = token_digest(key)
+        values = local_tokens.get(digest)
+        if values is None:
+            values = cache.get(TOKEN_USER_KEY.format(digest=digest))
+            if values is None:
+                count(TOKEN_MISSES)
+                values = self.load_user_values(key)
+                cache.set(
+                    TOKEN_USER_KEY.format(digest=digest),
+                    values,
+                    settings.TOKEN_CACHE_TTL,
+                )
+            else:
+                count(TOKEN_REDIS_HITS)
+            local_tokens.set(digest, values)
+
+        user = User.from_db(DEFAULT_DB_ALIAS, USER_FIELDS, values)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        return user, key
+
+    @staticmethod
+    def load_user_values(key):
+        values = (
+            Token.objects.filter(key=key)
+            .values_list(*(f"user__{field}" for field in USER_FIELDS))
+            .first()
+        )
+        if values is None:
+            raise exceptions.AuthenticationFailed("Invalid token.")
+        return values
+
+
+class SignedTokenAuthentication(TokenAuthentication):
+    """
+    Authenticates ``Authorization: Bearer <access token>`` from the signed
+    claims alone; the user and its roles are rebuilt without any lookup.
+    """
+
+    keyword = "Bearer"
+
+    def authenticate_credentials(self, key):
+        claims = read_access_token(key)
+        if claims is None:
+            raise exceptions.AuthenticationFailed("Invalid or expired token.")
+        user = User.from_db(
+            DEFAULT_DB_ALIAS, USER_FIELDS, [claims[field] for field in USER_FIELDS]
+        )
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed("User inactive or deleted.")
+        user._roles = Roles(*(frozenset(claims[field]) for field in Roles._fields))
+        return user, key
+
+
+def invalidate_token(key):
+    digest = token_digest(key)
+
+    def delete():
+        local_tokens.delete(digest)
+        cache.delete(TOKEN_USER_KEY.format(digest=digest))
+
+    delete()
+    # A concurrent request may have cached the old row before the write committed.
+    transaction.on_commit(delete)
+
+
+def get_token_cache_stats():
+    # Local hits are counted per process, Redis hits and misses globally.
+    stats = cache.get_many([TOKEN_REDIS_HITS, TOKEN_MISSES])
+    local_hits = local_tokens.hits
+    hits = stats.get(TOKEN_REDIS_HITS, 0)
+    misses = stats.get(TOKEN_MISSES, 0)
+    total = local_hits + hits + misses
+    return {
+        "local_hits": local_hits,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": (local_hits + hits) / total if total else 0,
+    }
+
+
+def reset_token_cache_stats():
+    local_tokens.clear()
+    cache.delete_many([TOKEN_REDIS_HITS, TOKEN_MISSES])
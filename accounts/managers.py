@@ -1,8 +1,15 @@
+import secrets
+from datetime import timedelta
+from uuid import uuid4
+
 from django.contrib.auth.base_user import BaseUserManager
+from django.db import transaction
 from django.db.models import Manager
+from django.utils import timezone
 from rest_framework.request import Request
 
-from accounts.utils import get_client_ip
+from accounts.utils import get_client_ip, token_digest
+from marketplace import settings
 
 
 class UserManager(BaseUserManager):
@@ -48,3 +55,63 @@ class LoginHistoryManager(Manager):
             agent=request.headers.get("User-Agent"),
             ip=get_client_ip(request),
         )
+
+
+class RefreshTokenManager(Manager):
+    def issue(self, user, family=None):
+        """Store a new refresh token for ``user`` and return its raw value."""
+        token = secrets.token_urlsafe(32)
+        self.create(
+            user=user,
+            digest=token_digest(token),
+            family=family or uuid4(),
+            expires_at=timezone.now() + timedelta(seconds=settings.REFRESH_TOKEN_TTL),
+        )
+        return token
+
+    def rotate(self, token):
+        """
+        Revoke ``token`` and issue the next token of its family.
+
+        Returns ``(user, new_token)``, or None when ``token`` is unknown,
+        expired or revoked. A revoked token coming back means it was copied,
+        so the whole family is revoked with it.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            refresh = (
+                self.select_for_update()
+                .select_related("user")
+                .filter(digest=token_digest(token))
+                .first()
+            )
+            if refresh is None or refresh.expires_at <= now:
+                return None
+            if refresh.revoked_at is not None:
+                self.revoke_family(refresh.family)
+                return None
+            if not refresh.user.is_active:
+                return None
+            refresh.revoked_at = now
+            refresh.save(update_fields=["revoked_at"])
+            return refresh.user, self.issue(refresh.user, refresh.family)
+
+    def revoke(self, token):
+        """Revoke the family of ``token``, i.e. sign its session out."""
+        family = (
+            self.filter(digest=token_digest(token))
+            .values_list("family", flat=True)
+            .first()
+        )
+        return self.revoke_family(family) if family else 0
+
+    def revoke_family(self, family):
+        return self.filter(family=family, revoked_at__isnull=True).update(
+            revoked_at=timezone.now()
+        )
+
+    def revoke_user(self, user):
+        """Revoke every family of ``user``, i.e. sign out all its sessions."""
+        return self.filter(user=user, revoked_at__isnull=True).update(
+            revoked_at=timezone.now()
+        )
@@ -2,9 +2,9 @@ from uuid import uuid4
 
 from django.contrib.auth.base_user import AbstractBaseUser
 from django.contrib.auth.models import PermissionsMixin
-from django.db import models
+from django.db import models, transaction
 
-from accounts.managers import LoginHistoryManager, UserManager
+from accounts.managers import LoginHistoryManager, RefreshTokenManager, UserManager
 from accounts.tasks import send_simple_code
 from marketplace.choices import ConfirmationType, PositionsStatus, Role
 from marketplace.errors import SendException
@@ -48,8 +48,11 @@ class User(AbstractBaseUser, PermissionsMixin):
     objects = UserManager()
 
     def update_password(self, password):
-        self.set_password(password)
-        self.save()
+        # Sessions signed in with the old password end with it.
+        with transaction.atomic():
+            self.set_password(password)
+            self.save()
+            RefreshToken.objects.revoke_user(self)
 
     class Meta:
         verbose_name = "user"
@@ -124,3 +127,26 @@ class StaffMembers(CreatedUpdatedModel):
     job_title = models.CharField(
         choices=PositionsStatus.choices, default=PositionsStatus.SUPPORT, max_length=256
     )
+
+
+class RefreshToken(models.Model):
+    """
+    Refresh token of a signed-token session; only its sha256 is stored.
+
+    Tokens issued from one sign-in share a ``family``. Refreshing revokes
+    the token used and issues the next one of the family; revoked rows are
+    the revocation list and stay until they expire.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    digest = models.CharField(max_length=64, unique=True)
+    family = models.UUIDField(db_index=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = RefreshTokenManager()
+
+    class Meta:
+        verbose_name = "refresh_token"
+        verbose_name_plural = "refresh_tokens"
@@ -1,76 +1,47 @@
 from rest_framework.permissions import IsAuthenticated
 
-from accounts.models import StaffMembers, Supplier
+from accounts.roles import get_roles
 from marketplace.choices import PositionsStatus
 
 
 class IsActive(IsAuthenticated):
     def has_permission(self, request, view):
-        user = request.user
-        return not super().has_permission(request, view) and not user.is_active
+        return super().has_permission(request, view) and request.user.is_active
 
 
-class IsSupport(IsActive):
-    def has_permission(self, request, view):
-        if not super().has_permission(request, view):
-            return False
-        return StaffMembers.objects.filter(
-            user=request.user,
-            job_title__in=[PositionsStatus.SUPPORT, PositionsStatus.SUPER_USER],
-        ).exists()
+class HasJobTitle(IsActive):
+    """Active staff member holding one of ``job_titles``."""
 
+    job_titles = ()
 
-class IsManager(IsActive):
     def has_permission(self, request, view):
         if not super().has_permission(request, view):
             return False
-        return StaffMembers.objects.filter(
-            user=request.user,
-            job_title__in=[PositionsStatus.MANAGER, PositionsStatus.SUPER_USER],
-        ).exists()
+        return not get_roles(request.user).job_titles.isdisjoint(self.job_titles)
 
 
-class IsWarehouseWorker(IsActive):
-    def has_permission(self, request, view):
-        if not super().has_permission(request, view):
-            return False
-        return StaffMembers.objects.filter(
-            user=request.user,
-            job_title__in=[
-                PositionsStatus.WAREHOUSE_WORKER,
-                PositionsStatus.SUPER_USER,
-            ],
-        ).exists()
+class IsSupport(HasJobTitle):
+    job_titles = (PositionsStatus.SUPPORT, PositionsStatus.SUPER_USER)
 
 
-class IsHeadOfWarehouse(IsActive):
-    def has_permission(self, request, view):
-        if not super().has_permission(request, view):
-            return False
-        return StaffMembers.objects.filter(
-            user=request.user,
-            job_title__in=[
-                PositionsStatus.HEAD_OF_WAREHOUSE,
-                PositionsStatus.SUPER_USER,
-            ],
-        ).exists()
+class IsManager(HasJobTitle):
+    job_titles = (PositionsStatus.MANAGER, PositionsStatus.SUPER_USER)
 
 
-class IsDeliveryPointWorker(IsActive):
-    def has_permission(self, request, view):
-        if not super().has_permission(request, view):
-            return False
-        return StaffMembers.objects.filter(
-            user=request.user,
-            job_title__in=[
-                PositionsStatus.SUPER_USER,
-                PositionsStatus.DELIVERY_POINT_WORKER,
-            ],
-        ).exists()
+class IsWarehouseWorker(HasJobTitle):
+    job_titles = (PositionsStatus.WAREHOUSE_WORKER, PositionsStatus.SUPER_USER)
+
+
+class IsHeadOfWarehouse(HasJobTitle):
+    job_titles = (PositionsStatus.HEAD_OF_WAREHOUSE, PositionsStatus.SUPER_USER)
+
+
+class IsDeliveryPointWorker(HasJobTitle):
+    job_titles = (PositionsStatus.SUPER_USER, PositionsStatus.DELIVERY_POINT_WORKER)
 
 
 class IsSupplier(IsActive):
     def has_permission(self, request, view):
         if not super().has_permission(request, view):
             return False
-        return Supplier.objects.filter(user=request.user).exists()
+        return bool(get_roles(request.user).suppliers)
@@ -0,0 +1,64 @@
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from accounts.models import StaffMembers, Supplier
+from marketplace import settings
+from marketplace.cache import count
+
+ROLES_KEY = "roles:{user}:{version}"
+ROLES_VERSION_KEY = "roles:{user}:version"
+
+
+class Roles(NamedTuple):
+    job_titles: frozenset
+    warehouses: frozenset
+    delivery_points: frozenset
+    suppliers: frozenset
+
+
+def load_roles(user):
+    staff = StaffMembers.objects.filter(user=user).values_list(
+        "job_title", "warehouse_id", "delivery_point_id"
+    )
+    job_titles, warehouses, delivery_points = set(), set(), set()
+    for job_title, warehouse, delivery_point in staff:
+        job_titles.add(job_title)
+        warehouses.add(warehouse)
+        delivery_points.add(delivery_point)
+    return Roles(
+        job_titles=frozenset(job_titles),
+        warehouses=frozenset(warehouses - {None}),
+        delivery_points=frozenset(delivery_points - {None}),
+        suppliers=frozenset(
+            Supplier.objects.filter(user=user).values_list("id", flat=True)
+        ),
+    )
+
+
+def get_roles(user):
+    """
+    Job titles, assignments and supplier ids of ``user``.
+
+    Resolved once per user object, so once per request, from a Redis entry
+    keyed by a per-user version that ``invalidate_roles`` bumps.
+    """
+    roles = getattr(user, "_roles", None)
+    if roles is None:
+        version = cache.get(ROLES_VERSION_KEY.format(user=user.pk), 0)
+        key = ROLES_KEY.format(user=user.pk, version=version)
+        roles = cache.get(key)
+        if roles is None:
+            roles = load_roles(user)
+            cache.set(key, roles, settings.ROLES_CACHE_TTL)
+        user._roles = roles
+    return roles
+
+
+def invalidate_roles(user_id):
+    # A new version instead of a delete: a reader that loaded the old rows
+    # can only write them under the old key. Bumped only once the write is
+    # visible, or a reader could cache the old rows under the new version.
+    key = ROLES_VERSION_KEY.format(user=user_id)
+    transaction.on_commit(lambda: count(key))
@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from accounts.authentication import invalidate_token
+from accounts.models import StaffMembers, Supplier, User
+from accounts.roles import invalidate_roles
+
+
+@receiver(post_save, sender=StaffMembers)
+@receiver(post_delete, sender=StaffMembers)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def invalidate_member_roles(sender, instance, **kwargs):
+    invalidate_roles(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_roles(sender, instance, created, **kwargs):
+    # Ids can be reused after the table is reset; don't serve the old roles.
+    if created:
+        invalidate_roles(instance.pk)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    if not created:
+        for key in Token.objects.filter(user=instance).values_list("key", flat=True):
+            invalidate_token(key)
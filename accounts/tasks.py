@@ -1,3 +1,5 @@
+from django.utils import timezone
+
 from integration.unisender import unisender
 from marketplace.celery_app import app
 from marketplace.errors import SendException
@@ -9,3 +11,11 @@ def send_simple_code(to: str, data: str, type_message):
         unisender.send_email(email=to, data=data, type_message=type_message)
     except Exception:
         raise SendException
+
+
+@app.task
+def delete_expired_refresh_tokens():
+    from accounts.models import RefreshToken
+
+    deleted, _ = RefreshToken.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,47 @@
+from django.core import signing
+
+from accounts.models import RefreshToken
+from accounts.roles import Roles, get_roles
+from marketplace import settings
+
+ACCESS_TOKEN_SALT = "accounts.access_token"
+
+
+def issue_access_token(user):
+    """
+    Sign the user fields and roles the permission classes read into a
+    token that ``read_access_token`` verifies without a datastore.
+
+    The claims are a snapshot: role changes and deactivation apply once the
+    token expires, after ``ACCESS_TOKEN_TTL`` seconds.
+    """
+    roles = get_roles(user)
+    claims = {
+        "id": user.pk,
+        "email": user.email,
+        "is_active": user.is_active,
+        "is_staff": user.is_staff,
+        "is_superuser": user.is_superuser,
+        "role": user.role,
+        **{field: sorted(getattr(roles, field)) for field in Roles._fields},
+    }
+    return signing.dumps(claims, salt=ACCESS_TOKEN_SALT, compress=True)
+
+
+def read_access_token(token):
+    """Claims of a valid, unexpired access token, or None."""
+    try:
+        return signing.loads(
+            token, salt=ACCESS_TOKEN_SALT, max_age=settings.ACCESS_TOKEN_TTL
+        )
+    except signing.BadSignature:
+        return None
+
+
+def issue_tokens(user, refresh=None):
+    """Access token plus ``refresh``, or a refresh token of a new session."""
+    return {
+        "access": issue_access_token(user),
+        "refresh": refresh or RefreshToken.objects.issue(user),
+        "expires_in": settings.ACCESS_TOKEN_TTL,
+    }
@@ -1,3 +1,4 @@
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,3 +14,8 @@ def get_client_ip(request):
         ip = request.META.get("REMOTE_ADDR")
         logger.info(f"REMOTE_ADDR: {ip}")
     return ip
+
+
+def token_digest(key):
+    # Raw tokens are credentials; store and cache only their hash.
+    return hashlib.sha256(key.encode()).hexdigest()
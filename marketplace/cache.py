@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+def count(key):
+    if not cache.add(key, 1, timeout=None):
+        cache.incr(key)
+
+
+class SingleFlightCache:
+    """
+    Read-through cache that lets only one worker rebuild a missing key.
+
+    Concurrent misses for the same key wait for the worker holding the
+    short-lived lock instead of hitting the database themselves. With
+    ``stale_timeout`` an expired value is still served for that long while
+    a background thread refreshes it.
+
+    A refresh writes back to the key it was started for, so keys should
+    carry a version that writers bump on commit: a refresh that loaded the
+    old row then lands under a key nobody reads.
+    """
+
+    lock_key = "{key}:lock"
+    poll_interval = 0.05
+
+    def __init__(self, timeout, stale_timeout=0, lock_timeout=5, stats_key=None):
+        self.timeout = timeout
+        self.stale_timeout = stale_timeout
+        self.lock_timeout = lock_timeout
+        self.stats_key = stats_key
+
+    def get(self, key, builder):
+        entry = cache.get(key)
+        if entry is not None:
+            self.count("hits")
+            if entry["fresh_until"] < time.time():
+                token = self.acquire(key)
+                if token:
+                    threading.Thread(
+                        target=self.refresh, args=(key, builder, token), daemon=True
+                    ).start()
+            return entry["value"]
+
+        self.count("misses")
+        token = self.acquire(key)
+        if token:
+            try:
+                return self.build(key, builder)
+            finally:
+                self.release(key, token)
+
+        deadline = time.time() + self.lock_timeout
+        while time.time() < deadline:
+            time.sleep(self.poll_interval)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry["value"]
+            if cache.get(self.lock_key.format(key=key)) is None:
+                break
+        return self.build(key, builder)
+
+    def build(self, key, builder):
+        value = builder()
+        entry = {"value": value, "fresh_until": time.time() + self.timeout}
+        cache.set(key, entry, self.timeout + self.stale_timeout)
+        return value
+
+    def refresh(self, key, builder, token):
+        try:
+            self.build(key, builder)
+        except Exception:
+            logger.exception("Background refresh of %s failed", key)
+        finally:
+            self.release(key, token)
+            connections.close_all()
+
+    def acquire(self, key):
+        token = uuid4().hex
+        if cache.add(self.lock_key.format(key=key), token, self.lock_timeout):
+            return token
+        return None
+
+    def release(self, key, token):
+        lock_key = self.lock_key.format(key=key)
+        if cache.get(lock_key) == token:
+            cache.delete(lock_key)
+
+    def count(self, name):
+        if self.stats_key:
+            count(f"{self.stats_key}:{name}")
@@ -7,6 +7,11 @@ class ConfirmationType(models.TextChoices):
     RESTORE_PASSWORD = "restore_password"
 
 
+class TokenType(models.TextChoices):
+    TOKEN = "token"
+    SIGNED = "signed"
+
+
 class TypeEmailMessage(models.TextChoices):
     SUBMITTING_CODE = "submitting_code"
     CHANGE_PASSWORD = "change_password"
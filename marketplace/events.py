@@ -0,0 +1,72 @@
+"""
+Change events fanned out through Redis Streams.
+
+Every topic has its own stream. Consumers read through consumer groups, so
+Redis keeps each group's offset and redelivers entries that were read but
+never acknowledged. Delivery is at-least-once: handlers must tolerate seeing
+the same event ``id`` twice.
+"""
+import json
+
+import redis
+
+from marketplace import settings
+from marketplace.redis import client
+
+STREAM_KEY = "events:{topic}"
+
+
+def publish(events):
+    """Append ``OutboxEvent`` rows to their topic streams in one round trip."""
+    pipeline = client.pipeline(transaction=False)
+    for event in events:
+        pipeline.xadd(
+            STREAM_KEY.format(topic=event.topic),
+            {
+                "id": event.id,
+                "type": event.event_type,
+                "aggregate_id": event.aggregate_id,
+                "payload": json.dumps(event.payload),
+                "created_at": event.created_at.isoformat(),
+            },
+            maxlen=settings.EVENT_STREAM_MAXLEN,
+            approximate=True,
+        )
+    pipeline.execute()
+
+
+def ensure_group(topic, group):
+    try:
+        client.xgroup_create(
+            STREAM_KEY.format(topic=topic), group, id="0", mkstream=True
+        )
+    except redis.ResponseError as error:
+        if "BUSYGROUP" not in str(error):
+            raise
+
+
+def consume(topic, group, consumer, handler, count=100, block=None):
+    """
+    Hand one batch of events to ``handler`` and acknowledge them.
+
+    Entries this consumer read earlier but never acknowledged come first,
+    then entries idle for ``EVENT_CLAIM_IDLE`` ms on other consumers, then
+    new ones. Returns the number of events handled.
+    """
+    stream = STREAM_KEY.format(topic=topic)
+    ensure_group(topic, group)
+    entries = client.xreadgroup(group, consumer, {stream: "0"}, count=count)
+    entries = entries[0][1] if entries else []
+    if not entries:
+        entries = client.xautoclaim(
+            stream, group, consumer, settings.EVENT_CLAIM_IDLE, count=count
+        )[1]
+    if not entries:
+        entries = client.xreadgroup(
+            group, consumer, {stream: ">"}, count=count, block=block
+        )
+        entries = entries[0][1] if entries else []
+    for entry_id, fields in entries:
+        handler({**fields, "payload": json.loads(fields["payload"])})
+        client.xack(stream, group, entry_id)
+    return len(entries)
@@ -0,0 +1,131 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from marketplace import settings
+from marketplace.models import IdempotencyKey
+
+IDEMPOTENCY_KEY = "idempotency:{key}"
+
+
+class IdempotencyMixin:
+    """
+    Honour an ``Idempotency-Key`` header on POST.
+
+    The first response is kept in Redis for ``IDEMPOTENCY_TTL`` seconds and in
+    Postgres, and replayed to retries without running the view again. A retry
+    that arrives while the first request is still running gets 409, and
+    reusing a key for a different body gets 422. Errors raised by the view
+    and 5xx responses free the key for another attempt.
+    """
+
+    idempotency_header = "Idempotency-Key"
+
+    def post(self, request, *args, **kwargs):
+        key = request.headers.get(self.idempotency_header)
+        if not key:
+            return super().post(request, *args, **kwargs)
+
+        key = hashlib.sha256(f"{request.user.pk}:{request.path}:{key}".encode())
+        key = key.hexdigest()
+        fingerprint = self.get_fingerprint(request)
+        stored = cache.get(IDEMPOTENCY_KEY.format(key=key))
+        if stored is None:
+            stored = self.claim_idempotency_key(key, fingerprint)
+        if stored is not None:
+            return self.replay(stored, fingerprint)
+
+        try:
+            response = super().post(request, *args, **kwargs)
+        except Exception:
+            self.release_idempotency_key(key)
+            raise
+        if response.status_code >= 500:
+            self.release_idempotency_key(key)
+        else:
+            self.store_response(key, fingerprint, response)
+        return response
+
+    @staticmethod
+    def get_fingerprint(request):
+        data = request.data
+        if hasattr(data, "lists"):
+            data = dict(data.lists())
+        payload = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def claim_idempotency_key(key, fingerprint):
+        """Returns None when this request may run, else what is stored for the key."""
+        try:
+            with transaction.atomic():
+                IdempotencyKey.objects.create(key=key, fingerprint=fingerprint)
+        except IntegrityError:
+            record = IdempotencyKey.objects.filter(key=key).first()
+            if record is None:
+                return {"fingerprint": fingerprint, "status_code": None}
+            stale = timezone.now() - timedelta(
+                seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT
+            )
+            if record.status_code is None and record.created_at < stale:
+                # The first request died without answering; take it over.
+                if IdempotencyKey.objects.filter(
+                    key=key, status_code=None, created_at=record.created_at
+                ).update(fingerprint=fingerprint, created_at=timezone.now()):
+                    return None
+            return {
+                "fingerprint": record.fingerprint,
+                "status_code": record.status_code,
+                "data": record.response,
+            }
+        cache.set(
+            IDEMPOTENCY_KEY.format(key=key),
+            {"fingerprint": fingerprint, "status_code": None},
+            settings.IDEMPOTENCY_LOCK_TIMEOUT,
+        )
+        return None
+
+    @staticmethod
+    def release_idempotency_key(key):
+        IdempotencyKey.objects.filter(key=key, status_code=None).delete()
+        cache.delete(IDEMPOTENCY_KEY.format(key=key))
+
+    @staticmethod
+    def store_response(key, fingerprint, response):
+        data = json.loads(json.dumps(response.data, cls=DjangoJSONEncoder))
+        IdempotencyKey.objects.filter(key=key).update(
+            status_code=response.status_code, response=data
+        )
+        cache.set(
+            IDEMPOTENCY_KEY.format(key=key),
+            {
+                "fingerprint": fingerprint,
+                "status_code": response.status_code,
+                "data": data,
+            },
+            settings.IDEMPOTENCY_TTL,
+        )
+
+    @staticmethod
+    def replay(stored, fingerprint):
+        if stored["fingerprint"] != fingerprint:
+            return Response(
+                {"error": "idempotency_key_reused"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        if stored["status_code"] is None:
+            return Response(
+                {"error": "request_in_progress"}, status=status.HTTP_409_CONFLICT
+            )
+        return Response(
+            stored["data"],
+            status=stored["status_code"],
+            headers={"Idempotent-Replayed": "true"},
+        )
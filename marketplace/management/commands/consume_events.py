@@ -0,0 +1,42 @@
+import json
+import socket
+
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+
+from marketplace import events
+
+
+class Command(BaseCommand):
+    help = "Consume change events of a topic through a Redis Streams consumer group"
+
+    def add_arguments(self, parser):
+        parser.add_argument("topic", help="order or product")
+        parser.add_argument("group", help="Consumer group, one per downstream system")
+        parser.add_argument("--consumer", default=socket.gethostname())
+        parser.add_argument(
+            "--handler", help="Dotted path to a callable taking one event"
+        )
+        parser.add_argument("--count", type=int, default=100)
+        parser.add_argument(
+            "--once", action="store_true", help="Stop after the first empty batch"
+        )
+
+    def handle(self, *args, **options):
+        handler = self.write
+        if options["handler"]:
+            handler = import_string(options["handler"])
+        while True:
+            handled = events.consume(
+                options["topic"],
+                options["group"],
+                options["consumer"],
+                handler,
+                count=options["count"],
+                block=None if options["once"] else 5000,
+            )
+            if options["once"] and not handled:
+                break
+
+    def write(self, event):
+        self.stdout.write(json.dumps(event))
@@ -0,0 +1,122 @@
+# Generated by Django 4.2.6 on 2026-10-18 19:18
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+OUTBOX_TRIGGERS_SQL = """
+CREATE FUNCTION marketplace_outbox_order() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO marketplace_outboxevent
+            (topic, event_type, aggregate_id, payload, created_at)
+        VALUES (
+            'order', 'order.created', NEW.id,
+            jsonb_build_object(
+                'id', NEW.id,
+                'user', NEW.user_id,
+                'delivery_point', NEW.delivery_point_id,
+                'product', NEW.product_id,
+                'quantity', NEW.quantity,
+                'status', NEW.status,
+                'created_at', NEW.created_at
+            ),
+            now()
+        );
+    ELSIF NEW.status IS DISTINCT FROM OLD.status THEN
+        INSERT INTO marketplace_outboxevent
+            (topic, event_type, aggregate_id, payload, created_at)
+        VALUES (
+            'order', 'order.status_changed', NEW.id,
+            jsonb_build_object(
+                'id', NEW.id,
+                'product', NEW.product_id,
+                'status', NEW.status,
+                'previous_status', OLD.status
+            ),
+            now()
+        );
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER marketplace_outbox_order_trigger
+    AFTER INSERT OR UPDATE OF status ON warehouse_orderinggoods
+    FOR EACH ROW EXECUTE FUNCTION marketplace_outbox_order();
+
+CREATE FUNCTION marketplace_outbox_product() RETURNS trigger AS $$
+BEGIN
+    IF NEW.amount IS DISTINCT FROM OLD.amount OR NEW.status IS DISTINCT FROM OLD.status THEN
+        INSERT INTO marketplace_outboxevent
+            (topic, event_type, aggregate_id, payload, created_at)
+        VALUES (
+            'product', 'product.stock_changed', NEW.article,
+            jsonb_build_object(
+                'article', NEW.article,
+                'amount', NEW.amount,
+                'previous_amount', OLD.amount,
+                'status', NEW.status
+            ),
+            now()
+        );
+    END IF;
+    IF NEW.cost IS DISTINCT FROM OLD.cost THEN
+        INSERT INTO marketplace_outboxevent
+            (topic, event_type, aggregate_id, payload, created_at)
+        VALUES (
+            'product', 'product.price_changed', NEW.article,
+            jsonb_build_object(
+                'article', NEW.article,
+                'cost', NEW.cost,
+                'previous_cost', OLD.cost
+            ),
+            now()
+        );
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER marketplace_outbox_product_trigger
+    AFTER UPDATE OF amount, status, cost ON product_product
+    FOR EACH ROW EXECUTE FUNCTION marketplace_outbox_product();
+"""
+
+DROP_OUTBOX_TRIGGERS_SQL = """
+DROP TRIGGER IF EXISTS marketplace_outbox_order_trigger ON warehouse_orderinggoods;
+DROP FUNCTION IF EXISTS marketplace_outbox_order();
+DROP TRIGGER IF EXISTS marketplace_outbox_product_trigger ON product_product;
+DROP FUNCTION IF EXISTS marketplace_outbox_product();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('marketplace', '0001_initial'),
+        ('product', '0008_product_stock_shards'),
+        ('warehouse', '0003_orderinggoodsarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('topic', models.CharField(max_length=32)),
+                ('event_type', models.CharField(max_length=64)),
+                ('aggregate_id', models.BigIntegerField()),
+                (
+                    'payload',
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'outbox_event',
+                'verbose_name_plural': 'outbox_events',
+            },
+        ),
+        migrations.RunSQL(OUTBOX_TRIGGERS_SQL, DROP_OUTBOX_TRIGGERS_SQL),
+    ]
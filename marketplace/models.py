@@ -1,3 +1,4 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 
 
@@ -7,3 +8,47 @@ class CreatedUpdatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class IdempotencyKey(models.Model):
+    """
+    First response to a POST sent with an ``Idempotency-Key`` header.
+
+    ``status_code`` stays empty while the first request is still running.
+    """
+
+    key = models.CharField(max_length=64, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "idempotency_key"
+        verbose_name_plural = "idempotency_keys"
+
+    def __str__(self):
+        return self.key
+
+
+class OutboxEvent(models.Model):
+    """
+    Change event waiting to be relayed to Redis Streams.
+
+    Rows are written by database triggers in the same transaction as the
+    change itself and deleted once published.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    topic = models.CharField(max_length=32)
+    event_type = models.CharField(max_length=64)
+    aggregate_id = models.BigIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "outbox_event"
+        verbose_name_plural = "outbox_events"
+
+    def __str__(self):
+        return f"{self.event_type} {self.aggregate_id}"
@@ -0,0 +1,186 @@
+import base64
+import datetime
+import json
+import operator
+from decimal import Decimal
+from functools import reduce
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with an opt-in keyset (cursor) mode.
+
+    Passing ``?pagination=cursor`` (or a ``cursor`` received from a previous
+    page) switches to seeking on the ordering columns plus the primary key,
+    so every page costs the same and no COUNT query is issued. Cursor pages
+    follow the queryset's ordering when a filter changed it, such as
+    ``?ordering=`` or search relevance, otherwise the view's
+    ``cursor_ordering``, then the queryset's ordering, then
+    ``default_ordering``.
+    """
+
+    mode_query_param = "pagination"
+    mode_cursor = "cursor"
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "invalid_cursor"
+    default_ordering = ("-created_at",)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.is_cursor_mode(request)
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request) or self.default_limit
+        self.ordering = self.get_ordering(queryset, view)
+        position, self.reverse = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = [self.invert(field) for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek(ordering, position))
+
+        page = list(queryset[: self.limit + 1])
+        has_more = len(page) > self.limit
+        page = page[: self.limit]
+        if self.reverse:
+            page.reverse()
+
+        self.next_position = self.previous_position = None
+        if page:
+            if has_more or self.reverse:
+                self.next_position = self.get_position(page[-1])
+            if position is not None and (has_more or not self.reverse):
+                self.previous_position = self.get_position(page[0])
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def is_cursor_mode(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == self.mode_cursor
+            or self.cursor_query_param in request.query_params
+        )
+
+    def get_ordering(self, queryset, view):
+        ordering = [
+            field
+            for field in queryset.query.order_by
+            if isinstance(field, str) and field.lstrip("-") != "pk"
+        ]
+        cursor_ordering = getattr(view, "cursor_ordering", None)
+        base = getattr(view, "queryset", None)
+        # Filters that order on their own, like ?ordering= or search, win.
+        unchanged = base is not None and queryset.query.order_by == base.query.order_by
+        if cursor_ordering and (unchanged or not ordering):
+            ordering = list(cursor_ordering)
+        elif not ordering:
+            ordering = list(self.default_ordering)
+        pk_name = queryset.model._meta.pk.name
+        direction = "-" if ordering[0].startswith("-") else ""
+        ordering = [field for field in ordering if field.lstrip("-") != pk_name]
+        return ordering + [f"{direction}{pk_name}"]
+
+    def get_position(self, instance):
+        position = []
+        for field in self.ordering:
+            name = field.lstrip("-")
+            try:
+                name = instance._meta.get_field(name).attname
+            except FieldDoesNotExist:
+                pass
+            position.append(getattr(instance, name))
+        return position
+
+    def seek(self, ordering, position):
+        """
+        Build the lexicographic "comes after ``position``" condition.
+
+        NULLs are treated as the largest value, matching the Postgres default
+        for ascending order.
+        """
+        conditions = []
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            descending = field.startswith("-")
+            if value is None:
+                if descending:
+                    conditions.append(equal & Q(**{f"{name}__isnull": False}))
+                equal &= Q(**{f"{name}__isnull": True})
+                continue
+            lookup = "lt" if descending else "gt"
+            after = Q(**{f"{name}__{lookup}": value})
+            if not descending:
+                after |= Q(**{f"{name}__isnull": True})
+            conditions.append(equal & after)
+            equal &= Q(**{name: value})
+        return reduce(operator.or_, conditions)
+
+    @staticmethod
+    def invert(field):
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+    @staticmethod
+    def dump_value(value):
+        # Keep full precision: the cursor must compare equal to the stored value.
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        raise TypeError(f"{type(value).__name__} can not be used as a cursor value")
+
+    def encode_cursor(self, position, reverse):
+        payload = json.dumps(
+            {"o": self.ordering, "p": position, "r": reverse}, default=self.dump_value
+        )
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        url = replace_query_param(url, self.mode_query_param, self.mode_cursor)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            ordering, position, reverse = payload["o"], payload["p"], payload["r"]
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if ordering != self.ordering or len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(reverse)
@@ -0,0 +1,6 @@
+import redis
+
+from marketplace import settings
+
+# Shared client for the Redis structures that don't fit the Django cache API.
+client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 
 import environ
+from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -22,6 +23,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "rest_framework.authtoken",
     "minio_storage",
@@ -29,6 +31,7 @@ INSTALLED_APPS = [
     "drf_yasg",
     "django_filters",
     "integration",
+    "marketplace",
     "accounts",
     "product",
     "warehouse",
@@ -66,14 +69,55 @@ TEMPLATES = [
 REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ("django_filters.rest_framework.DjangoFilterBackend",),
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework.authentication.TokenAuthentication",
+        "accounts.authentication.CachedTokenAuthentication",
+        "accounts.authentication.SignedTokenAuthentication",
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10,
+    "DEFAULT_THROTTLE_RATES": {
+        "sign_in_ip": env.str("THROTTLE_SIGN_IN_IP", default="30/min"),
+        "sign_in_email": env.str("THROTTLE_SIGN_IN_EMAIL", default="10/min"),
+        "sign_up_confirmation_ip": env.str(
+            "THROTTLE_SIGN_UP_CONFIRMATION_IP", default="10/min"
+        ),
+        "sign_up_confirmation_email": env.str(
+            "THROTTLE_SIGN_UP_CONFIRMATION_EMAIL", default="5/min"
+        ),
+        "restore_password_ip": env.str(
+            "THROTTLE_RESTORE_PASSWORD_IP", default="10/min"
+        ),
+        "restore_password_email": env.str(
+            "THROTTLE_RESTORE_PASSWORD_EMAIL", default="5/hour"
+        ),
+        "restore_password_confirm_ip": env.str(
+            "THROTTLE_RESTORE_PASSWORD_CONFIRM_IP", default="10/min"
+        ),
+        "orders_user": env.str("THROTTLE_ORDERS_USER", default="60/min"),
+    },
 }
 
 WSGI_APPLICATION = "marketplace.wsgi.application"
 
+REDIS_HOST = env.str("REDIS_HOST")
+
+REDIS_PORT = env.int("REDIS_PORT")
+
+REDIS_DB = env.int("REDIS_DB")
+
+REDIS_URL = f"redis://{REDIS_HOST}:{REDIS_PORT}/{REDIS_DB}"
+
+# Database the test runner uses instead of REDIS_DB; it is flushed freely.
+REDIS_TEST_DB = env.int("REDIS_TEST_DB", default=15)
+
+TEST_RUNNER = "marketplace.testing.RedisTestRunner"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+}
+
 AUTH_USER_MODEL = "accounts.User"
 
 DATABASES = {
@@ -143,6 +187,126 @@ STATIC_ROOT = './static_files/'
 
 NUMBER_OF_PRODUCT_PHOTOS = env.int("NUMBER_OF_PRODUCT_PHOTOS")
 
+PRODUCT_CACHE_TIMEOUT = env.int("PRODUCT_CACHE_TIMEOUT", default=300)
+
+PRODUCT_CACHE_STALE_TIMEOUT = env.int("PRODUCT_CACHE_STALE_TIMEOUT", default=60)
+
+CACHE_LOCK_TIMEOUT = env.int("CACHE_LOCK_TIMEOUT", default=5)
+
+STOCK_CONSOLIDATION_INTERVAL = env.int("STOCK_CONSOLIDATION_INTERVAL", default=10)
+
+STOCK_HOLD_TIMEOUT = env.int("STOCK_HOLD_TIMEOUT", default=60)
+
+STOCK_HOLD_BATCH_SIZE = env.int("STOCK_HOLD_BATCH_SIZE", default=500)
+
+STOCK_HOLD_WRITE_INTERVAL = env.int("STOCK_HOLD_WRITE_INTERVAL", default=1)
+
+STOCK_RECONCILE_INTERVAL = env.int("STOCK_RECONCILE_INTERVAL", default=60)
+
+# Runs the order throughput benchmark in warehouse tests; off by default.
+STOCK_BENCHMARK = env.bool("STOCK_BENCHMARK", default=False)
+
+ORDER_ARCHIVE_AGE_DAYS = env.int("ORDER_ARCHIVE_AGE_DAYS", default=180)
+
+ORDER_ARCHIVE_CHUNK_SIZE = env.int("ORDER_ARCHIVE_CHUNK_SIZE", default=1000)
+
+ORDER_ARCHIVE_MAX_CHUNKS = env.int("ORDER_ARCHIVE_MAX_CHUNKS", default=500)
+
+ORDER_ARCHIVE_PAUSE = env.float("ORDER_ARCHIVE_PAUSE", default=0.5)
+
+IDEMPOTENCY_TTL = env.int("IDEMPOTENCY_TTL", default=86400)
+
+IDEMPOTENCY_LOCK_TIMEOUT = env.int("IDEMPOTENCY_LOCK_TIMEOUT", default=60)
+
+OUTBOX_BATCH_SIZE = env.int("OUTBOX_BATCH_SIZE", default=500)
+
+OUTBOX_RELAY_INTERVAL = env.int("OUTBOX_RELAY_INTERVAL", default=1)
+
+EVENT_STREAM_MAXLEN = env.int("EVENT_STREAM_MAXLEN", default=1000000)
+
+EVENT_CLAIM_IDLE = env.int("EVENT_CLAIM_IDLE", default=60000)
+
+ORDER_QUEUE_TOMBSTONE_TTL = env.int("ORDER_QUEUE_TOMBSTONE_TTL", default=86400)
+
+SUPPLIER_SALES_ROLLUP_INTERVAL = env.int("SUPPLIER_SALES_ROLLUP_INTERVAL", default=300)
+
+SUPPLIER_SALES_ROLLUP_LAG = env.int("SUPPLIER_SALES_ROLLUP_LAG", default=300)
+
+EXPORT_CHUNK_SIZE = env.int("EXPORT_CHUNK_SIZE", default=2000)
+
+INVENTORY_FOLD_INTERVAL = env.int("INVENTORY_FOLD_INTERVAL", default=10)
+
+INVENTORY_FOLD_BATCH_SIZE = env.int("INVENTORY_FOLD_BATCH_SIZE", default=10000)
+
+ROLES_CACHE_TTL = env.int("ROLES_CACHE_TTL", default=300)
+
+TOKEN_CACHE_TTL = env.int("TOKEN_CACHE_TTL", default=300)
+
+TOKEN_CACHE_LOCAL_TTL = env.int("TOKEN_CACHE_LOCAL_TTL", default=5)
+
+TOKEN_CACHE_LOCAL_SIZE = env.int("TOKEN_CACHE_LOCAL_SIZE", default=10000)
+
+ACCESS_TOKEN_TTL = env.int("ACCESS_TOKEN_TTL", default=300)
+
+REFRESH_TOKEN_TTL = env.int("REFRESH_TOKEN_TTL", default=2592000)
+
+CELERY_BROKER_URL = env.str("CELERY_BROKER_URL", default=REDIS_URL)
+
+CELERY_BEAT_SCHEDULE = {
+    "consolidate-product-stock": {
+        "task": "product.tasks.consolidate_product_stock",
+        "schedule": STOCK_CONSOLIDATION_INTERVAL,
+    },
+    "write-stock-holds": {
+        "task": "warehouse.tasks.write_stock_holds",
+        "schedule": STOCK_HOLD_WRITE_INTERVAL,
+    },
+    "release-expired-stock-holds": {
+        "task": "product.tasks.release_expired_stock_holds",
+        "schedule": STOCK_HOLD_WRITE_INTERVAL,
+    },
+    "reconcile-stock": {
+        "task": "product.tasks.reconcile_stock",
+        "schedule": STOCK_RECONCILE_INTERVAL,
+    },
+    "create-order-partitions": {
+        "task": "warehouse.tasks.create_order_partitions",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "archive-orders": {
+        "task": "warehouse.tasks.archive_orders",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    "relay-outbox-events": {
+        "task": "marketplace.tasks.relay_outbox_events",
+        "schedule": OUTBOX_RELAY_INTERVAL,
+    },
+    "delete-expired-idempotency-keys": {
+        "task": "marketplace.tasks.delete_expired_idempotency_keys",
+        "schedule": crontab(hour=5, minute=0),
+    },
+    "rollup-supplier-sales": {
+        "task": "warehouse.tasks.rollup_supplier_sales",
+        "schedule": SUPPLIER_SALES_ROLLUP_INTERVAL,
+    },
+    "fold-inventory-deltas": {
+        "task": "warehouse.tasks.fold_inventory_deltas",
+        "schedule": INVENTORY_FOLD_INTERVAL,
+    },
+    "recompute-inventory": {
+        "task": "warehouse.tasks.recompute_inventory",
+        "schedule": crontab(hour=2, minute=0),
+    },
+    "delete-expired-refresh-tokens": {
+        "task": "accounts.tasks.delete_expired_refresh_tokens",
+        "schedule": crontab(hour=5, minute=30),
+    },
+    "prune-order-queues": {
+        "task": "warehouse.tasks.prune_order_queues",
+        "schedule": crontab(minute=30),
+    },
+}
+
 DEFAULT_FILE_STORAGE = "minio_storage.storage.MinioMediaStorage"
 STATICFILES_STORAGE = "minio_storage.storage.MinioStaticStorage"
 MINIO_STORAGE_ENDPOINT = env.str('MINIO_STORAGE_ENDPOINT')
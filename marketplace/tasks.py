@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from marketplace import events, settings
+from marketplace.celery_app import app
+from marketplace.models import IdempotencyKey, OutboxEvent
+
+
+@app.task
+def delete_expired_idempotency_keys():
+    expired = timezone.now() - timedelta(seconds=settings.IDEMPOTENCY_TTL)
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=expired).delete()
+    return deleted
+
+
+@app.task
+def relay_outbox_events(batch_size=None):
+    """Publish a batch of outbox events to Redis Streams, oldest first."""
+    with transaction.atomic():
+        batch = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True).order_by("id")[
+                : batch_size or settings.OUTBOX_BATCH_SIZE
+            ]
+        )
+        if batch:
+            events.publish(batch)
+            # A failure from here on republishes the batch: at-least-once.
+            OutboxEvent.objects.filter(id__in=[event.id for event in batch]).delete()
+    return len(batch)
@@ -0,0 +1,52 @@
+import redis
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from marketplace import settings
+from marketplace.redis import client
+
+TEST_REDIS_URL = (
+    f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_TEST_DB}"
+)
+
+
+class RedisTestRunner(DiscoverRunner):
+    """
+    Run the tests against ``REDIS_TEST_DB`` instead of the configured Redis
+    database, the way Django swaps in a test database for Postgres.
+
+    Both the Django cache and the shared client are pointed at it, so tests
+    can flush it freely without touching live holds, queues or limits.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        if settings.REDIS_TEST_DB == settings.REDIS_DB:
+            raise RuntimeError("REDIS_TEST_DB must differ from REDIS_DB.")
+        super().setup_test_environment(**kwargs)
+        self.redis_settings = override_settings(
+            CACHES={
+                alias: {**config, "LOCATION": TEST_REDIS_URL}
+                for alias, config in settings.CACHES.items()
+            }
+        )
+        self.redis_settings.enable()
+        self.redis_pool = client.connection_pool
+        # Scripts are registered on the client object, so swap its pool.
+        client.connection_pool = redis.ConnectionPool.from_url(
+            TEST_REDIS_URL, decode_responses=True
+        )
+        clear_redis()
+
+    def teardown_test_environment(self, **kwargs):
+        clear_redis()
+        client.connection_pool.disconnect()
+        client.connection_pool = self.redis_pool
+        self.redis_settings.disable()
+        super().teardown_test_environment(**kwargs)
+
+
+def clear_redis():
+    """Empty the test Redis database; refuses to run against any other."""
+    if client.connection_pool.connection_kwargs.get("db") != settings.REDIS_TEST_DB:
+        raise RuntimeError("clear_redis only runs against REDIS_TEST_DB.")
+    client.flushdb()
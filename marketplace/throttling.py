@@ -0,0 +1,95 @@
+import hashlib
+from uuid import uuid4
+
+from rest_framework.throttling import SimpleRateThrottle
+
+from accounts.utils import get_client_ip
+from marketplace.redis import client
+
+# Trim the window, then count it and record the request only if it fits.
+# Returns 0 when allowed, otherwise the milliseconds until a slot frees up.
+# The clock is Redis' own so every web process shares one timeline.
+SLIDING_WINDOW_SCRIPT = client.register_script(
+    """
+    local time = redis.call('TIME')
+    local now = time[1] * 1000 + math.floor(time[2] / 1000)
+    local window = tonumber(ARGV[1])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+        local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+        return math.max(tonumber(oldest[2]) + window - now, 1)
+    end
+    redis.call('ZADD', KEYS[1], now, ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return 0
+    """
+)
+
+
+class SlidingWindowThrottle(SimpleRateThrottle):
+    """
+    Rate limit kept as a Redis sorted set of request times, trimmed, counted
+    and appended by one script, so concurrent requests from every process
+    share the budget exactly.
+
+    The budget is the ``DEFAULT_THROTTLE_RATES`` entry named
+    ``<view.throttle_scope>_<kind>``; views without one are not throttled.
+    Throttles run before the handler, so rejected requests never reach
+    password hashing, the database or the email queue.
+    """
+
+    kind = None
+    cache_format = "throttle:%(scope)s:%(ident)s"
+
+    def __init__(self):
+        # The scope, and so the rate, is only known once the view is.
+        self.wait_ms = 0
+
+    def allow_request(self, request, view):
+        self.scope = f"{getattr(view, 'throttle_scope', None)}_{self.kind}"
+        self.rate = self.THROTTLE_RATES.get(self.scope)
+        if self.rate is None:
+            return True
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        ident = self.get_ident(request)
+        if ident is None:
+            return True
+        key = self.cache_format % {"scope": self.scope, "ident": ident}
+        self.wait_ms = SLIDING_WINDOW_SCRIPT(
+            keys=[key], args=[self.duration * 1000, self.num_requests, uuid4().hex]
+        )
+        return self.wait_ms == 0
+
+    def wait(self):
+        return self.wait_ms / 1000
+
+
+class ClientIPThrottle(SlidingWindowThrottle):
+    kind = "ip"
+
+    def get_ident(self, request):
+        return get_client_ip(request)
+
+
+class EmailThrottle(SlidingWindowThrottle):
+    """Budget per ``email`` in the request body; bodies without one pass."""
+
+    kind = "email"
+
+    def get_ident(self, request):
+        data = request.data
+        email = data.get("email") if hasattr(data, "get") else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+
+class UserThrottle(SlidingWindowThrottle):
+    """Budget per authenticated user, per client IP for anonymous requests."""
+
+    kind = "user"
+
+    def get_ident(self, request):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{get_client_ip(request)}"
@@ -1,18 +1,75 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db.models import F, Q
 from django_filters import filters
 from django_filters.filterset import FilterSet
 
 from product.models import Product, ProductReview
 
+# Must match the configuration used by product_search_vector_trigger.
+SEARCH_CONFIG = "russian"
+
+
+class CharInFilter(filters.BaseInFilter, filters.CharFilter):
+    pass
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
+class ArticleOrderingFilter(filters.OrderingFilter):
+    """Ordering that ends on ``article``, so rows with equal values page stably."""
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        ordering = [self.get_ordering_value(param) for param in value]
+        direction = "-" if ordering[0].startswith("-") else ""
+        return qs.order_by(*ordering, f"{direction}article")
+
 
 class ProductFilter(FilterSet):
     name = filters.CharFilter(field_name="name")
     cost = filters.NumberFilter(field_name="cost")
+    cost_min = filters.NumberFilter(field_name="cost", lookup_expr="gte")
+    cost_max = filters.NumberFilter(field_name="cost", lookup_expr="lte")
     amount = filters.NumberFilter(field_name="amount")
+    status__in = CharInFilter(field_name="status", lookup_expr="in")
+    warehouse__in = NumberInFilter(field_name="warehouse", lookup_expr="in")
+    supplier = filters.NumberFilter(field_name="supplier")
+    country_of_production = filters.CharFilter(field_name="country_of_production")
+    q = filters.CharFilter(method="search")
+    ordering = ArticleOrderingFilter(
+        fields=(
+            ("cost", "cost"),
+            ("created_at", "created_at"),
+            ("amount", "amount"),
+            ("rating_avg", "rating"),
+        ),
+    )
 
     class Meta:
         model = Product
         fields = ["name", "cost", "amount"]
 
+    @staticmethod
+    def search(queryset, name, value):
+        query = SearchQuery(value, config=SEARCH_CONFIG, search_type="websearch")
+        return (
+            queryset.filter(
+                Q(search_vector=query) | Q(name__trigram_word_similar=value)
+            )
+            .annotate(
+                rank=SearchRank(F("search_vector"), query)
+                + TrigramWordSimilarity(value, "name")
+            )
+            .order_by("-rank", "-created_at", "-article")
+        )
+
 
 class ProductReviewFilter(FilterSet):
     class Meta:
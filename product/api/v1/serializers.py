@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import serializers
 
 from accounts.models import User
@@ -9,6 +10,9 @@ class ProductSerializer(serializers.ModelSerializer):
     warehouse = WarehouseSerializer
     delivery_point = DeliveryPointSerializer
     country_of_production = serializers.CharField(required=False)
+    rating_histogram = serializers.ListField(
+        child=serializers.IntegerField(), read_only=True
+    )
 
     class Meta:
         model = Product
@@ -23,10 +27,17 @@ class ProductSerializer(serializers.ModelSerializer):
             "description",
             "country_of_production",
             "supplier",
+            "rating_avg",
+            "rating_count",
+            "rating_histogram",
         )
 
 
 class ProductSerializerCreate(serializers.ModelSerializer):
+    rating_histogram = serializers.ListField(
+        child=serializers.IntegerField(), read_only=True
+    )
+
     class Meta:
         model = Product
         fields = (
@@ -40,9 +51,24 @@ class ProductSerializerCreate(serializers.ModelSerializer):
             "description",
             "country_of_production",
             "supplier",
+            "rating_avg",
+            "rating_count",
+            "rating_histogram",
         )
         read_only_field = ("supplier",)
 
+    def update(self, instance, validated_data):
+        amount = validated_data.pop("amount", None) if instance.stock_slots else None
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if amount is not None:
+                # Sharded stock lives in the shards; spread the new amount
+                # over them, or consolidation would overwrite it.
+                instance = Product.objects.set_stock_slots(
+                    instance.article, instance.stock_slots, amount=amount
+                )
+        return instance
+
 
 class ProductReviewSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(
@@ -1,17 +1,49 @@
+import csv
 import decimal
+import gzip
+import json
+import threading
+import time
 from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlencode
 
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APIClient, APITestCase
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase
 
 from accounts.models import StaffMembers, Supplier, User
-from marketplace.choices import PositionsStatus
-from product.api.v1.serializers import ProductReviewSerializer, ProductSerializer
+from marketplace.cache import SingleFlightCache
+from marketplace.choices import MerchandiseStatus, PositionsStatus
+from marketplace.pagination import KeysetPagination
+from product.api.v1.serializers import (
+    ProductReviewSerializer,
+    ProductSerializer,
+    ProductSerializerCreate,
+)
+from product.api.v1.views import ProductApiView
+from product.cache import (
+    PRODUCT_DETAIL_KEY,
+    get_product_detail,
+    get_product_detail_stats,
+    invalidate_product_detail,
+    product_detail_cache,
+)
 from product.models import Product, ProductPhoto, ProductReview
+from product.ownership import can_mutate, mutable_articles
 from warehouse.models import Warehouse
 
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
 
+
+@override_settings(CACHES=LOCMEM_CACHES)
 class ProductTestCase(APITestCase):
     product_list = reverse("product_list")
     product_create = reverse("product_create")
@@ -19,6 +51,7 @@ class ProductTestCase(APITestCase):
     product_photo_create = reverse("product_photo_create")
 
     def setUp(self) -> None:
+        cache.clear()
         self.client = APIClient()
         self.user = User.objects.create(
             first_name="test", last_name="test2", email="test@gmauk.com", is_active=True
@@ -59,13 +92,37 @@ class ProductTestCase(APITestCase):
             product=self.product,
             grades=4,
         )
+        self.product.refresh_from_db()
 
     def test_product_list(self):
         response = self.client.get(self.product_list)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        serializer = ProductSerializer([self.product, self.product1], many=True).data
+        serializer = ProductSerializer([self.product1, self.product], many=True).data
         self.assertEqual(response.data["results"], serializer)
 
+    def test_product_export(self):
+        with mock.patch("marketplace.settings.EXPORT_CHUNK_SIZE", 1):
+            response = self.client.get(reverse("product_export"), {"cost_min": 100})
+            content = b"".join(response.streaming_content).decode()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.DictReader(StringIO(content)))
+        self.assertEqual([row["article"] for row in rows], [str(self.product1.article)])
+        self.assertEqual(Decimal(rows[0]["cost"]), Decimal("150"))
+
+        response = self.client.get(
+            reverse("product_export"), {"file_format": "ndjson", "compress": "gzip"}
+        )
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        lines = gzip.decompress(b"".join(response.streaming_content)).splitlines()
+        self.assertEqual(
+            [json.loads(line)["name"] for line in lines],
+            [self.product1.name, self.product.name],
+        )
+
+        response = self.client.get(reverse("product_export"), {"file_format": "xml"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_product_create(self):
         self.assertEqual(Product.objects.count(), 2)
         response = self.client.post(
@@ -88,6 +145,97 @@ class ProductTestCase(APITestCase):
         serializer = ProductSerializer(self.product1).data
         self.assertEqual(response.data, serializer)
 
+    def test_product_retrieve_cache(self):
+        url = reverse("product_retrieve", kwargs={"article": self.product1.article})
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data, ProductSerializerCreate(self.product1).data)
+        self.assertEqual(
+            get_product_detail_stats(), {"hits": 1, "misses": 1, "hit_rate": 0.5}
+        )
+        stale_key = PRODUCT_DETAIL_KEY.format(article=self.product1.article, version=1)
+        stale = cache.get(stale_key)
+        self.product1.name = "Valun"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product1.save()
+        # A request that read the row before the commit writes it back late.
+        cache.set(stale_key, stale)
+        response = self.client.get(url)
+        self.assertEqual(response.data["name"], "Valun")
+        self.assertEqual(get_product_detail_stats()["misses"], 2)
+
+    def test_single_flight_cache(self):
+        calls = []
+
+        def builder():
+            calls.append(1)
+            time.sleep(0.2)
+            return len(calls)
+
+        single_flight = SingleFlightCache(timeout=60)
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(single_flight.get("test", builder))
+            )
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [1] * 10)
+
+    def test_single_flight_cache_stale(self):
+        values = iter(["old", "new"])
+        single_flight = SingleFlightCache(timeout=0, stale_timeout=60)
+        self.assertEqual(single_flight.get("test", lambda: next(values)), "old")
+        self.assertEqual(single_flight.get("test", lambda: next(values)), "old")
+        deadline = time.time() + 2
+        while cache.get("test")["value"] != "new" and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cache.get("test")["value"], "new")
+
+    def test_product_detail_refresh_after_write(self):
+        article = self.product1.article
+        started, release = threading.Event(), threading.Event()
+
+        def slow_loader():
+            started.set()
+            release.wait(2)
+            return {"name": "old"}
+
+        with mock.patch.object(product_detail_cache, "timeout", 0):
+            get_product_detail(article, lambda: {"name": "old"})
+            # Stale, so a background refresh starts loading the old row.
+            get_product_detail(article, slow_loader)
+        self.assertTrue(started.wait(2))
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_product_detail(article)
+        release.set()
+        lock = product_detail_cache.lock_key.format(
+            key=PRODUCT_DETAIL_KEY.format(article=article, version=1)
+        )
+        deadline = time.time() + 2
+        while cache.get(lock) is not None and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(
+            get_product_detail(article, lambda: {"name": "new"}), {"name": "new"}
+        )
+
+    def test_review_list_cache(self):
+        url = reverse("review_list", kwargs={"article": self.product.article})
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductReview.objects.create(user=self.user, product=self.product, grades=5)
+        response = self.client.get(url)
+        self.assertEqual(len(response.data["results"]), 2)
+
     def test_product_retrieve_update(self):
         self.assertEqual(self.product1.cost, Decimal("150"))
         response = self.client.patch(
@@ -117,6 +265,48 @@ class ProductTestCase(APITestCase):
         self.product1.refresh_from_db()
         self.assertEqual(self.product1.cost, Decimal("150"))
 
+    def test_product_ownership(self):
+        other = User.objects.create(
+            username="other",
+            first_name="other",
+            last_name="other",
+            email="other@gmauk.com",
+            is_active=True,
+        )
+        supplier = Supplier.objects.create(user=other, company_name="Kopyta")
+        product = Product.objects.create(
+            name="Варежки",
+            warehouse=self.warehouse,
+            cost=Decimal("10"),
+            supplier=supplier,
+        )
+        articles = [self.product.article, self.product1.article, product.article]
+
+        # Managers may change every product, without a query once roles are cached.
+        self.assertTrue(can_mutate(self.user, product.article))
+        with self.assertNumQueries(0):
+            self.assertEqual(mutable_articles(self.user, articles), set(articles))
+
+        with self.assertNumQueries(3):
+            self.assertEqual(mutable_articles(other, articles), {product.article})
+        self.assertFalse(can_mutate(other, self.product.article))
+        self.assertFalse(can_mutate(other, "not-an-article"))
+
+        self.client.force_authenticate(other)
+        response = self.client.patch(
+            reverse("product_update", kwargs={"article": self.product.article}),
+            data={"cost": Decimal("1"), "name": "Valun"},
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.delete(
+            reverse(
+                "product_photo_delete",
+                kwargs={"article": self.product.article, "id": self.photo.id},
+            )
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(ProductPhoto.objects.filter(id=self.photo.id).exists())
+
     def test_product_photo_delete(self):
         self.assertEqual(ProductPhoto.objects.count(), 1)
         response = self.client.delete(
@@ -143,3 +333,261 @@ class ProductTestCase(APITestCase):
         )
         serializer = ProductReviewSerializer([self.review], many=True).data
         self.assertEqual(response.data["results"], serializer)
+
+    def test_product_list_filters(self):
+        response = self.client.get(
+            self.product_list,
+            data={
+                "cost_min": 10,
+                "cost_max": 100,
+                "status__in": MerchandiseStatus.OUT_OF_STOCK,
+                "warehouse__in": self.warehouse.id,
+                "supplier": self.supplier.id,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["results"], ProductSerializer([self.product], many=True).data
+        )
+        response = self.client.get(self.product_list, data={"ordering": "-cost"})
+        self.assertEqual(
+            [product["article"] for product in response.data["results"]],
+            [self.product1.article, self.product.article],
+        )
+
+    def test_product_rating(self):
+        self.assertEqual(self.product.rating_avg, Decimal("4"))
+        review = ProductReview.objects.create(
+            user=self.user, product=self.product, grades=1
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 2)
+        self.assertEqual(self.product.rating_avg, Decimal("2.5"))
+        self.assertEqual(self.product.rating_histogram, [0, 1, 0, 0, 1, 0])
+        review.grades = 2
+        review.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_avg, Decimal("3"))
+        self.assertEqual(self.product.rating_histogram, [0, 0, 1, 0, 1, 0])
+        self.review.delete()
+        review.delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 0)
+        self.assertEqual(self.product.rating_avg, Decimal("0"))
+        self.assertEqual(self.product.rating_histogram, [0] * 6)
+
+    def test_product_save_keeps_rating(self):
+        stale = Product.objects.get(article=self.product.article)
+        ProductReview.objects.create(user=self.user, product=self.product, grades=1)
+        stale.name = "Renamed"
+        stale.save()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.name, "Renamed")
+        self.assertEqual(self.product.rating_count, 2)
+        self.assertEqual(self.product.rating_histogram, [0, 1, 0, 0, 1, 0])
+
+    def test_product_rating_recompute(self):
+        Product.objects.update(rating_count=7, rating_avg=1, rating_grade_0=3)
+        call_command("recompute_product_ratings", chunk_size=1, stdout=StringIO())
+        self.product.refresh_from_db()
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product.rating_count, 1)
+        self.assertEqual(self.product.rating_avg, Decimal("4"))
+        self.assertEqual(self.product.rating_histogram, [0, 0, 0, 0, 1, 0])
+        self.assertEqual(self.product1.rating_count, 0)
+        self.assertEqual(self.product1.rating_histogram, [0] * 6)
+
+    def test_product_list_rating_ordering(self):
+        response = self.client.get(self.product_list, data={"ordering": "-rating"})
+        self.assertEqual(
+            [product["article"] for product in response.data["results"]],
+            [self.product.article, self.product1.article],
+        )
+
+    def test_product_list_cursor(self):
+        expected = list(
+            Product.objects.order_by("-created_at", "-article").values_list(
+                "article", flat=True
+            )
+        )
+        url, articles = f"{self.product_list}?pagination=cursor&limit=1", []
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("count", response.data)
+            articles += [product["article"] for product in response.data["results"]]
+            previous, url = response.data["previous"], response.data["next"]
+        self.assertEqual(articles, expected)
+        response = self.client.get(previous)
+        self.assertEqual(
+            [product["article"] for product in response.data["results"]],
+            expected[:1],
+        )
+
+    def test_product_list_invalid_cursor(self):
+        response = self.client.get(self.product_list, data={"cursor": "broken"})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_product_search(self):
+        Product.objects.create(
+            name="Плед",
+            description="Тёплый плед из шерсти",
+            warehouse=self.warehouse,
+            cost=Decimal("500"),
+            supplier=self.supplier,
+        )
+        response = self.client.get(self.product_list, data={"q": "шерстяные носки"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [product["article"] for product in response.data["results"]],
+            [self.product.article],
+        )
+        response = self.client.get(self.product_list, data={"q": "шерсть"})
+        names = [product["name"] for product in response.data["results"]]
+        self.assertEqual(len(names), 3)
+        self.assertEqual(names[0], self.product1.name)
+        self.assertEqual(names[-1], "Плед")
+
+    def test_product_search_typo(self):
+        response = self.client.get(self.product_list, data={"q": "Шерстянные"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["article"], self.product.article)
+
+    def test_product_search_cursor(self):
+        # The newest product is the weakest match.
+        plaid = Product.objects.create(
+            name="Плед",
+            description="Тёплый плед из шерсти",
+            warehouse=self.warehouse,
+            cost=Decimal("500"),
+            supplier=self.supplier,
+        )
+        query = urlencode({"q": "шерсть", "pagination": "cursor", "limit": 1})
+        url = f"{self.product_list}?{query}"
+        articles = []
+        while url:
+            response = self.client.get(url)
+            articles += [product["article"] for product in response.data["results"]]
+            url = response.data["next"]
+        # Pages follow relevance, as the offset list does.
+        response = self.client.get(self.product_list, data={"q": "шерсть"})
+        expected = [product["article"] for product in response.data["results"]]
+        self.assertEqual(
+            expected, [self.product1.article, self.product.article, plaid.article]
+        )
+        self.assertEqual(articles, expected)
+
+    def test_product_stock_shards(self):
+        Product.objects.filter(article=self.product1.article).update(amount=10)
+        product = Product.objects.set_stock_slots(self.product1.article, 4)
+        self.assertEqual(
+            list(
+                product.stock_shards.order_by("slot").values_list("amount", flat=True)
+            ),
+            [3, 3, 2, 2],
+        )
+        for _ in range(3):
+            self.assertIsNotNone(
+                Product.objects.reserve_stock(product.article, 3, slots=4)
+            )
+        self.assertIsNone(Product.objects.reserve_stock(product.article, 2, slots=4))
+        self.assertEqual(Product.objects.reserve_stock(product.article, 1, slots=4), 0)
+
+        Product.objects.consolidate_stock(product.article)
+        response = self.client.get(
+            reverse("product_retrieve", kwargs={"article": product.article})
+        )
+        self.assertEqual(response.data["amount"], 0)
+        self.assertEqual(response.data["status"], MerchandiseStatus.OUT_OF_STOCK)
+
+        Product.objects.release_stock(product.article, 5, slots=4)
+        self.assertEqual(Product.objects.consolidate_stock(), [product.article])
+        product = Product.objects.set_stock_slots(product.article, 0)
+        self.assertEqual(product.amount, 5)
+        self.assertFalse(product.stock_shards.exists())
+
+    def test_product_update_sharded_amount(self):
+        product = Product.objects.set_stock_slots(self.product1.article, 4)
+        response = self.client.patch(
+            reverse("product_update", kwargs={"article": product.article}),
+            data={
+                "amount": 20,
+                "cost": Decimal("150"),
+                "name": "Valun",
+                "warehouse": self.warehouse.id,
+                "supplier": self.supplier.id,
+            },
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        product.refresh_from_db()
+        self.assertEqual((product.name, product.amount), ("Valun", 20))
+        self.assertEqual(
+            list(
+                product.stock_shards.order_by("slot").values_list("amount", flat=True)
+            ),
+            [5, 5, 5, 5],
+        )
+        self.assertEqual(Product.objects.consolidate_stock(product.article), [])
+
+
+class ProductIndexTestCase(TestCase):
+    countries = ["RU", "BY", "KZ", "CN", "TR", "DE", "IT", "FR", "US", "JP"]
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(email="index@gmauk.com", is_active=True)
+        cls.warehouses = Warehouse.objects.bulk_create(
+            Warehouse(full_address=f"test{i}", region="tes3", country="Ru")
+            for i in range(20)
+        )
+        cls.suppliers = Supplier.objects.bulk_create(
+            Supplier(user=user, company_name=f"supplier{i}") for i in range(20)
+        )
+        Product.objects.bulk_create(
+            Product(
+                name=f"product {i} {i * 7919 % 104729}",
+                description=f"item number {i} from lot {i % 250}",
+                warehouse=cls.warehouses[i % 20],
+                supplier=cls.suppliers[i % 17],
+                status=MerchandiseStatus.ON_SALE
+                if i % 5
+                else MerchandiseStatus.OUT_OF_STOCK,
+                cost=Decimal(i % 997),
+                amount=i % 101,
+                country_of_production=cls.countries[i % 10],
+            )
+            for i in range(20000)
+        )
+        with connection.cursor() as cursor:
+            # Merge the GIN pending lists as autovacuum would on a live table.
+            for index in ("product_search_vector_idx", "product_name_trgm_idx"):
+                cursor.execute("SELECT gin_clean_pending_list(%s::regclass)", [index])
+            cursor.execute(f"ANALYZE {Product._meta.db_table}")
+
+    def test_filters_use_indexes(self):
+        filters = [
+            {},
+            {"cost_min": 100, "cost_max": 120},
+            {"status__in": MerchandiseStatus.ON_SALE},
+            {"status__in": MerchandiseStatus.OUT_OF_STOCK},
+            {"warehouse__in": f"{self.warehouses[0].id},{self.warehouses[1].id}"},
+            {"supplier": self.suppliers[3].id},
+            {"country_of_production": "KZ"},
+            {"q": "104703"},
+        ]
+        for params in filters:
+            for ordering in (None, "cost", "-created_at", "amount"):
+                data = dict(params, ordering=ordering) if ordering else params
+                view = ProductApiView(format_kwarg=None)
+                view.request = view.initialize_request(
+                    APIRequestFactory().get(reverse("product_list"), data)
+                )
+                queryset = view.filter_queryset(view.get_queryset())
+                pagination = KeysetPagination()
+                ordered = queryset.order_by(*pagination.get_ordering(queryset, view))
+                plan = ordered[: pagination.default_limit + 1].explain()
+                with self.subTest(data=data):
+                    # Offset pages need a unique last key as much as cursor pages.
+                    self.assertEqual(queryset.query.order_by[-1].lstrip("-"), "article")
+                    self.assertNotIn(f"Seq Scan on {Product._meta.db_table}", plan)
@@ -3,6 +3,7 @@ from django.urls import include, path
 from product.api.v1.views import (
     ProductApiView,
     ProductCreateApiView,
+    ProductExportApiView,
     ProductPhotoCreateApiView,
     ProductPhotoRetrieveApiView,
     ProductPhotoSupplyRetrieveApiView,
@@ -14,6 +15,7 @@ from product.api.v1.views import (
 
 urlpatterns = [
     path("list/", ProductApiView.as_view(), name="product_list"),
+    path("export/", ProductExportApiView.as_view(), name="product_export"),
     path("create/", ProductCreateApiView.as_view(), name="product_create"),
     path(
         "<int:article>/",
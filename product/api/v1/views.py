@@ -13,6 +13,9 @@ from rest_framework.response import Response
 
 from accounts.permissions import IsActive, IsManager, IsSupplier
 from marketplace import settings
+from marketplace.export import ExportMixin
+from marketplace.idempotency import IdempotencyMixin
+from marketplace.pagination import KeysetPagination
 from product.api.v1.filters import ProductFilter, ProductReviewFilter
 from product.api.v1.serializers import (
     ProductPhotoSerializers,
@@ -20,18 +23,42 @@ from product.api.v1.serializers import (
     ProductSerializer,
     ProductSerializerCreate,
 )
-from product.api.v1.utils import check_custom_permissions
+from product.cache import get_product_detail, get_product_reviews
 from product.models import Product, ProductPhoto, ProductReview
+from product.ownership import can_mutate
 
 
 class ProductApiView(ListAPIView):
     serializer_class = ProductSerializer
-    queryset = Product.objects.select_related("warehouse", "delivery_point", "supplier")
+    queryset = Product.objects.select_related(
+        "warehouse", "delivery_point", "supplier"
+    ).order_by("-created_at", "-article")
     filter_backends = (DjangoFilterBackend,)
     filterset_class = ProductFilter
+    pagination_class = KeysetPagination
+    cursor_ordering = ("-created_at", "-article")
+
+
+class ProductExportApiView(ExportMixin, ProductApiView):
+    export_name = "products"
+    export_fields = (
+        "article",
+        "name",
+        "warehouse",
+        "delivery_point",
+        "status",
+        "cost",
+        "amount",
+        "description",
+        "country_of_production",
+        "supplier",
+        "rating_avg",
+        "rating_count",
+        "created_at",
+    )
 
 
-class ProductCreateApiView(CreateAPIView):
+class ProductCreateApiView(IdempotencyMixin, CreateAPIView):
     permission_classes = [IsSupplier]
     serializer_class = ProductSerializerCreate
 
@@ -45,6 +72,14 @@ class ProductRetrieveApiView(RetrieveAPIView):
             article=self.kwargs["article"],
         )
 
+    def retrieve(self, request, *args, **kwargs):
+        data = get_product_detail(self.kwargs["article"], self.retrieve_uncached)
+        return Response(data)
+
+    def retrieve_uncached(self):
+        # The amount of sharded products is as of the last consolidation.
+        return self.get_serializer(self.get_object()).data
+
 
 class ProductRetrieveUpdateApiView(RetrieveUpdateDestroyAPIView):
     permission_classes = [IsSupplier | IsManager]
@@ -56,15 +91,14 @@ class ProductRetrieveUpdateApiView(RetrieveUpdateDestroyAPIView):
             article=self.kwargs["article"],
         )
 
-    def check_permissions(self, request, *args, **kwargs):
+    def get_owned_object(self):
         instance = self.get_object()
-        if not check_custom_permissions(user=request.user, article=instance.article):
+        if not can_mutate(self.request.user, instance.article):
             return None
-        else:
-            return instance
+        return instance
 
     def update(self, request, *args, **kwargs):
-        instance = self.check_permissions(request=request)
+        instance = self.get_owned_object()
         if not instance:
             return Response(status=status.HTTP_403_FORBIDDEN)
         serializer = self.get_serializer(instance, data=request.data)
@@ -73,7 +107,7 @@ class ProductRetrieveUpdateApiView(RetrieveUpdateDestroyAPIView):
         return Response({})
 
     def delete(self, request, *args, **kwargs):
-        instance = self.check_permissions(request=request)
+        instance = self.get_owned_object()
         if not instance:
             return Response(status=status.HTTP_403_FORBIDDEN)
         self.perform_destroy(instance)
@@ -91,8 +125,19 @@ class ProductReviewApiView(ListAPIView):
             "product",
         ).filter(product__article=self.kwargs.get("article"))
 
+    def list(self, request, *args, **kwargs):
+        data = get_product_reviews(
+            self.kwargs.get("article"),
+            request.get_full_path(),
+            lambda: self.list_uncached(request, *args, **kwargs),
+        )
+        return Response(data)
+
+    def list_uncached(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs).data
+
 
-class ProductReviewCreateApiView(CreateAPIView):
+class ProductReviewCreateApiView(IdempotencyMixin, CreateAPIView):
     permission_classes = [IsActive]
     serializer_class = ProductReviewSerializer
 
@@ -117,7 +162,7 @@ class ProductPhotoRetrieveApiView(ListAPIView):
         )
 
 
-class ProductPhotoCreateApiView(CreateAPIView):
+class ProductPhotoCreateApiView(IdempotencyMixin, CreateAPIView):
     serializer_class = ProductPhotoSerializers
     parser_classes = (
         MultiPartParser,
@@ -125,10 +170,8 @@ class ProductPhotoCreateApiView(CreateAPIView):
     )
     permission_classes = [IsSupplier]
 
-    def post(self, request, *args, **kwargs):
-        if not check_custom_permissions(
-            user=request.user, article=request.data.get("product")
-        ):
+    def create(self, request, *args, **kwargs):
+        if not can_mutate(request.user, request.data.get("product")):
             return Response({"error": "you_do_not_have_access_to_this_item"})
         if (
             ProductPhoto.objects.filter(product=request.data.get("product")).count()
@@ -137,7 +180,7 @@ class ProductPhotoCreateApiView(CreateAPIView):
             return Response(
                 {"error": "the_photo_limit_for_the_product_has_been_exceeded"}
             )
-        return self.create(request, *args, **kwargs)
+        return super().create(request, *args, **kwargs)
 
 
 class ProductPhotoSupplyRetrieveApiView(RetrieveDestroyAPIView):
@@ -152,18 +195,8 @@ class ProductPhotoSupplyRetrieveApiView(RetrieveDestroyAPIView):
             article=self.kwargs["article"],
         )
 
-    def check_permissions(self, request, *args, **kwargs):
-        instance = self.get_object()
-        if not instance:
-            Response({"error": "you_do_not_have_access_to_this_item"})
-        if not check_custom_permissions(user=request.user, article=instance.article):
-            Response({"error": "you_do_not_have_access_to_this_item"})
-        else:
-            return instance
-
     def delete(self, request, *args, **kwargs):
-        instance = self.check_permissions(request=request)
-        if not instance:
+        if not can_mutate(request.user, self.kwargs["article"]):
             return Response(status=status.HTTP_403_FORBIDDEN)
         try:
             photo_instance = ProductPhoto.objects.get(
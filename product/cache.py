@@ -0,0 +1,77 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+
+from marketplace import settings
+from marketplace.cache import SingleFlightCache, count
+
+PRODUCT_DETAIL_KEY = "product:detail:{article}:{version}"
+PRODUCT_DETAIL_VERSION_KEY = "product:detail:version:{article}"
+PRODUCT_DETAIL_STATS = "product:detail"
+PRODUCT_DETAIL_HITS = f"{PRODUCT_DETAIL_STATS}:hits"
+PRODUCT_DETAIL_MISSES = f"{PRODUCT_DETAIL_STATS}:misses"
+PRODUCT_REVIEWS_KEY = "product:reviews:{article}:{version}:{query}"
+PRODUCT_REVIEWS_VERSION_KEY = "product:reviews:version:{article}"
+
+product_detail_cache = SingleFlightCache(
+    timeout=settings.PRODUCT_CACHE_TIMEOUT,
+    stale_timeout=settings.PRODUCT_CACHE_STALE_TIMEOUT,
+    lock_timeout=settings.CACHE_LOCK_TIMEOUT,
+    stats_key=PRODUCT_DETAIL_STATS,
+)
+product_reviews_cache = SingleFlightCache(
+    timeout=settings.PRODUCT_CACHE_TIMEOUT,
+    stale_timeout=settings.PRODUCT_CACHE_STALE_TIMEOUT,
+    lock_timeout=settings.CACHE_LOCK_TIMEOUT,
+)
+
+
+def get_product_detail(article, loader):
+    version = cache.get_or_set(
+        PRODUCT_DETAIL_VERSION_KEY.format(article=article), 1, timeout=None
+    )
+    key = PRODUCT_DETAIL_KEY.format(article=article, version=version)
+    return product_detail_cache.get(key, lambda: dict(loader()))
+
+
+def invalidate_product_detail(article):
+    # Bumped only once the write is visible: a reader that loaded the old
+    # row before the commit cached it under the old version.
+    key = PRODUCT_DETAIL_VERSION_KEY.format(article=article)
+    transaction.on_commit(lambda: count(key))
+
+
+def get_product_reviews(article, query, loader):
+    version = cache.get_or_set(
+        PRODUCT_REVIEWS_VERSION_KEY.format(article=article), 1, timeout=None
+    )
+    key = PRODUCT_REVIEWS_KEY.format(
+        article=article,
+        version=version,
+        query=hashlib.md5(query.encode()).hexdigest(),
+    )
+    return product_reviews_cache.get(key, lambda: dict(loader()))
+
+
+def invalidate_product_reviews(article):
+    # Bumped only once the write is visible: a reader that loaded the old
+    # rows before the commit cached them under the old version.
+    key = PRODUCT_REVIEWS_VERSION_KEY.format(article=article)
+    transaction.on_commit(lambda: count(key))
+
+
+def get_product_detail_stats():
+    stats = cache.get_many([PRODUCT_DETAIL_HITS, PRODUCT_DETAIL_MISSES])
+    hits = stats.get(PRODUCT_DETAIL_HITS, 0)
+    misses = stats.get(PRODUCT_DETAIL_MISSES, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / total if total else 0,
+    }
+
+
+def reset_product_detail_stats():
+    cache.delete_many([PRODUCT_DETAIL_HITS, PRODUCT_DETAIL_MISSES])
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from product.cache import get_product_detail_stats, reset_product_detail_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the product detail cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters afterwards"
+        )
+
+    def handle(self, *args, **options):
+        stats = get_product_detail_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"hit_rate={stats['hit_rate']:.2%}"
+        )
+        if options["reset"]:
+            reset_product_detail_stats()
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from product.cache import invalidate_product_detail
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = "Split the stock of a product over N shard rows (0 turns sharding off)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("article", type=int)
+        parser.add_argument("slots", type=int)
+
+    def handle(self, *args, **options):
+        if options["slots"] < 0:
+            raise CommandError("slots must not be negative")
+        try:
+            product = Product.objects.set_stock_slots(
+                options["article"], options["slots"]
+            )
+        except Product.DoesNotExist:
+            raise CommandError(f"product {options['article']} does not exist")
+        invalidate_product_detail(product.article)
+        self.stdout.write(f"amount={product.amount} slots={product.stock_slots}")
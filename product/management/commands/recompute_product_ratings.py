@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = "Recompute product rating aggregates from reviews"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=10000, help="Articles per UPDATE"
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        updated = Product.objects.recompute_ratings(chunk_size=options["chunk_size"])
+        self.stdout.write(
+            f"repaired={updated} elapsed={time.monotonic() - started:.2f}s"
+        )
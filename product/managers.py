@@ -0,0 +1,317 @@
+import random
+
+from django.db import connection, models, transaction
+from django.db.models import DecimalField, F, Max, Min
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from marketplace.choices import MerchandiseStatus
+
+GRADES = range(6)
+
+RESERVE_STOCK_SQL = """
+UPDATE {product} SET
+    amount = amount - %(quantity)s,
+    status = CASE WHEN amount = %(quantity)s THEN %(out_of_stock)s ELSE status END,
+    updated_at = now()
+WHERE article = %(article)s AND amount >= %(quantity)s AND stock_slots = 0
+RETURNING amount
+"""
+
+RESERVE_SHARD_SQL = """
+UPDATE {shard} SET amount = amount - %(quantity)s
+WHERE id = (
+    SELECT id FROM {shard}
+    WHERE product_id = %(article)s AND amount >= %(quantity)s
+    ORDER BY slot < %(start)s, slot
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING amount
+"""
+
+CONSOLIDATE_STOCK_SQL = """
+UPDATE {product} AS product SET
+    amount = shard.amount,
+    status = CASE WHEN shard.amount = 0 THEN %(out_of_stock)s ELSE product.status END,
+    updated_at = now()
+FROM (
+    SELECT product_id, sum(amount) AS amount
+    FROM {shard}
+    WHERE {where}
+    GROUP BY product_id
+) AS shard
+WHERE product.article = shard.product_id AND product.amount <> shard.amount
+RETURNING product.article
+"""
+
+RESERVE_STOCK_LINES_SQL = """
+UPDATE {product} AS product SET
+    amount = product.amount - line.quantity,
+    status = CASE
+        WHEN product.amount = line.quantity THEN %(out_of_stock)s ELSE product.status
+    END,
+    updated_at = now()
+FROM (VALUES {lines}) AS line (article, quantity)
+WHERE product.article = line.article
+    AND product.amount >= line.quantity
+    AND product.stock_slots = 0
+RETURNING product.article, product.amount
+"""
+
+RECOMPUTE_RATINGS_SQL = """
+UPDATE {product} AS product SET
+    rating_count = rating.count,
+    rating_sum = rating.total,
+    rating_avg = rating.avg,
+    {grade_assignments}
+FROM (
+    SELECT
+        source.article,
+        coalesce(review.count, 0) AS count,
+        coalesce(review.total, 0) AS total,
+        coalesce(round(review.total::numeric / review.count, 2), 0) AS avg,
+        {grade_columns}
+    FROM {product} AS source
+    LEFT JOIN (
+        SELECT
+            product_id,
+            count(*) AS count,
+            sum(grades) AS total,
+            {grade_counts}
+        FROM {review}
+        WHERE product_id >= %(start)s AND product_id < %(stop)s
+        GROUP BY product_id
+    ) AS review ON review.product_id = source.article
+    WHERE source.article >= %(start)s AND source.article < %(stop)s
+) AS rating
+WHERE product.article = rating.article
+    AND (
+        product.rating_count, product.rating_sum, product.rating_avg, {grade_fields}
+    ) IS DISTINCT FROM (rating.count, rating.total, rating.avg, {grade_values})
+"""
+
+
+class ProductManager(models.Manager):
+    @property
+    def shard_model(self):
+        return self.model._meta.apps.get_model("product", "ProductStockShard")
+
+    def reserve_stock(self, article, quantity, slots=0):
+        """
+        Take ``quantity`` units of ``article`` in one conditional UPDATE.
+
+        Returns the remaining amount, or None when there is not enough stock.
+        The row lock is held until the surrounding transaction ends. Products
+        with ``slots`` take the stock from one of their shards instead.
+        """
+        if slots:
+            return self.reserve_shard_stock(article, quantity, slots)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                RESERVE_STOCK_SQL.format(product=self.model._meta.db_table),
+                {
+                    "article": article,
+                    "quantity": quantity,
+                    "out_of_stock": MerchandiseStatus.OUT_OF_STOCK,
+                },
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def reserve_shard_stock(self, article, quantity, slots):
+        """
+        Take stock from a random shard, skipping shards locked by other orders.
+
+        Falls back to spreading the quantity over all shards when no single
+        free shard holds enough. Returns the amount left in the shards taken
+        from, or None when there is not enough stock.
+        """
+        shard_model = self.shard_model
+        with connection.cursor() as cursor:
+            cursor.execute(
+                RESERVE_SHARD_SQL.format(shard=shard_model._meta.db_table),
+                {
+                    "article": article,
+                    "quantity": quantity,
+                    "start": random.randrange(slots),
+                },
+            )
+            row = cursor.fetchone()
+        if row:
+            return row[0]
+
+        shards = list(
+            shard_model.objects.select_for_update()
+            .filter(product_id=article)
+            .order_by("slot")
+        )
+        left = sum(shard.amount for shard in shards) - quantity
+        if not shards or left < 0:
+            return None
+        for shard in shards:
+            taken = min(shard.amount, quantity)
+            if taken:
+                shard_model.objects.filter(id=shard.id).update(
+                    amount=F("amount") - taken
+                )
+                quantity -= taken
+        return left
+
+    def release_stock(self, article, quantity, slots=0):
+        """Put ``quantity`` units of ``article`` back, into a random shard if sharded."""
+        if slots:
+            return self.shard_model.objects.filter(
+                product_id=article, slot=random.randrange(slots)
+            ).update(amount=F("amount") + quantity)
+        return self.filter(article=article).update(amount=F("amount") + quantity)
+
+    def set_stock_slots(self, article, slots, amount=None):
+        """
+        Split the stock of ``article`` over ``slots`` shard rows, or fold it
+        back into ``Product.amount`` when ``slots`` is 0. ``amount`` replaces
+        the current stock instead of keeping it.
+        """
+        shard_model = self.shard_model
+        with transaction.atomic():
+            product = self.select_for_update().get(article=article)
+            shards = shard_model.objects.select_for_update().filter(product_id=article)
+            total = product.amount
+            if product.stock_slots:
+                total = sum(shard.amount for shard in shards.order_by("slot"))
+            if amount is not None:
+                total = amount
+            shards.delete()
+            shard_model.objects.bulk_create(
+                shard_model(
+                    product_id=article,
+                    slot=slot,
+                    amount=total // slots + (slot < total % slots),
+                )
+                for slot in range(slots)
+            )
+            product.amount = total
+            product.stock_slots = slots
+            if not total:
+                product.status = MerchandiseStatus.OUT_OF_STOCK
+            product.save(
+                update_fields=["amount", "stock_slots", "status", "updated_at"]
+            )
+        return product
+
+    def consolidate_stock(self, article=None):
+        """
+        Copy the shard totals of sharded products back to ``amount`` and
+        ``status``. Returns the articles that changed.
+        """
+        where, params = "TRUE", {}
+        if article is not None:
+            where, params = "product_id = %(article)s", {"article": article}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                CONSOLIDATE_STOCK_SQL.format(
+                    product=self.model._meta.db_table,
+                    shard=self.shard_model._meta.db_table,
+                    where=where,
+                ),
+                {"out_of_stock": MerchandiseStatus.OUT_OF_STOCK, **params},
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def reserve_stock_lines(self, quantities):
+        """
+        Take stock for several products at once; ``quantities`` maps article
+        to quantity.
+
+        Rows are locked in article order first, so concurrent calls can't
+        deadlock, then decremented by one UPDATE. Sharded products are taken
+        from their shards without locking the product row. Returns the
+        remaining amount per reserved article; articles missing from the
+        result lacked stock.
+        """
+        slots = dict(
+            self.filter(article__in=quantities, stock_slots__gt=0).values_list(
+                "article", "stock_slots"
+            )
+        )
+        articles = sorted(set(quantities) - set(slots))
+        reserved = {}
+        if articles:
+            list(
+                self.select_for_update()
+                .filter(article__in=articles)
+                .order_by("article")
+                .values_list("article", flat=True)
+            )
+            params = {"out_of_stock": MerchandiseStatus.OUT_OF_STOCK}
+            lines = []
+            for index, article in enumerate(articles):
+                lines.append(
+                    f"(%(article_{index})s::integer, %(quantity_{index})s::integer)"
+                )
+                params[f"article_{index}"] = article
+                params[f"quantity_{index}"] = quantities[article]
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    RESERVE_STOCK_LINES_SQL.format(
+                        product=self.model._meta.db_table, lines=", ".join(lines)
+                    ),
+                    params,
+                )
+                reserved.update(cursor.fetchall())
+        for article in sorted(slots):
+            amount = self.reserve_shard_stock(
+                article, quantities[article], slots[article]
+            )
+            if amount is not None:
+                reserved[article] = amount
+        return reserved
+
+    def apply_review(self, article, grades, delta):
+        """
+        Add (``delta=1``) or remove (``delta=-1``) one review grade from the
+        product rating in a single UPDATE.
+        """
+        count = F("rating_count") + delta
+        total = F("rating_sum") + grades * delta
+        grade_field = f"rating_grade_{grades}"
+        return self.filter(article=article).update(
+            rating_count=count,
+            rating_sum=total,
+            rating_avg=Coalesce(
+                Cast(total, DecimalField(max_digits=12, decimal_places=2))
+                / NullIf(count, 0),
+                0,
+                output_field=DecimalField(max_digits=3, decimal_places=2),
+            ),
+            **{grade_field: F(grade_field) + delta},
+        )
+
+    def recompute_ratings(self, chunk_size=10000):
+        """Rebuild every product rating from reviews, ``chunk_size`` articles at a time."""
+        review = self.model._meta.apps.get_model("product", "ProductReview")
+        sql = RECOMPUTE_RATINGS_SQL.format(
+            product=self.model._meta.db_table,
+            review=review._meta.db_table,
+            grade_assignments=", ".join(
+                f"rating_grade_{grade} = rating.grade_{grade}" for grade in GRADES
+            ),
+            grade_columns=", ".join(
+                f"coalesce(review.grade_{grade}, 0) AS grade_{grade}"
+                for grade in GRADES
+            ),
+            grade_counts=", ".join(
+                f"count(*) FILTER (WHERE grades = {grade}) AS grade_{grade}"
+                for grade in GRADES
+            ),
+            grade_fields=", ".join(f"product.rating_grade_{grade}" for grade in GRADES),
+            grade_values=", ".join(f"rating.grade_{grade}" for grade in GRADES),
+        )
+        bounds = self.aggregate(start=Min("article"), stop=Max("article"))
+        if bounds["start"] is None:
+            return 0
+        updated = 0
+        with connection.cursor() as cursor:
+            for start in range(bounds["start"], bounds["stop"] + 1, chunk_size):
+                cursor.execute(sql, {"start": start, "stop": start + chunk_size})
+                updated += cursor.rowcount
+        return updated
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('product', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                fields=['created_at', 'article'], name='product_created_article_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:50
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_VECTOR_SQL = """
+CREATE FUNCTION product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description, search_vector
+    ON product_product
+    FOR EACH ROW EXECUTE FUNCTION product_search_vector_update();
+
+UPDATE product_product SET search_vector = NULL;
+"""
+
+DROP_SEARCH_VECTOR_SQL = """
+DROP TRIGGER IF EXISTS product_search_vector_trigger ON product_product;
+DROP FUNCTION IF EXISTS product_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('product', '0003_product_created_article_idx'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunSQL(SEARCH_VECTOR_SQL, DROP_SEARCH_VECTOR_SQL),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['search_vector'], name='product_search_vector_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['name'],
+                name='product_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('product', '0004_product_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                fields=['cost', 'article'], name='product_cost_article_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                fields=['amount', 'article'], name='product_amount_article_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                fields=['status', 'created_at', 'article'],
+                name='product_status_created_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                condition=models.Q(('status', 'on_sale')),
+                fields=['cost', 'article'],
+                name='product_on_sale_cost_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                condition=models.Q(('status', 'on_sale')),
+                fields=['created_at', 'article'],
+                name='product_on_sale_created_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                fields=['country_of_production'], name='product_country_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:57
+
+from django.db import migrations, models
+
+BACKFILL_RATINGS_SQL = """
+UPDATE product_product AS product SET
+    rating_count = review.count,
+    rating_sum = review.total,
+    rating_avg = round(review.total::numeric / review.count, 2),
+    rating_grade_0 = review.grade_0,
+    rating_grade_1 = review.grade_1,
+    rating_grade_2 = review.grade_2,
+    rating_grade_3 = review.grade_3,
+    rating_grade_4 = review.grade_4,
+    rating_grade_5 = review.grade_5
+FROM (
+    SELECT
+        product_id,
+        count(*) AS count,
+        sum(grades) AS total,
+        count(*) FILTER (WHERE grades = 0) AS grade_0,
+        count(*) FILTER (WHERE grades = 1) AS grade_1,
+        count(*) FILTER (WHERE grades = 2) AS grade_2,
+        count(*) FILTER (WHERE grades = 3) AS grade_3,
+        count(*) FILTER (WHERE grades = 4) AS grade_4,
+        count(*) FILTER (WHERE grades = 5) AS grade_5
+    FROM product_productreview
+    GROUP BY product_id
+) AS review
+WHERE product.article = review.product_id
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('product', '0005_product_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_avg',
+            field=models.DecimalField(
+                decimal_places=2, default=0, editable=False, max_digits=3
+            ),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_grade_0',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_grade_1',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_grade_2',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_grade_3',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_grade_4',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_grade_5',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_RATINGS_SQL, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(
+                fields=['rating_avg', 'article'], name='product_rating_article_idx'
+            ),
+        ),
+    ]
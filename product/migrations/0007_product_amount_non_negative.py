@@ -0,0 +1,26 @@
+# Generated by Django 4.2.6 on 2026-10-18 18:59
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('product', '0006_product_ratings'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='amount',
+            field=models.IntegerField(
+                default=0, validators=[django.core.validators.MinValueValidator(0)]
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.CheckConstraint(
+                check=models.Q(('amount__gte', 0)), name='product_amount_non_negative'
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.6 on 2026-10-18 19:03
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('product', '0007_product_amount_non_negative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stock_slots',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ProductStockShard',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('slot', models.PositiveSmallIntegerField()),
+                (
+                    'amount',
+                    models.IntegerField(
+                        default=0,
+                        validators=[django.core.validators.MinValueValidator(0)],
+                    ),
+                ),
+                (
+                    'product',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='stock_shards',
+                        to='product.product',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'product_stock_shard',
+                'verbose_name_plural': 'product_stock_shards',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productstockshard',
+            constraint=models.UniqueConstraint(
+                fields=('product', 'slot'), name='product_stock_shard_slot_unique'
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='productstockshard',
+            constraint=models.CheckConstraint(
+                check=models.Q(('amount__gte', 0)),
+                name='product_stock_shard_non_negative',
+            ),
+        ),
+    ]
@@ -1,9 +1,19 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django_countries.fields import CountryField
 
 from marketplace.choices import MerchandiseStatus
 from marketplace.models import CreatedUpdatedModel
+from product.managers import GRADES, ProductManager
+
+# Columns kept current by single UPDATE statements in ProductManager; a full
+# save of an instance loaded earlier would write stale values back over them.
+MANAGED_FIELDS = frozenset(
+    ["rating_avg", "rating_count", "rating_sum", "stock_slots"]
+    + [f"rating_grade_{grade}" for grade in GRADES]
+)
 
 
 class Product(CreatedUpdatedModel):
@@ -18,19 +28,124 @@ class Product(CreatedUpdatedModel):
         max_length=32,
     )
     cost = models.DecimalField(decimal_places=8, max_digits=20)
-    amount = models.IntegerField(default=0)
+    amount = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     article = models.AutoField(primary_key=True, auto_created=True)
     description = models.TextField(default="")
     country_of_production = CountryField(null=True, blank=True, default="Ru")
     supplier = models.ForeignKey("accounts.Supplier", on_delete=models.PROTECT)
+    # Filled by the product_search_vector_trigger from name and description.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Review aggregates, maintained by ProductManager.apply_review.
+    rating_avg = models.DecimalField(
+        decimal_places=2, max_digits=3, default=0, editable=False
+    )
+    rating_count = models.IntegerField(default=0, editable=False)
+    rating_sum = models.IntegerField(default=0, editable=False)
+    rating_grade_0 = models.IntegerField(default=0, editable=False)
+    rating_grade_1 = models.IntegerField(default=0, editable=False)
+    rating_grade_2 = models.IntegerField(default=0, editable=False)
+    rating_grade_3 = models.IntegerField(default=0, editable=False)
+    rating_grade_4 = models.IntegerField(default=0, editable=False)
+    rating_grade_5 = models.IntegerField(default=0, editable=False)
+    # Number of ProductStockShard rows holding the stock; 0 keeps it in amount.
+    stock_slots = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    objects = ProductManager()
 
     class Meta:
         verbose_name = "product"
         verbose_name_plural = "products"
+        indexes = [
+            models.Index(
+                fields=["created_at", "article"], name="product_created_article_idx"
+            ),
+            models.Index(fields=["cost", "article"], name="product_cost_article_idx"),
+            models.Index(
+                fields=["amount", "article"], name="product_amount_article_idx"
+            ),
+            models.Index(
+                fields=["status", "created_at", "article"],
+                name="product_status_created_idx",
+            ),
+            models.Index(
+                fields=["cost", "article"],
+                condition=models.Q(status=MerchandiseStatus.ON_SALE),
+                name="product_on_sale_cost_idx",
+            ),
+            models.Index(
+                fields=["created_at", "article"],
+                condition=models.Q(status=MerchandiseStatus.ON_SALE),
+                name="product_on_sale_created_idx",
+            ),
+            models.Index(fields=["country_of_production"], name="product_country_idx"),
+            models.Index(
+                fields=["rating_avg", "article"], name="product_rating_article_idx"
+            ),
+            GinIndex(fields=["search_vector"], name="product_search_vector_idx"),
+            GinIndex(
+                fields=["name"],
+                opclasses=["gin_trgm_ops"],
+                name="product_name_trgm_idx",
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(amount__gte=0), name="product_amount_non_negative"
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in MANAGED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def rating_histogram(self):
+        return [getattr(self, f"rating_grade_{grade}") for grade in range(6)]
+
+
+class ProductStockShard(models.Model):
+    """
+    One slice of the stock of a sharded product.
+
+    Orders decrement a random shard, so a hot product is not serialized on
+    a single row lock. ``ProductManager.consolidate_stock`` sums the shards
+    back into ``Product.amount``.
+    """
+
+    product = models.ForeignKey(
+        "product.Product", on_delete=models.CASCADE, related_name="stock_shards"
+    )
+    slot = models.PositiveSmallIntegerField()
+    amount = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+
+    class Meta:
+        verbose_name = "product_stock_shard"
+        verbose_name_plural = "product_stock_shards"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "slot"], name="product_stock_shard_slot_unique"
+            ),
+            models.CheckConstraint(
+                check=models.Q(amount__gte=0), name="product_stock_shard_non_negative"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} stock slot {self.slot}"
+
 
 class ProductPhoto(CreatedUpdatedModel):
     product = models.ForeignKey("product.Product", on_delete=models.CASCADE)
@@ -0,0 +1,39 @@
+from accounts.roles import get_roles
+from marketplace.choices import PositionsStatus
+from product.models import Product
+
+# Staff allowed to change any product.
+MANAGING_JOB_TITLES = frozenset({PositionsStatus.MANAGER, PositionsStatus.SUPER_USER})
+
+
+def manages_catalog(user):
+    return not get_roles(user).job_titles.isdisjoint(MANAGING_JOB_TITLES)
+
+
+def can_mutate(user, article):
+    """Whether ``user`` may change the product ``article``."""
+    try:
+        article = int(article)
+    except (TypeError, ValueError):
+        return False
+    if manages_catalog(user):
+        return True
+    suppliers = get_roles(user).suppliers
+    if not suppliers:
+        return False
+    return Product.objects.filter(article=article, supplier_id__in=suppliers).exists()
+
+
+def mutable_articles(user, articles):
+    """The subset of ``articles`` that ``user`` may change, in one query at most."""
+    articles = set(articles)
+    if manages_catalog(user):
+        return articles
+    suppliers = get_roles(user).suppliers
+    if not suppliers or not articles:
+        return set()
+    return set(
+        Product.objects.filter(
+            article__in=articles, supplier_id__in=suppliers
+        ).values_list("article", flat=True)
+    )
@@ -0,0 +1,45 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from product.cache import invalidate_product_detail, invalidate_product_reviews
+from product.models import Product, ProductReview
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    invalidate_product_detail(instance.article)
+
+
+@receiver(post_save, sender=ProductReview)
+@receiver(post_delete, sender=ProductReview)
+def invalidate_product_reviews_cache(sender, instance, **kwargs):
+    invalidate_product_reviews(instance.product_id)
+    # The rating aggregates are part of the product detail payload.
+    invalidate_product_detail(instance.product_id)
+
+
+@receiver(pre_save, sender=ProductReview)
+def remember_review_grade(sender, instance, **kwargs):
+    instance.previous_rating = (
+        ProductReview.objects.filter(pk=instance.pk)
+        .values_list("product_id", "grades")
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=ProductReview)
+def add_review_grade(sender, instance, **kwargs):
+    previous = getattr(instance, "previous_rating", None)
+    if previous == (instance.product_id, instance.grades):
+        return
+    if previous:
+        Product.objects.apply_review(*previous, delta=-1)
+    Product.objects.apply_review(instance.product_id, instance.grades, delta=1)
+
+
+@receiver(post_delete, sender=ProductReview)
+def remove_review_grade(sender, instance, **kwargs):
+    Product.objects.apply_review(instance.product_id, instance.grades, delta=-1)
@@ -0,0 +1,243 @@
+"""
+Stock reservations held in Redis.
+
+``stock:available:{article}`` is the amount still free for new holds and
+``stock:held:{article}`` the amount held by orders not yet written to
+Postgres, so ``available == Product.amount - held`` whenever nothing drifts.
+Each hold is a hash ``stock:hold:{id}`` plus a member of the ``stock:holds``
+ZSET scored by its deadline; whoever removes it from the ZSET first (the
+order writer or the expiry sweeper) owns it, and moves it to the
+``stock:claimed`` set until it is finished or released. The hash keeps the
+hold's ``status`` for clients to poll. Postgres stays the source of
+truth: the writer still decrements ``Product.amount`` conditionally, and
+``reconcile`` resets the counters when they drift.
+"""
+import time
+from uuid import uuid4
+
+from marketplace import settings
+from marketplace.redis import client
+
+AVAILABLE_KEY = "stock:available:{article}"
+HELD_KEY = "stock:held:{article}"
+HOLD_KEY = "stock:hold:{hold}"
+HOLDS_KEY = "stock:holds"
+CLAIMED_KEY = "stock:claimed"
+
+RESERVE_SCRIPT = client.register_script(
+    """
+    local available = redis.call('GET', KEYS[1])
+    if not available then
+        return -1
+    end
+    local quantity = tonumber(ARGV[1])
+    if tonumber(available) < quantity then
+        return 0
+    end
+    redis.call('DECRBY', KEYS[1], quantity)
+    redis.call('INCRBY', KEYS[2], quantity)
+    redis.call('HSET', KEYS[3], unpack(ARGV, 5))
+    redis.call('EXPIRE', KEYS[3], ARGV[4])
+    redis.call('ZADD', KEYS[4], ARGV[2], ARGV[3])
+    return 1
+    """
+)
+
+LOAD_SCRIPT = client.register_script(
+    """
+    if redis.call('EXISTS', KEYS[1]) == 0 then
+        local held = tonumber(redis.call('GET', KEYS[2]) or '0')
+        redis.call('SET', KEYS[1], tonumber(ARGV[1]) - held)
+    end
+    """
+)
+
+CLAIM_SCRIPT = client.register_script(
+    """
+    if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+        return nil
+    end
+    if redis.call('EXISTS', KEYS[2]) == 0 then
+        return nil
+    end
+    redis.call('SADD', KEYS[3], ARGV[1])
+    redis.call('HSET', KEYS[2], 'status', 'claimed')
+    return redis.call('HGETALL', KEYS[2])
+    """
+)
+
+FINISH_SCRIPT = client.register_script(
+    """
+    redis.call('DECRBY', KEYS[1], ARGV[1])
+    redis.call('SREM', KEYS[3], ARGV[2])
+    if redis.call('EXISTS', KEYS[2]) == 1 then
+        redis.call('HSET', KEYS[2], 'status', 'ordered', 'order', ARGV[3])
+    end
+    """
+)
+
+RELEASE_SCRIPT = client.register_script(
+    """
+    if redis.call('EXISTS', KEYS[1]) == 1 then
+        redis.call('INCRBY', KEYS[1], ARGV[1])
+    end
+    redis.call('DECRBY', KEYS[2], ARGV[1])
+    redis.call('SREM', KEYS[4], ARGV[2])
+    if redis.call('EXISTS', KEYS[3]) == 1 then
+        redis.call('HSET', KEYS[3], 'status', 'released')
+    end
+    """
+)
+
+RECONCILE_SCRIPT = client.register_script(
+    """
+    local held = {}
+    local function count(hold)
+        local fields = redis.call('HMGET', ARGV[1] .. hold, 'article', 'quantity')
+        if fields[1] then
+            held[fields[1]] = (held[fields[1]] or 0) + tonumber(fields[2])
+        end
+        return fields[1]
+    end
+    for _, hold in ipairs(redis.call('ZRANGE', KEYS[1], 0, -1)) do
+        count(hold)
+    end
+    -- Claimed holds are still held until their writer finishes or releases
+    -- them; those whose hash expired were lost by a crashed worker.
+    for _, hold in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+        if not count(hold) then
+            redis.call('SREM', KEYS[2], hold)
+        end
+    end
+    local drifted = {}
+    for i = 4, #ARGV, 2 do
+        local article = ARGV[i]
+        local available_key = ARGV[2] .. article
+        local available = redis.call('GET', available_key)
+        local expected = tonumber(ARGV[i + 1]) - (held[article] or 0)
+        redis.call('SET', ARGV[3] .. article, held[article] or 0)
+        if available and tonumber(available) ~= expected then
+            redis.call('SET', available_key, expected)
+            table.insert(drifted, article)
+            table.insert(drifted, tonumber(available) - expected)
+        end
+    end
+    return drifted
+    """
+)
+
+
+def stock_keys(article):
+    return AVAILABLE_KEY.format(article=article), HELD_KEY.format(article=article)
+
+
+def reserve(article, quantity, amount_loader, **payload):
+    """
+    Hold ``quantity`` units of ``article`` for ``settings.STOCK_HOLD_TIMEOUT``
+    seconds. ``amount_loader`` returns ``Product.amount`` and is only called
+    when Redis doesn't track the article yet. Returns the hold id, or None
+    when there is not enough stock.
+    """
+    hold = uuid4().hex
+    fields = {"article": article, "quantity": quantity, "status": "pending", **payload}
+    keys = [*stock_keys(article), HOLD_KEY.format(hold=hold), HOLDS_KEY]
+    args = [
+        quantity,
+        time.time() + settings.STOCK_HOLD_TIMEOUT,
+        hold,
+        # Outlives the hold, so a claimed hold lost by a crashed worker is dropped.
+        settings.STOCK_HOLD_TIMEOUT * 10,
+    ]
+    for name, value in fields.items():
+        args += [name, value]
+    result = RESERVE_SCRIPT(keys=keys, args=args)
+    if result == -1:
+        LOAD_SCRIPT(keys=stock_keys(article), args=[amount_loader()])
+        result = RESERVE_SCRIPT(keys=keys, args=args)
+    return hold if result == 1 else None
+
+
+def pending_holds(limit):
+    """Ids of unexpired holds, oldest first."""
+    return client.zrangebyscore(HOLDS_KEY, time.time(), "+inf", start=0, num=limit)
+
+
+def expired_holds(limit):
+    return client.zrangebyscore(HOLDS_KEY, "-inf", time.time(), start=0, num=limit)
+
+
+def claim(hold):
+    """Take ownership of a hold; returns its fields, or None if already taken."""
+    fields = CLAIM_SCRIPT(
+        keys=[HOLDS_KEY, HOLD_KEY.format(hold=hold), CLAIMED_KEY], args=[hold]
+    )
+    if not fields:
+        return None
+    fields = dict(zip(fields[::2], fields[1::2]))
+    for name in ("article", "quantity"):
+        fields[name] = int(fields[name])
+    return fields
+
+
+def finish(hold, fields, order):
+    """Mark a claimed hold as ``order`` once that is written to Postgres."""
+    FINISH_SCRIPT(
+        keys=[
+            stock_keys(fields["article"])[1],
+            HOLD_KEY.format(hold=hold),
+            CLAIMED_KEY,
+        ],
+        args=[fields["quantity"], hold, order],
+    )
+
+
+def release(hold, fields):
+    """Return the stock of a claimed hold that won't become an order."""
+    RELEASE_SCRIPT(
+        keys=[*stock_keys(fields["article"]), HOLD_KEY.format(hold=hold), CLAIMED_KEY],
+        args=[fields["quantity"], hold],
+    )
+
+
+def hold_status(hold):
+    """
+    ``{"user", "status", "order"}`` of a hold, or None once it is unknown.
+
+    ``status`` goes from pending to claimed, then to ordered or released.
+    """
+    user, status, order = client.hmget(
+        HOLD_KEY.format(hold=hold), "user", "status", "order"
+    )
+    if status is None:
+        return None
+    return {
+        "user": int(user) if user else None,
+        "status": status,
+        "order": int(order) if order else None,
+    }
+
+
+def tracked_articles():
+    prefix = AVAILABLE_KEY.format(article="")
+    return [int(key[len(prefix) :]) for key in client.scan_iter(f"{prefix}*")]
+
+
+def reconcile(amounts):
+    """
+    Recount the held stock from the pending and claimed holds and reset the
+    available counters from ``amounts`` (article to ``Product.amount``).
+    A claimed hold whose order is already committed is counted twice until
+    it is finished, which only understates ``available`` until the next run.
+
+    Returns the drift found per article. Runs as one script, so no hold can
+    be placed halfway through.
+    """
+    args = [
+        HOLD_KEY.format(hold=""),
+        AVAILABLE_KEY.format(article=""),
+        HELD_KEY.format(article=""),
+    ]
+    for article, amount in amounts.items():
+        args += [article, amount]
+    drifted = RECONCILE_SCRIPT(keys=[HOLDS_KEY, CLAIMED_KEY], args=args)
+    return {int(article): drift for article, drift in zip(drifted[::2], drifted[1::2])}
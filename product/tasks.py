@@ -0,0 +1,38 @@
+import logging
+
+from marketplace import settings
+from marketplace.celery_app import app
+from product import stock
+from product.cache import invalidate_product_detail
+from product.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+@app.task
+def consolidate_product_stock():
+    for article in Product.objects.consolidate_stock():
+        invalidate_product_detail(article)
+
+
+@app.task
+def release_expired_stock_holds(batch_size=None):
+    released = 0
+    for hold in stock.expired_holds(batch_size or settings.STOCK_HOLD_BATCH_SIZE):
+        fields = stock.claim(hold)
+        if fields:
+            stock.release(hold, fields)
+            released += 1
+    return released
+
+
+@app.task
+def reconcile_stock(articles=None):
+    articles = stock.tracked_articles() if articles is None else articles
+    amounts = dict(
+        Product.objects.filter(article__in=articles).values_list("article", "amount")
+    )
+    drifted = stock.reconcile(amounts)
+    if drifted:
+        logger.warning("Reset drifted Redis stock: %s", drifted)
+    return drifted
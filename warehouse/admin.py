@@ -1,6 +1,11 @@
 from django.contrib import admin
 
-from warehouse.models import DeliveryPoint, OrderingGoods, Warehouse
+from warehouse.models import (
+    DeliveryPoint,
+    OrderingGoods,
+    OrderingGoodsArchive,
+    Warehouse,
+)
 
 
 @admin.register(Warehouse)
@@ -35,3 +40,8 @@ class DeliveryPointAdmin(admin.ModelAdmin):
 @admin.register(OrderingGoods)
 class OrderingGoodsAdmin(admin.ModelAdmin):
     list_display = ["id", "delivery_point", "product", "quantity", "status"]
+
+
+@admin.register(OrderingGoodsArchive)
+class OrderingGoodsArchiveAdmin(admin.ModelAdmin):
+    list_display = ["id", "delivery_point", "product", "quantity", "status"]
@@ -0,0 +1,11 @@
+from django_filters import filters
+from django_filters.filterset import FilterSet
+
+
+class SupplierSalesFilter(FilterSet):
+    """Filters both rollup tables; ``end`` is exclusive."""
+
+    start = filters.DateFilter(field_name="bucket", lookup_expr="gte")
+    end = filters.DateFilter(field_name="bucket", lookup_expr="lt")
+    product = filters.NumberFilter(field_name="product")
+    warehouse = filters.NumberFilter(field_name="warehouse")
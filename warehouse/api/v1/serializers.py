@@ -1,9 +1,22 @@
+from collections import Counter
+
+from django.db import transaction
 from rest_framework import serializers
 
 from accounts.models import User
-from marketplace.choices import MerchandiseStatus
+from marketplace import settings
+from marketplace.choices import MerchandiseStatus, SupplyStatus
+from product import stock
+from product.cache import invalidate_product_detail
 from product.models import Product
-from warehouse.models import DeliveryPoint, OrderingGoods, Warehouse
+from warehouse import queue
+from warehouse.models import (
+    DeliveryPoint,
+    DeliveryPointInventory,
+    OrderingGoods,
+    Warehouse,
+    WarehouseInventory,
+)
 
 
 class WarehouseSerializer(serializers.ModelSerializer):
@@ -91,11 +104,58 @@ class OrderingGoodsSerializer(serializers.ModelSerializer):
         read_only_fields = ("id", "delivery_point", "product", "quantity")
 
 
+class OrderingGoodsHistorySerializer(serializers.Serializer):
+    """Serializes the ``values()`` rows of live and archived orders alike."""
+
+    id = serializers.IntegerField()
+    delivery_point = serializers.IntegerField()
+    product = serializers.IntegerField()
+    quantity = serializers.IntegerField()
+    status = serializers.CharField()
+
+
+class WarehouseInventorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WarehouseInventory
+        fields = (
+            "warehouse",
+            "sku_count",
+            "units",
+            "out_of_stock",
+            "stock_value",
+            "updated_at",
+        )
+
+
+class DeliveryPointInventorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DeliveryPointInventory
+        fields = (
+            "delivery_point",
+            "sku_count",
+            "units",
+            "out_of_stock",
+            "stock_value",
+            "updated_at",
+        )
+
+
+class SupplierSalesSerializer(serializers.Serializer):
+    bucket = serializers.ReadOnlyField()
+    product = serializers.IntegerField(source="product_id")
+    warehouse = serializers.IntegerField(source="warehouse_id")
+    orders = serializers.IntegerField()
+    units = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=28, decimal_places=8)
+    cancelled_orders = serializers.IntegerField()
+    cancelled_units = serializers.IntegerField()
+
+
 class OrderingGoodsCreateSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(
         required=True, queryset=User.objects.all()
     )
-    quantity = serializers.IntegerField(required=True)
+    quantity = serializers.IntegerField(required=True, min_value=1)
     delivery_point = serializers.PrimaryKeyRelatedField(
         required=True, queryset=DeliveryPoint.objects.all()
     )
@@ -116,16 +176,110 @@ class OrderingGoodsCreateSerializer(serializers.ModelSerializer):
 
     @staticmethod
     def quantity_check(product, quantity):
-        if quantity > product.amount:
+        # Check and decrement in one statement, so concurrent orders can't oversell.
+        amount = Product.objects.reserve_stock(
+            product.article, quantity, slots=product.stock_slots
+        )
+        if amount is None:
             raise serializers.ValidationError({"error": "not_enough_product"})
-        product.amount -= quantity
-        if product.amount == 0:
-            product.status = MerchandiseStatus.OUT_OF_STOCK
-        product.save()
+        if not product.stock_slots:
+            product.amount = amount
+            if amount == 0:
+                product.status = MerchandiseStatus.OUT_OF_STOCK
+        invalidate_product_detail(product.article)
 
+    @transaction.atomic
     def create(self, validated_data):
         self.quantity_check(
             product=validated_data.get("product"),
             quantity=validated_data.get("quantity"),
         )
         return super().create(validated_data)
+
+
+class OrderingGoodsReserveSerializer(serializers.Serializer):
+    delivery_point = serializers.PrimaryKeyRelatedField(
+        required=True, queryset=DeliveryPoint.objects.all()
+    )
+    product = serializers.PrimaryKeyRelatedField(
+        required=True, queryset=Product.objects.all()
+    )
+    quantity = serializers.IntegerField(required=True, min_value=1)
+
+    def create(self, validated_data):
+        product = validated_data["product"]
+        hold = stock.reserve(
+            product.article,
+            validated_data["quantity"],
+            amount_loader=lambda: product.amount,
+            user=validated_data["user"].id,
+            delivery_point=validated_data["delivery_point"].id,
+        )
+        if hold is None:
+            raise serializers.ValidationError({"error": "not_enough_product"})
+        return {"hold": hold, "expires_in": settings.STOCK_HOLD_TIMEOUT}
+
+
+class OrderingGoodsBulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    status = serializers.ChoiceField(choices=SupplyStatus.choices)
+
+
+class OrderingGoodsQueueSerializer(serializers.Serializer):
+    since = serializers.IntegerField(min_value=0, required=False)
+
+
+class CheckoutLineSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    delivery_point = serializers.PrimaryKeyRelatedField(
+        required=True, queryset=DeliveryPoint.objects.all()
+    )
+    lines = CheckoutLineSerializer(many=True, allow_empty=False)
+
+    def validate_lines(self, lines):
+        articles = {line["product"] for line in lines}
+        found = set(
+            Product.objects.filter(article__in=articles).values_list(
+                "article", flat=True
+            )
+        )
+        if articles - found:
+            raise serializers.ValidationError(
+                {"error": "product_not_found", "products": sorted(articles - found)}
+            )
+        return lines
+
+    @transaction.atomic
+    def create(self, validated_data):
+        lines = validated_data["lines"]
+        quantities = Counter()
+        for line in lines:
+            quantities[line["product"]] += line["quantity"]
+        reserved = Product.objects.reserve_stock_lines(quantities)
+        if len(reserved) < len(quantities):
+            # Raising rolls back the stock already taken for the other lines.
+            raise serializers.ValidationError(
+                {
+                    "error": "not_enough_product",
+                    "products": sorted(set(quantities) - set(reserved)),
+                }
+            )
+        orders = OrderingGoods.objects.bulk_create(
+            OrderingGoods(
+                user=validated_data.get("user"),
+                delivery_point=validated_data["delivery_point"],
+                product_id=line["product"],
+                quantity=line["quantity"],
+            )
+            for line in lines
+        )
+        for article in reserved:
+            invalidate_product_detail(article)
+        queue.sync_orders(order.id for order in orders)
+        return orders
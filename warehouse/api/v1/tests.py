@@ -1,20 +1,84 @@
+import csv
+import datetime
 import decimal
+import sys
+import threading
+import time
 from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TransactionTestCase, override_settings
 from django.urls import reverse
-from rest_framework import status
-from rest_framework.test import APIClient, APITestCase
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.generics import CreateAPIView
+from rest_framework.test import (
+    APIClient,
+    APIRequestFactory,
+    APITestCase,
+    force_authenticate,
+)
 
 from accounts.models import StaffMembers, Supplier, User
-from marketplace.choices import PositionsStatus, SupplyStatus
-from product.models import Product
+from marketplace import events, settings
+from marketplace.choices import MerchandiseStatus, PositionsStatus, SupplyStatus
+from marketplace.idempotency import IdempotencyMixin
+from marketplace.models import IdempotencyKey, OutboxEvent
+from marketplace.redis import client as redis_client
+from marketplace.tasks import relay_outbox_events
+from marketplace.testing import clear_redis
+from marketplace.throttling import SlidingWindowThrottle
+from product import stock
+from product.models import Product, ProductStockShard
+from product.tasks import reconcile_stock, release_expired_stock_holds
+from warehouse import queue
 from warehouse.api.v1.serializers import (
+    CheckoutSerializer,
     DeliveryPointCreateSerializer,
     DeliveryPointSerializer,
+    OrderingGoodsCreateSerializer,
+    OrderingGoodsHistorySerializer,
+    OrderingGoodsReserveSerializer,
     OrderingGoodsSerializer,
+    WarehouseCreateSerializer,
     WarehouseSerializer,
 )
-from warehouse.models import DeliveryPoint, OrderingGoods, Warehouse
+from warehouse.api.v1.views import (
+    DeliveryPointInventoryApiView,
+    OrderingGoodsExportApiView,
+    OrderingGoodsHistory,
+    SupplierSalesApiView,
+)
+from warehouse.managers import TransitionResult
+from warehouse.models import (
+    DeliveryPoint,
+    DeliveryPointInventory,
+    OrderingGoods,
+    OrderingGoodsArchive,
+    SupplierSalesDaily,
+    SupplierSalesHourly,
+    Warehouse,
+    WarehouseInventory,
+)
+from warehouse.partitions import (
+    DEFAULT_PARTITION,
+    PARTITION_NAME,
+    create_partitions,
+    month_start,
+    next_month,
+)
+from warehouse.tasks import (
+    archive_orders,
+    fold_inventory_deltas,
+    prune_order_queues,
+    recompute_inventory,
+    rollup_supplier_sales,
+    write_stock_holds,
+)
 
 
 class AccountsTestCase(APITestCase):
@@ -71,6 +135,8 @@ class AccountsTestCase(APITestCase):
             status=SupplyStatus.DELIVERED,
         )
         self.client.force_authenticate(self.user)
+        clear_redis()
+        self.addCleanup(clear_redis)
 
     def test_warehouse_list(self):
         response = self.client.get(self.wr_list)
@@ -212,6 +278,473 @@ class AccountsTestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(OrderingGoods.objects.count(), 2)
 
+    def test_og_create_throttled(self):
+        data = {
+            "user": self.user.id,
+            "delivery_point": self.delivery_point.id,
+            "product": self.product.article,
+            "quantity": 1,
+        }
+        with mock.patch.dict(SlidingWindowThrottle.THROTTLE_RATES, orders_user="1/min"):
+            response = self.client.post(self.ordering_goods_create, data=data)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            response = self.client.post(self.ordering_goods_create, data=data)
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertIn("Retry-After", response)
+        self.assertEqual(OrderingGoods.objects.count(), 2)
+
+    def test_checkout(self):
+        product = Product.objects.create(
+            name="Ноутбук",
+            warehouse=self.warehouse,
+            cost=Decimal("500"),
+            amount=3,
+            supplier=self.supplier,
+        )
+        serializer = CheckoutSerializer(
+            data={
+                "delivery_point": self.delivery_point.id,
+                "lines": [
+                    {"product": self.product.article, "quantity": 5},
+                    {"product": product.article, "quantity": 2},
+                    {"product": product.article, "quantity": 1},
+                ],
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        orders = serializer.save(user=self.user)
+        self.assertEqual(len(orders), 3)
+        self.assertEqual(OrderingGoods.objects.count(), 4)
+        self.product.refresh_from_db()
+        product.refresh_from_db()
+        self.assertEqual(self.product.amount, 395)
+        self.assertEqual(product.amount, 0)
+        self.assertEqual(product.status, MerchandiseStatus.OUT_OF_STOCK)
+
+    def test_checkout_all_or_nothing(self):
+        serializer = CheckoutSerializer(
+            data={
+                "delivery_point": self.delivery_point.id,
+                "lines": [
+                    {"product": self.product.article, "quantity": 5},
+                    {"product": self.product.article, "quantity": 396},
+                ],
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        with self.assertRaises(serializers.ValidationError):
+            serializer.save(user=self.user)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.amount, 400)
+        self.assertEqual(OrderingGoods.objects.count(), 1)
+
+    def test_checkout_unknown_product(self):
+        serializer = CheckoutSerializer(
+            data={
+                "delivery_point": self.delivery_point.id,
+                "lines": [{"product": self.product.article + 1, "quantity": 1}],
+            }
+        )
+        self.assertFalse(serializer.is_valid())
+
+    def test_og_bulk_status(self):
+        orders = OrderingGoods.objects.bulk_create(
+            OrderingGoods(
+                user=self.user,
+                delivery_point=self.delivery_point,
+                product=self.product,
+                quantity=quantity,
+            )
+            for quantity in (2, 5)
+        )
+        ids = [order.id for order in orders]
+        results = OrderingGoods.objects.transition_status(
+            ids + [self.order_goods.id, 0], SupplyStatus.CANCELED
+        )
+        self.assertEqual(
+            list(results.values()),
+            [
+                TransitionResult.UPDATED,
+                TransitionResult.UPDATED,
+                TransitionResult.INVALID_TRANSITION,
+                TransitionResult.NOT_FOUND,
+            ],
+        )
+        self.assertEqual(
+            OrderingGoods.objects.filter(status=SupplyStatus.CANCELED).count(), 2
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.amount, 407)
+
+        results = OrderingGoods.objects.transition_status(ids, SupplyStatus.EN_ROUTE)
+        self.assertEqual(set(results.values()), {TransitionResult.INVALID_TRANSITION})
+
+    def test_cancel_orders(self):
+        delivery_point = DeliveryPoint.objects.create(
+            delivery_warehouse=self.warehouse2,
+            full_address="test2",
+            region="tes3",
+            country="Ru",
+        )
+        OrderingGoods.objects.bulk_create(
+            OrderingGoods(
+                user=self.user,
+                delivery_point=point,
+                product=self.product,
+                quantity=quantity,
+            )
+            for point, quantity in (
+                (self.delivery_point, 2),
+                (self.delivery_point, 3),
+                (delivery_point, 7),
+            )
+        )
+        out = StringIO()
+        call_command("cancel_orders", delivery_point=self.delivery_point.id, stdout=out)
+        self.assertTrue(out.getvalue().startswith("cancelled=2 products=1 "))
+        self.assertEqual(
+            OrderingGoods.objects.filter(status=SupplyStatus.CANCELED).count(), 2
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.amount, 405)
+
+        with self.assertRaises(CommandError):
+            call_command("cancel_orders")
+
+    def test_order_partitions(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM warehouse_orderinggoods "
+                "WHERE id = %s",
+                [self.order_goods.id],
+            )
+            partition = cursor.fetchone()[0]
+        self.assertEqual(
+            partition, PARTITION_NAME.format(month=self.order_goods.created_at)
+        )
+        created = create_partitions(months=5)
+        self.assertEqual(len(created), 2)
+        self.assertEqual(create_partitions(months=5), [])
+
+    def test_order_partitions_default_rows(self):
+        # A run was missed: an order of month +6 went to the default partition.
+        late = month_start(timezone.now())
+        for _ in range(6):
+            late = next_month(late)
+        late += datetime.timedelta(days=1)
+        OrderingGoods.objects.filter(id=self.order_goods.id).update(created_at=late)
+        create_partitions(months=5)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM warehouse_orderinggoods "
+                "WHERE id = %s",
+                [self.order_goods.id],
+            )
+            self.assertEqual(cursor.fetchone()[0], DEFAULT_PARTITION)
+
+        created = create_partitions(months=6)
+        self.assertEqual(created, [PARTITION_NAME.format(month=late)])
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tableoid::regclass::text FROM warehouse_orderinggoods "
+                "WHERE id = %s",
+                [self.order_goods.id],
+            )
+            self.assertEqual(cursor.fetchone()[0], created[0])
+        self.assertEqual(
+            OrderingGoods.objects.filter(id=self.order_goods.id).count(), 1
+        )
+
+    def test_archive_orders(self):
+        archived = OrderingGoods.objects.create(
+            user=self.user,
+            delivery_point=self.delivery_point,
+            product=self.product,
+            quantity=4,
+            status=SupplyStatus.DELIVERED,
+        )
+        year_ago = timezone.now() - datetime.timedelta(days=365)
+        OrderingGoods.objects.filter(id=archived.id).update(created_at=year_ago)
+
+        self.assertEqual(archive_orders(), 1)
+        self.assertFalse(OrderingGoods.objects.filter(id=archived.id).exists())
+        self.assertEqual(
+            OrderingGoodsArchive.objects.get(id=archived.id).created_at, year_ago
+        )
+        self.assertEqual(archive_orders(), 0)
+
+        request = APIRequestFactory().get(reverse("ordering_goods_history"))
+        request.user = self.user
+        history = OrderingGoodsHistory(request=request).get_queryset()
+        self.assertEqual(
+            [order["id"] for order in history], [self.order_goods.id, archived.id]
+        )
+        self.assertEqual(
+            OrderingGoodsHistorySerializer(history, many=True).data,
+            OrderingGoodsSerializer([self.order_goods, archived], many=True).data,
+        )
+
+    def test_supplier_sales_rollup(self):
+        OrderingGoods.objects.create(
+            user=self.user,
+            delivery_point=self.delivery_point,
+            product=self.product,
+            quantity=3,
+            status=SupplyStatus.CANCELED,
+        )
+        self.assertEqual(rollup_supplier_sales(), 1)
+        hourly = SupplierSalesHourly.objects.get(product=self.product)
+        daily = SupplierSalesDaily.objects.get(product=self.product)
+        for rollup in (hourly, daily):
+            self.assertEqual(rollup.supplier, self.supplier)
+            self.assertEqual(rollup.warehouse, self.warehouse)
+            self.assertEqual((rollup.orders, rollup.units), (1, 2))
+            self.assertEqual(rollup.revenue, Decimal("246"))
+            self.assertEqual((rollup.cancelled_orders, rollup.cancelled_units), (1, 3))
+        self.assertEqual(daily.bucket, hourly.bucket.date())
+
+        # Only orders changed after the watermark are folded in again.
+        OrderingGoods.objects.create(
+            user=self.user,
+            delivery_point=self.delivery_point,
+            product=self.product,
+            quantity=5,
+        )
+        self.assertEqual(rollup_supplier_sales(), 1)
+        daily.refresh_from_db()
+        self.assertEqual((daily.orders, daily.units), (2, 7))
+
+        SupplierSalesHourly.objects.all().delete()
+        SupplierSalesDaily.objects.all().delete()
+        out = StringIO()
+        call_command(
+            "backfill_supplier_sales",
+            "--start",
+            (timezone.now() - datetime.timedelta(days=1)).date().isoformat(),
+            stdout=out,
+        )
+        self.assertEqual(out.getvalue().strip(), "touched=1")
+        self.assertEqual(SupplierSalesDaily.objects.get().units, 7)
+
+        view = SupplierSalesApiView.as_view(permission_classes=[])
+        request = APIRequestFactory().get(
+            reverse("supply_sales"), {"granularity": "hour"}
+        )
+        force_authenticate(request, self.user)
+        response = view(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["results"]), 1)
+        self.assertEqual(response.data["results"][0]["units"], 7)
+
+        request = APIRequestFactory().get(
+            reverse("supply_sales"), {"granularity": "week"}
+        )
+        force_authenticate(request, self.user)
+        self.assertEqual(view(request).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_ordering_goods_export(self):
+        request = APIRequestFactory().get(reverse("order_goods_export"))
+        force_authenticate(request, self.user)
+        response = OrderingGoodsExportApiView.as_view(permission_classes=[])(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = list(csv.reader(StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(
+            rows[0][:6],
+            ["id", "user", "delivery_point", "product", "quantity", "status"],
+        )
+        self.assertEqual(
+            rows[1][:6],
+            [
+                str(self.order_goods.id),
+                str(self.user.id),
+                str(self.delivery_point.id),
+                str(self.product.article),
+                "2",
+                SupplyStatus.DELIVERED,
+            ],
+        )
+        self.assertIn('filename="orders.csv"', response["Content-Disposition"])
+
+    def inventory(self, model=WarehouseInventory, **lookup):
+        lookup = lookup or {"warehouse": self.warehouse}
+        row = model.objects.get(**lookup)
+        return row.sku_count, row.units, row.out_of_stock, row.stock_value
+
+    def test_inventory(self):
+        recompute_inventory()
+        self.assertEqual(self.inventory(), (1, 400, 0, Decimal("49200")))
+        self.assertEqual(
+            self.inventory(warehouse=self.warehouse2), (0, 0, 0, Decimal("0"))
+        )
+
+        Product.objects.reserve_stock(self.product.article, 10)
+        product = Product.objects.create(
+            name="Чехол",
+            warehouse=self.warehouse2,
+            delivery_point=self.delivery_point,
+            cost=Decimal("5"),
+            supplier=self.supplier,
+        )
+        self.assertEqual(fold_inventory_deltas(), 2)
+        self.assertEqual(self.inventory(), (1, 390, 0, Decimal("47970")))
+        self.assertEqual(
+            self.inventory(warehouse=self.warehouse2), (1, 0, 1, Decimal("0"))
+        )
+
+        Product.objects.filter(article=product.article).update(
+            warehouse=self.warehouse, amount=4, status=MerchandiseStatus.ON_SALE
+        )
+        fold_inventory_deltas()
+        self.assertEqual(self.inventory(), (2, 394, 0, Decimal("47990")))
+        self.assertEqual(
+            self.inventory(warehouse=self.warehouse2), (0, 0, 0, Decimal("0"))
+        )
+        self.assertEqual(
+            self.inventory(DeliveryPointInventory, delivery_point=self.delivery_point),
+            (1, 4, 0, Decimal("20")),
+        )
+
+        # The nightly recompute fixes drifted rows and drops pending deltas.
+        WarehouseInventory.objects.filter(warehouse=self.warehouse).update(units=0)
+        Product.objects.filter(article=product.article).delete()
+        self.assertEqual(recompute_inventory(), 2)
+        self.assertEqual(fold_inventory_deltas(), 0)
+        self.assertEqual(self.inventory(), (1, 390, 0, Decimal("47970")))
+
+        request = APIRequestFactory().get(
+            reverse("dp_inventory"), {"delivery_point": self.delivery_point.id}
+        )
+        force_authenticate(request, self.user)
+        response = DeliveryPointInventoryApiView.as_view(permission_classes=[])(request)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["sku_count"], 0)
+
+    def test_outbox_events(self):
+        OutboxEvent.objects.all().delete()
+        stream_keys = [events.STREAM_KEY.format(topic=topic) for topic in TOPICS]
+        redis_client.delete(*stream_keys)
+        self.addCleanup(redis_client.delete, *stream_keys)
+
+        serializer = OrderingGoodsCreateSerializer(
+            data={
+                "user": self.user.id,
+                "delivery_point": self.delivery_point.id,
+                "product": self.product.article,
+                "quantity": 2,
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        order = serializer.save()
+        OrderingGoods.objects.transition_status([order.id], SupplyStatus.EN_ROUTE)
+        Product.objects.filter(article=self.product.article).update(cost=Decimal("99"))
+        self.assertEqual(
+            list(
+                OutboxEvent.objects.order_by("id").values_list("event_type", flat=True)
+            ),
+            [
+                "product.stock_changed",
+                "order.created",
+                "order.status_changed",
+                "product.price_changed",
+            ],
+        )
+
+        self.assertEqual(relay_outbox_events(), 4)
+        self.assertFalse(OutboxEvent.objects.exists())
+        received = []
+        self.assertEqual(events.consume("order", "tests", "one", received.append), 2)
+        self.assertEqual(
+            [(event["type"], event["payload"]["id"]) for event in received],
+            [("order.created", order.id), ("order.status_changed", order.id)],
+        )
+        self.assertEqual(events.consume("order", "tests", "one", received.append), 0)
+
+        # Unacknowledged events are redelivered to the consumer that read them.
+        def fail(event):
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            events.consume("product", "tests", "one", fail)
+        received = []
+        self.assertEqual(events.consume("product", "tests", "one", received.append), 2)
+        self.assertEqual(received[0]["payload"]["amount"], 398)
+
+    def reserve(self, quantity):
+        serializer = OrderingGoodsReserveSerializer(
+            data={
+                "delivery_point": self.delivery_point.id,
+                "product": self.product.article,
+                "quantity": quantity,
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save(user=self.user)["hold"]
+
+    def available(self):
+        key = stock.AVAILABLE_KEY.format(article=self.product.article)
+        return int(redis_client.get(key))
+
+    def hold_status(self, hold):
+        return self.client.get(
+            reverse("ordering_goods_reserve_status", kwargs={"hold": hold})
+        )
+
+    def test_stock_hold(self):
+        hold = self.reserve(3)
+        self.assertEqual(self.hold_status(hold).data["status"], "pending")
+        self.assertEqual(self.available(), 397)
+        with self.assertRaises(serializers.ValidationError):
+            self.reserve(398)
+
+        self.assertEqual(write_stock_holds(), 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.amount, 397)
+        order = OrderingGoods.objects.get(user=self.user, quantity=3)
+        self.assertEqual(
+            self.hold_status(hold).data,
+            {"hold": hold, "status": "ordered", "order": order.id},
+        )
+        self.assertEqual(self.available(), 397)
+        self.assertEqual(reconcile_stock(), {})
+
+        other = User.objects.create(
+            email="other@gmail.com", username="other", is_active=True
+        )
+        self.client.force_authenticate(other)
+        self.assertEqual(self.hold_status(hold).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stock_hold_expired(self):
+        hold = self.reserve(3)
+        redis_client.zadd(stock.HOLDS_KEY, {hold: 0})
+        self.assertEqual(release_expired_stock_holds(), 1)
+        self.assertEqual(self.hold_status(hold).data["status"], "released")
+        self.assertEqual(self.available(), 400)
+        self.assertEqual(write_stock_holds(), 0)
+        self.assertEqual(OrderingGoods.objects.count(), 1)
+
+    def test_stock_hold_failed(self):
+        self.reserve(3)
+        Product.objects.filter(article=self.product.article).update(amount=2)
+        self.assertEqual(write_stock_holds(), 0)
+        self.assertEqual(OrderingGoods.objects.count(), 1)
+        self.assertEqual(self.available(), 2)
+
+    def test_stock_reconcile_claimed_hold(self):
+        hold = self.reserve(3)
+        fields = stock.claim(hold)
+        # A hold being written is still held.
+        self.assertEqual(reconcile_stock(), {})
+        self.assertEqual(self.available(), 397)
+        stock.release(hold, fields)
+        self.assertEqual(self.available(), 400)
+        self.assertEqual(reconcile_stock(), {})
+
+    def test_stock_reconcile(self):
+        self.reserve(3)
+        Product.objects.filter(article=self.product.article).update(amount=100)
+        self.assertEqual(reconcile_stock(), {self.product.article: 300})
+        self.assertEqual(self.available(), 97)
+
     def test_dp_ordering_goods_list(self):
         response = self.client.get(
             reverse("ordering_goods_dp", kwargs={"id": self.delivery_point.id})
@@ -220,8 +753,341 @@ class AccountsTestCase(APITestCase):
         serializer = OrderingGoodsSerializer([self.order_goods], many=True).data
         self.assertEqual(response.data["results"], serializer)
 
+    def test_delivery_point_queue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = (
+                OrderingGoods.objects.create(
+                    user=self.user,
+                    delivery_point=self.delivery_point,
+                    product=self.product,
+                    quantity=1,
+                )
+                for _ in range(2)
+            )
+        snapshot = queue.read(self.delivery_point.id)
+        self.assertTrue(snapshot["reset"])
+        self.assertEqual(
+            [order["id"] for order in snapshot["orders"]], [first.id, second.id]
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderingGoods.objects.transition_status([first.id], SupplyStatus.CANCELED)
+        changes = queue.read(self.delivery_point.id, snapshot["watermark"])
+        self.assertFalse(changes["reset"])
+        self.assertEqual(len(changes["orders"]), 1)
+        self.assertEqual(changes["orders"][0]["id"], first.id)
+        self.assertTrue(changes["orders"][0]["closed"])
+        self.assertGreater(changes["watermark"], snapshot["watermark"])
+        self.assertEqual(
+            queue.read(self.delivery_point.id, changes["watermark"])["orders"], []
+        )
+
+        # Pruned tombstones send older watermarks back to a snapshot.
+        with mock.patch("marketplace.settings.ORDER_QUEUE_TOMBSTONE_TTL", -60):
+            prune_order_queues()
+        stale = queue.read(self.delivery_point.id, snapshot["watermark"])
+        self.assertTrue(stale["reset"])
+        self.assertEqual([order["id"] for order in stale["orders"]], [second.id])
+
+    def test_delivery_point_queue_prune_unread(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = OrderingGoods.objects.create(
+                user=self.user, delivery_point=self.delivery_point, product=self.product
+            )
+            OrderingGoods.objects.transition_status([order.id], SupplyStatus.CANCELED)
+        # No terminal has read this queue, so it has no floor yet.
+        self.assertIn(self.delivery_point.id, queue.tracked_points())
+        self.assertEqual(queue.prune(self.delivery_point.id), 0)
+        with mock.patch("marketplace.settings.ORDER_QUEUE_TOMBSTONE_TTL", -60):
+            self.assertEqual(queue.prune(self.delivery_point.id), 1)
+        self.assertNotIn(self.delivery_point.id, queue.tracked_points())
+        closed = queue.CLOSED_KEY.format(point=self.delivery_point.id)
+        self.assertEqual(redis_client.zcard(closed), 0)
+
+    def test_delivery_point_queue_rebuild(self):
+        order = OrderingGoods.objects.create(
+            user=self.user, delivery_point=self.delivery_point, product=self.product
+        )
+        snapshot = queue.read(self.delivery_point.id, 10)
+        self.assertTrue(snapshot["reset"])
+        self.assertEqual([entry["id"] for entry in snapshot["orders"]], [order.id])
+        self.assertFalse(
+            queue.read(self.delivery_point.id, snapshot["watermark"])["reset"]
+        )
+
     def test_supply_ordering_list(self):
         response = self.client.get(self.supply_ordering_list)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         serializer = OrderingGoodsSerializer([self.order_goods], many=True).data
         self.assertEqual(response.data["results"], serializer)
+
+
+TOPICS = ("order", "product")
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+class IdempotentWarehouseCreateApiView(IdempotencyMixin, CreateAPIView):
+    serializer_class = WarehouseCreateSerializer
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class IdempotencyTestCase(APITestCase):
+    data = {"full_address": "test", "region": "tes3", "country": "RU"}
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user = User.objects.create(email="test@gmauk.com", is_active=True)
+        self.view = IdempotentWarehouseCreateApiView.as_view()
+
+    def post(self, data, key="first"):
+        request = APIRequestFactory().post(
+            "/warehouse/create/", data, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+        force_authenticate(request, self.user)
+        return self.view(request)
+
+    def test_replay(self):
+        response = self.post(self.data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        replayed = self.post(self.data)
+        self.assertEqual(replayed.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replayed["Idempotent-Replayed"], "true")
+        self.assertEqual(replayed.data, response.data)
+        self.assertEqual(Warehouse.objects.count(), 1)
+
+        # Without Redis the stored response comes from Postgres.
+        cache.clear()
+        self.assertEqual(self.post(self.data).data, response.data)
+        self.assertEqual(Warehouse.objects.count(), 1)
+
+        self.assertEqual(self.post(self.data, key="second").status_code, 201)
+        self.assertEqual(Warehouse.objects.count(), 2)
+
+    def test_key_reused(self):
+        self.post(self.data)
+        response = self.post({**self.data, "region": "other"})
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_in_progress(self):
+        request = self.post(self.data, key="pending")
+        IdempotencyKey.objects.update(status_code=None)
+        cache.clear()
+        response = self.post(self.data, key="pending")
+        self.assertEqual(request.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(Warehouse.objects.count(), 1)
+
+    def test_validation_error_frees_key(self):
+        response = self.post({"region": "tes3"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class OrderingGoodsConcurrencyTestCase(TransactionTestCase):
+    threads = 16
+    attempts = 10
+    benchmark_attempts = 50
+    benchmark_slots = 8
+    stock = 50
+
+    def setUp(self) -> None:
+        self.user = User.objects.create(
+            first_name="test", last_name="test2", email="test@gmauk.com", is_active=True
+        )
+        warehouse = Warehouse.objects.create(
+            full_address="test", region="tes3", country="Ru"
+        )
+        self.delivery_point = DeliveryPoint.objects.create(
+            delivery_warehouse=warehouse,
+            full_address="test",
+            region="tes3",
+            country="Ru",
+        )
+        supplier = Supplier.objects.create(
+            user=self.user,
+            company_name="roga i nos",
+            taxpayer_identification_number="156296310345",
+        )
+        self.product = Product.objects.create(
+            name="Планшет",
+            warehouse=warehouse,
+            cost=Decimal("123"),
+            amount=self.stock,
+            supplier=supplier,
+        )
+
+    def order(self, results, attempts):
+        try:
+            for _ in range(attempts):
+                serializer = OrderingGoodsCreateSerializer(
+                    data={
+                        "user": self.user.id,
+                        "delivery_point": self.delivery_point.id,
+                        "product": self.product.article,
+                        "quantity": 1,
+                    }
+                )
+                serializer.is_valid(raise_exception=True)
+                try:
+                    serializer.save()
+                    results.append(True)
+                except serializers.ValidationError:
+                    results.append(False)
+        finally:
+            connection.close()
+
+    def run_orders(self, attempts=None):
+        results = []
+        workers = [
+            threading.Thread(
+                target=self.order, args=(results, attempts or self.attempts)
+            )
+            for _ in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results
+
+    def hold_lock(self, queryset, locked, release):
+        try:
+            with transaction.atomic():
+                list(queryset.select_for_update())
+                locked.set()
+                release.wait(10)
+        finally:
+            connection.close()
+
+    def reserve_while_locked(self, queryset, slots):
+        """Reserve one unit while another connection holds ``queryset`` locked."""
+        locked, release = threading.Event(), threading.Event()
+        holder = threading.Thread(
+            target=self.hold_lock, args=(queryset, locked, release)
+        )
+        holder.start()
+        try:
+            locked.wait(10)
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '500ms'")
+                return Product.objects.reserve_stock(self.product.article, 1, slots)
+        finally:
+            release.set()
+            holder.join()
+
+    def test_no_oversell(self):
+        results = self.run_orders()
+
+        self.assertEqual(len(results), self.threads * self.attempts)
+        self.assertEqual(results.count(True), self.stock)
+        self.assertEqual(OrderingGoods.objects.count(), self.stock)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.amount, 0)
+        self.assertEqual(self.product.status, MerchandiseStatus.OUT_OF_STOCK)
+
+    @skipUnless(settings.STOCK_BENCHMARK, "set STOCK_BENCHMARK=1 to run")
+    def test_order_throughput(self):
+        attempts = self.benchmark_attempts
+        orders = self.threads * attempts
+        for slots in (0, self.benchmark_slots):
+            Product.objects.set_stock_slots(self.product.article, slots, orders)
+            started = time.perf_counter()
+            results = self.run_orders(attempts)
+            elapsed = time.perf_counter() - started
+            self.assertEqual(results.count(True), orders)
+            sys.stderr.write(
+                f"\n{orders} orders on {slots or 'no'} stock shards from "
+                f"{self.threads} threads: {orders / elapsed:.0f} orders/sec"
+            )
+        sys.stderr.write("\n")
+
+    def test_sharded_stock_no_oversell(self):
+        orders = self.threads * self.attempts
+        Product.objects.filter(article=self.product.article).update(amount=orders)
+        Product.objects.set_stock_slots(self.product.article, 8)
+        results = self.run_orders()
+        self.assertEqual(results.count(True), orders)
+
+        Product.objects.consolidate_stock(self.product.article)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.amount, 0)
+        self.assertEqual(self.product.status, MerchandiseStatus.OUT_OF_STOCK)
+        self.assertEqual(OrderingGoods.objects.count(), orders)
+
+    def test_sharded_stock_skips_locked_rows(self):
+        # A single stock row makes every order wait for the one holding it.
+        with self.assertRaises(OperationalError):
+            self.reserve_while_locked(
+                Product.objects.filter(article=self.product.article), slots=0
+            )
+
+        # With shards, an order takes another shard instead of waiting.
+        Product.objects.set_stock_slots(self.product.article, 8)
+        shards = ProductStockShard.objects.filter(product=self.product)
+        locked = shards.get(slot=0).amount
+        self.assertIsNotNone(self.reserve_while_locked(shards.filter(slot=0), slots=8))
+        self.assertEqual(shards.get(slot=0).amount, locked)
+        self.assertEqual(sum(shard.amount for shard in shards), self.stock - 1)
+
+    def test_checkout_no_deadlock(self):
+        other = Product.objects.create(
+            name="Ноутбук",
+            warehouse=self.product.warehouse,
+            cost=Decimal("500"),
+            amount=self.stock,
+            supplier=self.product.supplier,
+        )
+        errors = []
+
+        def checkout(articles):
+            try:
+                for _ in range(self.attempts):
+                    serializer = CheckoutSerializer(
+                        data={
+                            "delivery_point": self.delivery_point.id,
+                            "lines": [
+                                {"product": article, "quantity": 1}
+                                for article in articles
+                            ],
+                        }
+                    )
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save(user=self.user)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        # Half of the baskets list the products in the opposite order.
+        articles = [self.product.article, other.article]
+        workers = [
+            threading.Thread(
+                target=checkout, args=(articles if index % 2 else articles[::-1],)
+            )
+            for index in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.product.amount, self.stock - 4 * self.attempts)
+        self.assertEqual(other.amount, self.stock - 4 * self.attempts)
+
+    def test_negative_quantity(self):
+        serializer = OrderingGoodsCreateSerializer(
+            data={
+                "user": self.user.id,
+                "delivery_point": self.delivery_point.id,
+                "product": self.product.article,
+                "quantity": -1,
+            }
+        )
+        self.assertFalse(serializer.is_valid())
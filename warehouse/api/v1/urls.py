@@ -3,17 +3,27 @@ from django.urls import include, path
 from warehouse.api.v1.views import (
     DeliveryPointApiView,
     DeliveryPointCreateApiView,
+    DeliveryPointInventoryApiView,
     DeliveryPointRetrieveApiView,
+    OrderingGoodsBulkStatusApiView,
     OrderingGoodsCanselApiView,
+    OrderingGoodsCheckoutApiView,
     OrderingGoodsCreate,
+    OrderingGoodsExportApiView,
     OrderingGoodsHistory,
     OrderingGoodsListApiView,
     OrderingGoodsListWarehouseApiView,
+    OrderingGoodsQueueApiView,
+    OrderingGoodsReserveApiView,
+    OrderingGoodsReserveStatusApiView,
     OrderingGoodsRetrieveApiView,
     OrderingGoodsStatusApiView,
     OrderingGoodsSupplyApiView,
+    OrderingGoodsSupplyExportApiView,
+    SupplierSalesApiView,
     WarehouseApiView,
     WarehouseCreateApiView,
+    WarehouseInventoryApiView,
     WarehouseRetrieveApiView,
 )
 
@@ -21,12 +31,18 @@ urlpatterns = [
     path("list/", WarehouseApiView.as_view(), name="wr_list"),
     path("create/", WarehouseCreateApiView.as_view(), name="wr_create"),
     path("<int:pk>/", WarehouseRetrieveApiView.as_view(), name="wr_retrieve"),
+    path("inventory/", WarehouseInventoryApiView.as_view(), name="wr_inventory"),
     path(
         "delivery-point/",
         include(
             [
                 path("list/", DeliveryPointApiView.as_view(), name="dp_list"),
                 path("create/", DeliveryPointCreateApiView.as_view(), name="dp_create"),
+                path(
+                    "inventory/",
+                    DeliveryPointInventoryApiView.as_view(),
+                    name="dp_inventory",
+                ),
                 path(
                     "<int:id>/",
                     include(
@@ -41,6 +57,11 @@ urlpatterns = [
                                 OrderingGoodsListWarehouseApiView.as_view(),
                                 name="ordering_goods_dp",
                             ),
+                            path(
+                                "queue/",
+                                OrderingGoodsQueueApiView.as_view(),
+                                name="ordering_goods_dp_queue",
+                            ),
                         ]
                     ),
                 ),
@@ -72,6 +93,11 @@ urlpatterns = [
                 path(
                     "list/", OrderingGoodsListApiView.as_view(), name="order_goods_list"
                 ),
+                path(
+                    "export/",
+                    OrderingGoodsExportApiView.as_view(),
+                    name="order_goods_export",
+                ),
                 path(
                     "ordering-goods-history/",
                     OrderingGoodsHistory.as_view(),
@@ -82,11 +108,41 @@ urlpatterns = [
                     OrderingGoodsCreate.as_view(),
                     name="ordering_goods_create",
                 ),
+                path(
+                    "checkout/",
+                    OrderingGoodsCheckoutApiView.as_view(),
+                    name="ordering_goods_checkout",
+                ),
+                path(
+                    "change-status/",
+                    OrderingGoodsBulkStatusApiView.as_view(),
+                    name="ordering_goods_bulk_status",
+                ),
+                path(
+                    "reserve/",
+                    OrderingGoodsReserveApiView.as_view(),
+                    name="ordering_goods_reserve",
+                ),
+                path(
+                    "reserve/<str:hold>/",
+                    OrderingGoodsReserveStatusApiView.as_view(),
+                    name="ordering_goods_reserve_status",
+                ),
                 path(
                     "supply-list/",
                     OrderingGoodsSupplyApiView.as_view(),
                     name="supply_ordering_list",
                 ),
+                path(
+                    "supply-export/",
+                    OrderingGoodsSupplyExportApiView.as_view(),
+                    name="supply_ordering_export",
+                ),
+                path(
+                    "supply-sales/",
+                    SupplierSalesApiView.as_view(),
+                    name="supply_sales",
+                ),
             ]
         ),
     ),
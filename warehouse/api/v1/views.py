@@ -1,7 +1,9 @@
-from rest_framework import status
+from rest_framework import serializers, status
+from rest_framework.exceptions import NotFound
 from rest_framework.generics import (
     CreateAPIView,
     DestroyAPIView,
+    GenericAPIView,
     ListAPIView,
     RetrieveAPIView,
     RetrieveUpdateDestroyAPIView,
@@ -19,15 +21,38 @@ from accounts.permissions import (
     IsWarehouseWorker,
 )
 from marketplace.choices import SupplyStatus
+from marketplace.export import ExportMixin
+from marketplace.idempotency import IdempotencyMixin
+from marketplace.throttling import UserThrottle
+from product import stock
+from warehouse import queue
+from warehouse.api.v1.filters import SupplierSalesFilter
 from warehouse.api.v1.serializers import (
+    CheckoutSerializer,
     DeliveryPointCreateSerializer,
+    DeliveryPointInventorySerializer,
     DeliveryPointSerializer,
+    OrderingGoodsBulkStatusSerializer,
     OrderingGoodsCreateSerializer,
+    OrderingGoodsHistorySerializer,
+    OrderingGoodsQueueSerializer,
+    OrderingGoodsReserveSerializer,
     OrderingGoodsSerializer,
+    SupplierSalesSerializer,
     WarehouseCreateSerializer,
+    WarehouseInventorySerializer,
     WarehouseSerializer,
 )
-from warehouse.models import DeliveryPoint, OrderingGoods, Warehouse
+from warehouse.models import (
+    DeliveryPoint,
+    DeliveryPointInventory,
+    OrderingGoods,
+    OrderingGoodsArchive,
+    SupplierSalesDaily,
+    SupplierSalesHourly,
+    Warehouse,
+    WarehouseInventory,
+)
 
 
 class WarehouseApiView(ListAPIView):
@@ -36,7 +61,7 @@ class WarehouseApiView(ListAPIView):
     queryset = Warehouse.objects.all()
 
 
-class WarehouseCreateApiView(CreateAPIView):
+class WarehouseCreateApiView(IdempotencyMixin, CreateAPIView):
     permission_classes = [IsManager]
     serializer_class = WarehouseCreateSerializer
 
@@ -53,13 +78,20 @@ class WarehouseRetrieveApiView(RetrieveUpdateDestroyAPIView):
     queryset = Warehouse.objects.all()
 
 
+class WarehouseInventoryApiView(ListAPIView):
+    permission_classes = [IsManager | IsHeadOfWarehouse | IsWarehouseWorker]
+    serializer_class = WarehouseInventorySerializer
+    queryset = WarehouseInventory.objects.order_by("warehouse_id")
+    filterset_fields = ("warehouse",)
+
+
 class DeliveryPointApiView(ListAPIView):
     permission_classes = [IsDeliveryPointWorker]
     serializer_class = DeliveryPointSerializer
     queryset = DeliveryPoint.objects.select_related("delivery_warehouse")
 
 
-class DeliveryPointCreateApiView(CreateAPIView):
+class DeliveryPointCreateApiView(IdempotencyMixin, CreateAPIView):
     permission_classes = [IsActive]
     serializer_class = DeliveryPointCreateSerializer
 
@@ -77,6 +109,13 @@ class DeliveryPointRetrieveApiView(RetrieveUpdateDestroyAPIView):
     lookup_field = "id"
 
 
+class DeliveryPointInventoryApiView(ListAPIView):
+    permission_classes = [IsManager | IsDeliveryPointWorker]
+    serializer_class = DeliveryPointInventorySerializer
+    queryset = DeliveryPointInventory.objects.order_by("delivery_point_id")
+    filterset_fields = ("delivery_point",)
+
+
 class OrderingGoodsListApiView(ListAPIView):
     permission_classes = [IsManager]
     serializer_class = OrderingGoodsSerializer
@@ -85,14 +124,37 @@ class OrderingGoodsListApiView(ListAPIView):
     ).order_by("-created_at")
 
 
+ORDER_EXPORT_FIELDS = (
+    "id",
+    "user",
+    "delivery_point",
+    "product",
+    "quantity",
+    "status",
+    "created_at",
+    "updated_at",
+)
+
+
+class OrderingGoodsExportApiView(ExportMixin, OrderingGoodsListApiView):
+    export_name = "orders"
+    export_fields = ORDER_EXPORT_FIELDS
+
+
 class OrderingGoodsHistory(ListAPIView):
     permission_classes = [IsActive]
-    serializer_class = OrderingGoodsSerializer
+    serializer_class = OrderingGoodsHistorySerializer
+    fields = ("id", "delivery_point", "product", "quantity", "status", "created_at")
 
     def get_queryset(self):
-        return OrderingGoods.objects.select_related(
-            "user", "delivery_point", "product"
-        ).filter(user=self.request.user, status=SupplyStatus.DELIVERED)
+        # Archived orders are paged together with the live ones.
+        live = OrderingGoods.objects.filter(
+            user=self.request.user, status=SupplyStatus.DELIVERED
+        ).values(*self.fields)
+        archived = OrderingGoodsArchive.objects.filter(
+            user=self.request.user, status=SupplyStatus.DELIVERED
+        ).values(*self.fields)
+        return live.union(archived, all=True).order_by("-created_at", "-id")
 
 
 class OrderingGoodsRetrieveApiView(RetrieveAPIView):
@@ -124,6 +186,27 @@ class OrderingGoodsStatusApiView(OrderingGoodsRetrieveApiView, UpdateAPIView):
     permission_classes = [IsManager | IsWarehouseWorker | IsDeliveryPointWorker]
 
 
+class OrderingGoodsBulkStatusApiView(GenericAPIView):
+    permission_classes = [IsManager | IsWarehouseWorker | IsDeliveryPointWorker]
+    serializer_class = OrderingGoodsBulkStatusSerializer
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = OrderingGoods.objects.transition_status(
+            ids=list(dict.fromkeys(serializer.validated_data["ids"])),
+            status=serializer.validated_data["status"],
+        )
+        return Response(
+            {
+                "results": [
+                    {"id": order_id, "result": result}
+                    for order_id, result in results.items()
+                ]
+            }
+        )
+
+
 class OrderingGoodsListWarehouseApiView(ListAPIView):
     permission_classes = [IsDeliveryPointWorker]
     serializer_class = OrderingGoodsSerializer
@@ -134,6 +217,20 @@ class OrderingGoodsListWarehouseApiView(ListAPIView):
         ).filter(delivery_point_id=self.kwargs.get("id"))
 
 
+class OrderingGoodsQueueApiView(GenericAPIView):
+    """Open orders of a delivery point, or only those changed ``since`` a watermark."""
+
+    permission_classes = [IsDeliveryPointWorker]
+    serializer_class = OrderingGoodsQueueSerializer
+
+    def get(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            queue.read(self.kwargs["id"], serializer.validated_data.get("since"))
+        )
+
+
 class OrderingGoodsSupplyApiView(ListAPIView):
     permission_classes = [IsSupplier]
     serializer_class = OrderingGoodsSerializer
@@ -144,6 +241,81 @@ class OrderingGoodsSupplyApiView(ListAPIView):
         ).filter(product__supplier__user=self.request.user)
 
 
-class OrderingGoodsCreate(CreateAPIView):
+class OrderingGoodsSupplyExportApiView(ExportMixin, OrderingGoodsSupplyApiView):
+    export_name = "orders"
+    export_fields = ORDER_EXPORT_FIELDS
+
+
+class SupplierSalesApiView(ListAPIView):
+    """Sales of the supplier's products, read from the hourly or daily rollups."""
+
+    permission_classes = [IsSupplier]
+    serializer_class = SupplierSalesSerializer
+    filterset_class = SupplierSalesFilter
+    rollups = {"day": SupplierSalesDaily, "hour": SupplierSalesHourly}
+
+    def get_queryset(self):
+        granularity = self.request.query_params.get("granularity", "day")
+        if granularity not in self.rollups:
+            raise serializers.ValidationError({"granularity": ["invalid_choice"]})
+        return (
+            self.rollups[granularity]
+            .objects.filter(supplier__user=self.request.user)
+            .order_by("-bucket", "product_id")
+        )
+
+
+class OrderingGoodsCreate(IdempotencyMixin, CreateAPIView):
     permission_classes = [IsActive]
+    throttle_classes = [UserThrottle]
+    throttle_scope = "orders"
     serializer_class = OrderingGoodsCreateSerializer
+
+
+class OrderingGoodsCheckoutApiView(IdempotencyMixin, CreateAPIView):
+    permission_classes = [IsActive]
+    throttle_classes = [UserThrottle]
+    throttle_scope = "orders"
+    serializer_class = CheckoutSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        orders = serializer.save(user=request.user)
+        return Response(
+            OrderingGoodsSerializer(orders, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class OrderingGoodsReserveApiView(IdempotencyMixin, CreateAPIView):
+    """Hold stock in Redis; the order itself is written by a Celery task."""
+
+    permission_classes = [IsActive]
+    throttle_classes = [UserThrottle]
+    throttle_scope = "orders"
+    serializer_class = OrderingGoodsReserveSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        hold = serializer.save(user=request.user)
+        return Response(hold, status=status.HTTP_202_ACCEPTED)
+
+
+class OrderingGoodsReserveStatusApiView(GenericAPIView):
+    """Whether a hold is still pending, or became an order or was released."""
+
+    permission_classes = [IsActive]
+
+    def get(self, request, *args, **kwargs):
+        hold = stock.hold_status(self.kwargs["hold"])
+        if hold is None or hold["user"] != request.user.id:
+            raise NotFound()
+        return Response(
+            {
+                "hold": self.kwargs["hold"],
+                "status": hold["status"],
+                "order": hold["order"],
+            }
+        )
@@ -0,0 +1,161 @@
+from django.db import connection
+
+from product.models import Product
+from warehouse.models import (
+    DeliveryPoint,
+    DeliveryPointInventory,
+    InventoryDelta,
+    Warehouse,
+    WarehouseInventory,
+)
+
+FOLD_DELTAS_SQL = """
+WITH folded AS (
+    DELETE FROM {delta}
+    WHERE id IN (
+        SELECT id FROM {delta} ORDER BY id LIMIT %(limit)s FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *
+),
+warehouses AS (
+    INSERT INTO {warehouse_inventory} AS inventory (
+        warehouse_id, sku_count, units, out_of_stock, stock_value, updated_at
+    )
+    SELECT
+        warehouse_id, sum(sku_count), sum(units), sum(out_of_stock),
+        sum(stock_value), now()
+    FROM folded
+    WHERE warehouse_id IS NOT NULL
+    GROUP BY warehouse_id
+    ON CONFLICT (warehouse_id) DO UPDATE SET
+        sku_count = inventory.sku_count + excluded.sku_count,
+        units = inventory.units + excluded.units,
+        out_of_stock = inventory.out_of_stock + excluded.out_of_stock,
+        stock_value = inventory.stock_value + excluded.stock_value,
+        updated_at = excluded.updated_at
+),
+delivery_points AS (
+    INSERT INTO {delivery_point_inventory} AS inventory (
+        delivery_point_id, sku_count, units, out_of_stock, stock_value, updated_at
+    )
+    SELECT
+        delivery_point_id, sum(sku_count), sum(units), sum(out_of_stock),
+        sum(stock_value), now()
+    FROM folded
+    WHERE delivery_point_id IS NOT NULL
+    GROUP BY delivery_point_id
+    ON CONFLICT (delivery_point_id) DO UPDATE SET
+        sku_count = inventory.sku_count + excluded.sku_count,
+        units = inventory.units + excluded.units,
+        out_of_stock = inventory.out_of_stock + excluded.out_of_stock,
+        stock_value = inventory.stock_value + excluded.stock_value,
+        updated_at = excluded.updated_at
+)
+SELECT count(*) FROM folded
+"""
+
+# One statement, so the deltas cleared and the products summed come from the
+# same snapshot: later stock changes keep their deltas for the next fold.
+RECOMPUTE_SQL = """
+WITH cleared AS (
+    DELETE FROM {delta}
+),
+warehouse_totals AS (
+    SELECT
+        warehouse_id AS id,
+        count(*) AS sku_count,
+        sum(amount) AS units,
+        count(*) FILTER (WHERE amount = 0) AS out_of_stock,
+        sum(cost * amount) AS stock_value
+    FROM {product}
+    GROUP BY warehouse_id
+),
+delivery_point_totals AS (
+    SELECT
+        delivery_point_id AS id,
+        count(*) AS sku_count,
+        sum(amount) AS units,
+        count(*) FILTER (WHERE amount = 0) AS out_of_stock,
+        sum(cost * amount) AS stock_value
+    FROM {product}
+    WHERE delivery_point_id IS NOT NULL
+    GROUP BY delivery_point_id
+),
+warehouses AS (
+    INSERT INTO {warehouse_inventory} AS inventory (
+        warehouse_id, sku_count, units, out_of_stock, stock_value, updated_at
+    )
+    SELECT
+        warehouse.id,
+        coalesce(totals.sku_count, 0),
+        coalesce(totals.units, 0),
+        coalesce(totals.out_of_stock, 0),
+        coalesce(totals.stock_value, 0),
+        now()
+    FROM {warehouse} AS warehouse
+    LEFT JOIN warehouse_totals AS totals ON totals.id = warehouse.id
+    ON CONFLICT (warehouse_id) DO UPDATE SET
+        sku_count = excluded.sku_count,
+        units = excluded.units,
+        out_of_stock = excluded.out_of_stock,
+        stock_value = excluded.stock_value,
+        updated_at = excluded.updated_at
+    WHERE (inventory.sku_count, inventory.units, inventory.out_of_stock,
+        inventory.stock_value) IS DISTINCT FROM (excluded.sku_count,
+        excluded.units, excluded.out_of_stock, excluded.stock_value)
+    RETURNING 1
+),
+delivery_points AS (
+    INSERT INTO {delivery_point_inventory} AS inventory (
+        delivery_point_id, sku_count, units, out_of_stock, stock_value, updated_at
+    )
+    SELECT
+        delivery_point.id,
+        coalesce(totals.sku_count, 0),
+        coalesce(totals.units, 0),
+        coalesce(totals.out_of_stock, 0),
+        coalesce(totals.stock_value, 0),
+        now()
+    FROM {delivery_point} AS delivery_point
+    LEFT JOIN delivery_point_totals AS totals ON totals.id = delivery_point.id
+    ON CONFLICT (delivery_point_id) DO UPDATE SET
+        sku_count = excluded.sku_count,
+        units = excluded.units,
+        out_of_stock = excluded.out_of_stock,
+        stock_value = excluded.stock_value,
+        updated_at = excluded.updated_at
+    WHERE (inventory.sku_count, inventory.units, inventory.out_of_stock,
+        inventory.stock_value) IS DISTINCT FROM (excluded.sku_count,
+        excluded.units, excluded.out_of_stock, excluded.stock_value)
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM warehouses) + (SELECT count(*) FROM delivery_points)
+"""
+
+
+def tables():
+    return {
+        "delta": InventoryDelta._meta.db_table,
+        "warehouse_inventory": WarehouseInventory._meta.db_table,
+        "delivery_point_inventory": DeliveryPointInventory._meta.db_table,
+        "product": Product._meta.db_table,
+        "warehouse": Warehouse._meta.db_table,
+        "delivery_point": DeliveryPoint._meta.db_table,
+    }
+
+
+def fold_deltas(limit):
+    """Add up to ``limit`` pending deltas to the summaries. Returns how many."""
+    with connection.cursor() as cursor:
+        cursor.execute(FOLD_DELTAS_SQL.format(**tables()), {"limit": limit})
+        return cursor.fetchone()[0]
+
+
+def recompute():
+    """
+    Rebuild every summary from the products and drop the pending deltas.
+    Returns the number of summary rows that had drifted or were missing.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(RECOMPUTE_SQL.format(**tables()))
+        return cursor.fetchone()[0]
@@ -0,0 +1,39 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from warehouse.rollups import backfill_sales_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the supplier sales rollups of orders created in a date range"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--start",
+            type=datetime.date.fromisoformat,
+            required=True,
+            help="First day to rebuild, YYYY-MM-DD",
+        )
+        parser.add_argument(
+            "--stop",
+            type=datetime.date.fromisoformat,
+            help="Day after the last one to rebuild, today by default",
+        )
+        parser.add_argument(
+            "--days", type=int, default=1, help="Days rebuilt per transaction"
+        )
+
+    def handle(self, *args, **options):
+        stop = options["stop"] or timezone.now().date() + datetime.timedelta(days=1)
+        touched = backfill_sales_rollups(
+            self.midnight(options["start"]),
+            self.midnight(stop),
+            step=datetime.timedelta(days=options["days"]),
+        )
+        self.stdout.write(f"touched={touched}")
+
+    @staticmethod
+    def midnight(day):
+        return datetime.datetime.combine(day, datetime.time(), datetime.timezone.utc)
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from warehouse.models import OrderingGoods
+
+
+class Command(BaseCommand):
+    help = "Cancel matching orders in bulk and return their stock"
+
+    filters = {
+        "delivery_point": "delivery_point_id",
+        "warehouse": "delivery_point__delivery_warehouse_id",
+        "product": "product_id",
+        "user": "user_id",
+    }
+
+    def add_arguments(self, parser):
+        for name in self.filters:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int)
+
+    def handle(self, *args, **options):
+        filters = {
+            lookup: options[name]
+            for name, lookup in self.filters.items()
+            if options[name] is not None
+        }
+        if not filters:
+            raise CommandError("pass at least one filter")
+        started = time.monotonic()
+        cancelled, restored = OrderingGoods.objects.cancel_orders(
+            OrderingGoods.objects.filter(**filters)
+        )
+        self.stdout.write(
+            f"cancelled={cancelled} products={restored} "
+            f"elapsed={time.monotonic() - started:.2f}s"
+        )
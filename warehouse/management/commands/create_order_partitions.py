@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from warehouse.partitions import create_partitions
+
+
+class Command(BaseCommand):
+    help = "Create the monthly order partitions for the coming months"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months", type=int, default=3, help="Months ahead of the current one"
+        )
+
+    def handle(self, *args, **options):
+        created = create_partitions(options["months"])
+        self.stdout.write(f"created={len(created)} {' '.join(created)}".rstrip())
@@ -0,0 +1,138 @@
+from django.db import connection, models, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from marketplace.choices import SupplyStatus
+from product.cache import invalidate_product_detail
+from product.models import Product
+from warehouse import queue
+
+STATUS_TRANSITIONS = {
+    SupplyStatus.ASSEMBLY_STAGE: {SupplyStatus.EN_ROUTE, SupplyStatus.CANCELED},
+    SupplyStatus.EN_ROUTE: {SupplyStatus.DELIVERED},
+    SupplyStatus.DELIVERED: set(),
+    SupplyStatus.CANCELED: set(),
+}
+
+ARCHIVED_STATUSES = (SupplyStatus.DELIVERED, SupplyStatus.CANCELED)
+
+ARCHIVE_ORDERS_SQL = """
+WITH moved AS (
+    DELETE FROM {orders}
+    WHERE (id, created_at) IN (
+        SELECT id, created_at FROM {orders}
+        WHERE status IN %(statuses)s AND created_at < %(before)s
+        ORDER BY created_at
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, created_at, updated_at, user_id, delivery_point_id, product_id,
+        quantity, status
+)
+INSERT INTO {archive} (
+    id, created_at, updated_at, user_id, delivery_point_id, product_id, quantity,
+    status, archived_at
+)
+SELECT *, now() FROM moved
+"""
+
+
+class TransitionResult(models.TextChoices):
+    UPDATED = "updated"
+    NOT_FOUND = "not_found"
+    INVALID_TRANSITION = "invalid_transition"
+
+
+class OrderingGoodsManager(models.Manager):
+    def transition_status(self, ids, status):
+        """
+        Move the orders ``ids`` to ``status`` where STATUS_TRANSITIONS allows
+        it, with one UPDATE. Cancelled orders return their stock. Returns a
+        TransitionResult per id.
+        """
+        with transaction.atomic():
+            current = dict(
+                self.select_for_update()
+                .filter(id__in=ids)
+                .order_by("id")
+                .values_list("id", "status")
+            )
+            results, allowed = {}, []
+            for order_id in ids:
+                if order_id not in current:
+                    results[order_id] = TransitionResult.NOT_FOUND
+                elif status in STATUS_TRANSITIONS.get(current[order_id], ()):
+                    results[order_id] = TransitionResult.UPDATED
+                    allowed.append(order_id)
+                else:
+                    results[order_id] = TransitionResult.INVALID_TRANSITION
+            self.filter(id__in=allowed).update(status=status, updated_at=timezone.now())
+            if status == SupplyStatus.CANCELED:
+                self.restore_stock(self.filter(id__in=allowed))
+            queue.sync_orders(allowed)
+        return results
+
+    def cancel_orders(self, orders):
+        """
+        Cancel every order in the ``orders`` queryset that may still be
+        cancelled and give its stock back, in one transaction. Returns the
+        number of cancelled orders and of products restocked.
+        """
+        cancellable = [
+            status
+            for status, targets in STATUS_TRANSITIONS.items()
+            if SupplyStatus.CANCELED in targets
+        ]
+        with transaction.atomic():
+            ids = list(
+                orders.filter(status__in=cancellable)
+                .select_for_update()
+                .order_by("id")
+                .values_list("id", flat=True)
+            )
+            orders = self.filter(id__in=ids)
+            restored = self.restore_stock(orders)
+            cancelled = orders.update(
+                status=SupplyStatus.CANCELED, updated_at=timezone.now()
+            )
+            queue.sync_orders(ids)
+        return cancelled, restored
+
+    def archive_chunk(self, before, limit, lock_timeout="1s"):
+        """
+        Move up to ``limit`` completed orders created before ``before`` to
+        the archive table in one short transaction. Rows locked by others are
+        skipped and lock waits give up after ``lock_timeout``. Returns the
+        number of orders moved.
+        """
+        archive = self.model._meta.apps.get_model("warehouse", "OrderingGoodsArchive")
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = %s", [lock_timeout])
+            cursor.execute(
+                ARCHIVE_ORDERS_SQL.format(
+                    orders=self.model._meta.db_table, archive=archive._meta.db_table
+                ),
+                {
+                    "statuses": tuple(ARCHIVED_STATUSES),
+                    "before": before,
+                    "limit": limit,
+                },
+            )
+            return cursor.rowcount
+
+    def restore_stock(self, orders):
+        """
+        Give the quantities of ``orders`` back to their products, summed per
+        product with one GROUP BY. Returns the number of products touched.
+        """
+        quantities = (
+            orders.order_by("product_id")
+            .values_list("product_id", "product__stock_slots")
+            .annotate(quantity=Sum("quantity"))
+        )
+        restored = 0
+        for article, slots, quantity in quantities:
+            Product.objects.release_stock(article, quantity, slots=slots)
+            invalidate_product_detail(article)
+            restored += 1
+        return restored
@@ -0,0 +1,156 @@
+# Generated by Django 4.2.6 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+FILL_CREATED_AT_SQL = """
+UPDATE warehouse_orderinggoods
+SET created_at = coalesce(updated_at, now())
+WHERE created_at IS NULL;
+"""
+
+# Copy the orders into a table range-partitioned by month. Postgres needs the
+# partition key in the primary key, and ids come from a plain sequence.
+PARTITION_SQL = """
+CREATE TABLE warehouse_orderinggoods_partitioned (
+    id bigint NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    updated_at timestamp with time zone NULL,
+    quantity integer NOT NULL,
+    status varchar(32) NOT NULL,
+    delivery_point_id bigint NULL,
+    product_id integer NOT NULL,
+    user_id integer NULL,
+    CONSTRAINT warehouse_orderinggoods_partitioned_pkey PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE warehouse_orderinggoods_default
+    PARTITION OF warehouse_orderinggoods_partitioned DEFAULT;
+
+DO $$
+DECLARE
+    month timestamp with time zone;
+BEGIN
+    FOR month IN
+        SELECT generate_series(
+            date_trunc('month', coalesce(min(created_at), now()), 'UTC'),
+            date_trunc('month', now(), 'UTC') + interval '3 months',
+            interval '1 month'
+        )
+        FROM warehouse_orderinggoods
+    LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF warehouse_orderinggoods_partitioned '
+            'FOR VALUES FROM (%L) TO (%L)',
+            'warehouse_orderinggoods_p' || to_char(month AT TIME ZONE 'UTC', 'YYYYMM'),
+            month,
+            month + interval '1 month'
+        );
+    END LOOP;
+END
+$$;
+
+INSERT INTO warehouse_orderinggoods_partitioned
+    (id, created_at, updated_at, quantity, status, delivery_point_id, product_id, user_id)
+SELECT id, created_at, updated_at, quantity, status, delivery_point_id, product_id, user_id
+FROM warehouse_orderinggoods;
+
+DROP TABLE warehouse_orderinggoods;
+ALTER TABLE warehouse_orderinggoods_partitioned RENAME TO warehouse_orderinggoods;
+ALTER TABLE warehouse_orderinggoods
+    RENAME CONSTRAINT warehouse_orderinggoods_partitioned_pkey
+    TO warehouse_orderinggoods_pkey;
+
+CREATE SEQUENCE warehouse_orderinggoods_id_seq OWNED BY warehouse_orderinggoods.id;
+SELECT setval('warehouse_orderinggoods_id_seq', coalesce(max(id), 0) + 1, false)
+FROM warehouse_orderinggoods;
+ALTER TABLE warehouse_orderinggoods
+    ALTER COLUMN id SET DEFAULT nextval('warehouse_orderinggoods_id_seq');
+
+ALTER TABLE warehouse_orderinggoods
+    ADD CONSTRAINT warehouse_orderinggo_delivery_point_id_51e38cbd_fk_warehouse
+    FOREIGN KEY (delivery_point_id) REFERENCES warehouse_deliverypoint (id)
+    DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE warehouse_orderinggoods
+    ADD CONSTRAINT warehouse_orderinggo_product_id_2aa86223_fk_product_p
+    FOREIGN KEY (product_id) REFERENCES product_product (article)
+    DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE warehouse_orderinggoods
+    ADD CONSTRAINT warehouse_orderinggoods_user_id_6044336c_fk_accounts_user_id
+    FOREIGN KEY (user_id) REFERENCES accounts_user (id)
+    DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX warehouse_orderinggoods_delivery_point_id_51e38cbd
+    ON warehouse_orderinggoods (delivery_point_id);
+CREATE INDEX warehouse_orderinggoods_product_id_2aa86223
+    ON warehouse_orderinggoods (product_id);
+CREATE INDEX warehouse_orderinggoods_user_id_6044336c
+    ON warehouse_orderinggoods (user_id);
+"""
+
+UNPARTITION_SQL = """
+CREATE TABLE warehouse_orderinggoods_plain (
+    LIKE warehouse_orderinggoods INCLUDING DEFAULTS
+);
+INSERT INTO warehouse_orderinggoods_plain SELECT * FROM warehouse_orderinggoods;
+ALTER SEQUENCE warehouse_orderinggoods_id_seq OWNED BY warehouse_orderinggoods_plain.id;
+DROP TABLE warehouse_orderinggoods;
+ALTER TABLE warehouse_orderinggoods_plain RENAME TO warehouse_orderinggoods;
+ALTER TABLE warehouse_orderinggoods ADD PRIMARY KEY (id);
+
+ALTER TABLE warehouse_orderinggoods
+    ADD CONSTRAINT warehouse_orderinggo_delivery_point_id_51e38cbd_fk_warehouse
+    FOREIGN KEY (delivery_point_id) REFERENCES warehouse_deliverypoint (id)
+    DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE warehouse_orderinggoods
+    ADD CONSTRAINT warehouse_orderinggo_product_id_2aa86223_fk_product_p
+    FOREIGN KEY (product_id) REFERENCES product_product (article)
+    DEFERRABLE INITIALLY DEFERRED;
+ALTER TABLE warehouse_orderinggoods
+    ADD CONSTRAINT warehouse_orderinggoods_user_id_6044336c_fk_accounts_user_id
+    FOREIGN KEY (user_id) REFERENCES accounts_user (id)
+    DEFERRABLE INITIALLY DEFERRED;
+CREATE INDEX warehouse_orderinggoods_delivery_point_id_51e38cbd
+    ON warehouse_orderinggoods (delivery_point_id);
+CREATE INDEX warehouse_orderinggoods_product_id_2aa86223
+    ON warehouse_orderinggoods (product_id);
+CREATE INDEX warehouse_orderinggoods_user_id_6044336c
+    ON warehouse_orderinggoods (user_id);
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('warehouse', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(FILL_CREATED_AT_SQL, migrations.RunSQL.noop),
+        migrations.AlterField(
+            model_name='orderinggoods',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True),
+        ),
+        migrations.RunSQL(PARTITION_SQL, UNPARTITION_SQL),
+        migrations.AddIndex(
+            model_name='orderinggoods',
+            index=models.Index(
+                fields=['user', 'status', 'created_at'],
+                name='og_user_status_created_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='orderinggoods',
+            index=models.Index(
+                fields=['delivery_point', 'status'], name='og_delivery_point_status_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='orderinggoods',
+            index=models.Index(
+                fields=['status', 'created_at'], name='og_status_created_idx'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='orderinggoods',
+            index=models.Index(fields=['created_at'], name='og_created_idx'),
+        ),
+    ]
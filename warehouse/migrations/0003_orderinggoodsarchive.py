@@ -0,0 +1,74 @@
+# Generated by Django 4.2.6 on 2026-10-18 19:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('product', '0008_product_stock_shards'),
+        ('warehouse', '0002_orderinggoods_partitioning'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderingGoodsArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('quantity', models.IntegerField()),
+                (
+                    'status',
+                    models.CharField(
+                        choices=[
+                            ('assembly_stage', 'Assembly Stage'),
+                            ('en_route', 'En Route'),
+                            ('delivered', 'Delivered'),
+                            ('сanceled', 'Canceled'),
+                        ],
+                        max_length=32,
+                    ),
+                ),
+                (
+                    'delivery_point',
+                    models.ForeignKey(
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        to='warehouse.deliverypoint',
+                    ),
+                ),
+                (
+                    'product',
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        to='product.product',
+                    ),
+                ),
+                (
+                    'user',
+                    models.ForeignKey(
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'ordering_goods_archive',
+                'verbose_name_plural': 'ordering_goods_archive',
+                'indexes': [
+                    models.Index(
+                        fields=['user', 'status', 'created_at'],
+                        name='oga_user_status_created_idx',
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,155 @@
+# Generated by Django 4.2.6 on 2026-10-18 19:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('accounts', '0003_alter_user_groups_alter_user_is_active'),
+        ('product', '0008_product_stock_shards'),
+        ('warehouse', '0003_orderinggoodsarchive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('position', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SupplierSalesDaily',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                (
+                    'revenue',
+                    models.DecimalField(decimal_places=8, default=0, max_digits=28),
+                ),
+                ('cancelled_orders', models.IntegerField(default=0)),
+                ('cancelled_units', models.IntegerField(default=0)),
+                ('bucket', models.DateField()),
+            ],
+            options={
+                'verbose_name': 'supplier_sales_daily',
+                'verbose_name_plural': 'supplier_sales_daily',
+            },
+        ),
+        migrations.CreateModel(
+            name='SupplierSalesHourly',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                (
+                    'revenue',
+                    models.DecimalField(decimal_places=8, default=0, max_digits=28),
+                ),
+                ('cancelled_orders', models.IntegerField(default=0)),
+                ('cancelled_units', models.IntegerField(default=0)),
+                ('bucket', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'supplier_sales_hourly',
+                'verbose_name_plural': 'supplier_sales_hourly',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='orderinggoods',
+            index=models.Index(fields=['updated_at'], name='og_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='suppliersaleshourly',
+            name='product',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to='product.product'
+            ),
+        ),
+        migrations.AddField(
+            model_name='suppliersaleshourly',
+            name='supplier',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to='accounts.supplier'
+            ),
+        ),
+        migrations.AddField(
+            model_name='suppliersaleshourly',
+            name='warehouse',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to='warehouse.warehouse'
+            ),
+        ),
+        migrations.AddField(
+            model_name='suppliersalesdaily',
+            name='product',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to='product.product'
+            ),
+        ),
+        migrations.AddField(
+            model_name='suppliersalesdaily',
+            name='supplier',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to='accounts.supplier'
+            ),
+        ),
+        migrations.AddField(
+            model_name='suppliersalesdaily',
+            name='warehouse',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, to='warehouse.warehouse'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='suppliersaleshourly',
+            index=models.Index(
+                fields=['supplier', 'bucket'], name='ssh_supplier_bucket_idx'
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='suppliersaleshourly',
+            constraint=models.UniqueConstraint(
+                fields=('bucket', 'product'), name='supplier_sales_hourly_unique'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='suppliersalesdaily',
+            index=models.Index(
+                fields=['supplier', 'bucket'], name='ssd_supplier_bucket_idx'
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='suppliersalesdaily',
+            constraint=models.UniqueConstraint(
+                fields=('bucket', 'product'), name='supplier_sales_daily_unique'
+            ),
+        ),
+    ]
@@ -0,0 +1,188 @@
+# Generated by Django 4.2.6 on 2026-10-18 19:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Stock changes append a delta row instead of updating the summary rows, so
+# concurrent orders don't serialize on them; a beat task folds the deltas.
+INVENTORY_TRIGGER_SQL = """
+CREATE FUNCTION product_inventory_delta() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+        AND NEW.warehouse_id = OLD.warehouse_id
+        AND NEW.delivery_point_id IS NOT DISTINCT FROM OLD.delivery_point_id
+    THEN
+        IF (NEW.amount, NEW.cost) IS NOT DISTINCT FROM (OLD.amount, OLD.cost) THEN
+            RETURN NULL;
+        END IF;
+        INSERT INTO warehouse_inventorydelta
+            (warehouse_id, delivery_point_id, sku_count, units, out_of_stock, stock_value)
+        VALUES (
+            NEW.warehouse_id,
+            NEW.delivery_point_id,
+            0,
+            NEW.amount - OLD.amount,
+            (NEW.amount = 0)::integer - (OLD.amount = 0)::integer,
+            NEW.cost * NEW.amount - OLD.cost * OLD.amount
+        );
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        INSERT INTO warehouse_inventorydelta
+            (warehouse_id, delivery_point_id, sku_count, units, out_of_stock, stock_value)
+        VALUES (
+            OLD.warehouse_id,
+            OLD.delivery_point_id,
+            -1,
+            -OLD.amount,
+            -(OLD.amount = 0)::integer,
+            -OLD.cost * OLD.amount
+        );
+    END IF;
+    IF TG_OP IN ('UPDATE', 'INSERT') THEN
+        INSERT INTO warehouse_inventorydelta
+            (warehouse_id, delivery_point_id, sku_count, units, out_of_stock, stock_value)
+        VALUES (
+            NEW.warehouse_id,
+            NEW.delivery_point_id,
+            1,
+            NEW.amount,
+            (NEW.amount = 0)::integer,
+            NEW.cost * NEW.amount
+        );
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER product_inventory_delta_trigger
+    AFTER INSERT OR DELETE OR UPDATE OF amount, cost, warehouse_id, delivery_point_id
+    ON product_product
+    FOR EACH ROW EXECUTE FUNCTION product_inventory_delta();
+
+INSERT INTO warehouse_warehouseinventory
+    (warehouse_id, sku_count, units, out_of_stock, stock_value, updated_at)
+SELECT
+    warehouse_id,
+    count(*),
+    sum(amount),
+    count(*) FILTER (WHERE amount = 0),
+    sum(cost * amount),
+    now()
+FROM product_product
+GROUP BY warehouse_id;
+
+INSERT INTO warehouse_deliverypointinventory
+    (delivery_point_id, sku_count, units, out_of_stock, stock_value, updated_at)
+SELECT
+    delivery_point_id,
+    count(*),
+    sum(amount),
+    count(*) FILTER (WHERE amount = 0),
+    sum(cost * amount),
+    now()
+FROM product_product
+WHERE delivery_point_id IS NOT NULL
+GROUP BY delivery_point_id;
+"""
+
+DROP_INVENTORY_TRIGGER_SQL = """
+DROP TRIGGER product_inventory_delta_trigger ON product_product;
+DROP FUNCTION product_inventory_delta();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('product', '0008_product_stock_shards'),
+        ('warehouse', '0004_supplier_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryPointInventory',
+            fields=[
+                ('sku_count', models.IntegerField(default=0)),
+                ('units', models.BigIntegerField(default=0)),
+                ('out_of_stock', models.IntegerField(default=0)),
+                (
+                    'stock_value',
+                    models.DecimalField(decimal_places=8, default=0, max_digits=28),
+                ),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'delivery_point',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to='warehouse.deliverypoint',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'delivery_point_inventory',
+                'verbose_name_plural': 'delivery_point_inventory',
+            },
+        ),
+        migrations.CreateModel(
+            name='WarehouseInventory',
+            fields=[
+                ('sku_count', models.IntegerField(default=0)),
+                ('units', models.BigIntegerField(default=0)),
+                ('out_of_stock', models.IntegerField(default=0)),
+                (
+                    'stock_value',
+                    models.DecimalField(decimal_places=8, default=0, max_digits=28),
+                ),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                (
+                    'warehouse',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        serialize=False,
+                        to='warehouse.warehouse',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'warehouse_inventory',
+                'verbose_name_plural': 'warehouse_inventory',
+            },
+        ),
+        migrations.CreateModel(
+            name='InventoryDelta',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('sku_count', models.IntegerField(default=0)),
+                ('units', models.BigIntegerField(default=0)),
+                ('out_of_stock', models.IntegerField(default=0)),
+                (
+                    'stock_value',
+                    models.DecimalField(decimal_places=8, default=0, max_digits=28),
+                ),
+                (
+                    'delivery_point',
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        to='warehouse.deliverypoint',
+                    ),
+                ),
+                (
+                    'warehouse',
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        to='warehouse.warehouse',
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunSQL(INVENTORY_TRIGGER_SQL, DROP_INVENTORY_TRIGGER_SQL),
+    ]
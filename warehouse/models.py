@@ -4,6 +4,7 @@ from django_countries.fields import CountryField
 
 from marketplace.choices import StorageStatus, SupplyStatus
 from marketplace.models import CreatedUpdatedModel
+from warehouse.managers import OrderingGoodsManager
 
 
 class Warehouse(CreatedUpdatedModel):
@@ -52,6 +53,9 @@ class DeliveryPoint(CreatedUpdatedModel):
 
 
 class OrderingGoods(CreatedUpdatedModel):
+    # The table is range-partitioned by month on created_at, see
+    # migration 0002 and the create_order_partitions command.
+    created_at = models.DateTimeField(auto_now_add=True)
     user = models.ForeignKey("accounts.User", on_delete=models.PROTECT, null=True)
     delivery_point = models.ForeignKey(
         "warehouse.DeliveryPoint", on_delete=models.PROTECT, null=True
@@ -62,8 +66,174 @@ class OrderingGoods(CreatedUpdatedModel):
         choices=SupplyStatus.choices, default=SupplyStatus.ASSEMBLY_STAGE, max_length=32
     )
 
+    objects = OrderingGoodsManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "status", "created_at"],
+                name="og_user_status_created_idx",
+            ),
+            models.Index(
+                fields=["delivery_point", "status"], name="og_delivery_point_status_idx"
+            ),
+            models.Index(fields=["status", "created_at"], name="og_status_created_idx"),
+            models.Index(fields=["created_at"], name="og_created_idx"),
+            models.Index(fields=["updated_at"], name="og_updated_idx"),
+        ]
+
     def cancel(self):
         self.status = SupplyStatus.CANCELED
-        self.product.amount += self.quantity
-        self.product.save()
-        self.save(update_fields=["status"])
+        OrderingGoods.objects.restore_stock(OrderingGoods.objects.filter(pk=self.pk))
+        self.save(update_fields=["status", "updated_at"])
+
+
+class OrderingGoodsArchive(models.Model):
+    """Completed orders moved out of the live table by the archive task."""
+
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(
+        "accounts.User", on_delete=models.DO_NOTHING, null=True, db_constraint=False
+    )
+    delivery_point = models.ForeignKey(
+        "warehouse.DeliveryPoint",
+        on_delete=models.DO_NOTHING,
+        null=True,
+        db_constraint=False,
+    )
+    product = models.ForeignKey(
+        "product.Product", on_delete=models.DO_NOTHING, db_constraint=False
+    )
+    quantity = models.IntegerField()
+    status = models.CharField(choices=SupplyStatus.choices, max_length=32)
+
+    class Meta:
+        verbose_name = "ordering_goods_archive"
+        verbose_name_plural = "ordering_goods_archive"
+        indexes = [
+            models.Index(
+                fields=["user", "status", "created_at"],
+                name="oga_user_status_created_idx",
+            ),
+        ]
+
+
+class SupplierSales(models.Model):
+    """Order totals of one product over a period, filled by warehouse.rollups."""
+
+    supplier = models.ForeignKey("accounts.Supplier", on_delete=models.CASCADE)
+    product = models.ForeignKey("product.Product", on_delete=models.CASCADE)
+    warehouse = models.ForeignKey("warehouse.Warehouse", on_delete=models.CASCADE)
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    # Priced at the current Product.cost; orders don't keep their own price.
+    revenue = models.DecimalField(decimal_places=8, max_digits=28, default=0)
+    cancelled_orders = models.IntegerField(default=0)
+    cancelled_units = models.IntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class SupplierSalesHourly(SupplierSales):
+    bucket = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "supplier_sales_hourly"
+        verbose_name_plural = "supplier_sales_hourly"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bucket", "product"], name="supplier_sales_hourly_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["supplier", "bucket"], name="ssh_supplier_bucket_idx"),
+        ]
+
+
+class SupplierSalesDaily(SupplierSales):
+    bucket = models.DateField()
+
+    class Meta:
+        verbose_name = "supplier_sales_daily"
+        verbose_name_plural = "supplier_sales_daily"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bucket", "product"], name="supplier_sales_daily_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["supplier", "bucket"], name="ssd_supplier_bucket_idx"),
+        ]
+
+
+class RollupWatermark(models.Model):
+    """Last ``updated_at`` of the orders a rollup job has already folded in."""
+
+    name = models.CharField(max_length=64, unique=True)
+    position = models.DateTimeField()
+
+
+class Inventory(models.Model):
+    """Stock totals of the products in one place, kept by warehouse.inventory."""
+
+    sku_count = models.IntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    # Products with no units left.
+    out_of_stock = models.IntegerField(default=0)
+    stock_value = models.DecimalField(decimal_places=8, max_digits=28, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class WarehouseInventory(Inventory):
+    warehouse = models.OneToOneField(
+        "warehouse.Warehouse", on_delete=models.CASCADE, primary_key=True
+    )
+
+    class Meta:
+        verbose_name = "warehouse_inventory"
+        verbose_name_plural = "warehouse_inventory"
+
+
+class DeliveryPointInventory(Inventory):
+    delivery_point = models.OneToOneField(
+        "warehouse.DeliveryPoint", on_delete=models.CASCADE, primary_key=True
+    )
+
+    class Meta:
+        verbose_name = "delivery_point_inventory"
+        verbose_name_plural = "delivery_point_inventory"
+
+
+class InventoryDelta(models.Model):
+    """
+    Change of the inventory totals written by the product_inventory_delta
+    trigger and folded into the summaries by a beat task, so stock updates
+    don't all queue up on one summary row.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    warehouse = models.ForeignKey(
+        "warehouse.Warehouse",
+        on_delete=models.DO_NOTHING,
+        null=True,
+        db_constraint=False,
+        db_index=False,
+    )
+    delivery_point = models.ForeignKey(
+        "warehouse.DeliveryPoint",
+        on_delete=models.DO_NOTHING,
+        null=True,
+        db_constraint=False,
+        db_index=False,
+    )
+    sku_count = models.IntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    out_of_stock = models.IntegerField(default=0)
+    stock_value = models.DecimalField(decimal_places=8, max_digits=28, default=0)
@@ -0,0 +1,95 @@
+import datetime
+import logging
+
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TABLE = "warehouse_orderinggoods"
+DEFAULT_PARTITION = TABLE + "_default"
+PARTITION_NAME = TABLE + "_p{month:%Y%m}"
+PARTITIONS_SQL = """
+SELECT partition.relname
+FROM pg_inherits
+JOIN pg_class AS partition ON partition.oid = pg_inherits.inhrelid
+WHERE pg_inherits.inhparent = %s::regclass
+"""
+CREATE_PARTITION_SQL = """
+CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {table}
+FOR VALUES FROM (%(start)s) TO (%(stop)s)
+"""
+DEFAULT_ROWS_SQL = """
+SELECT EXISTS (
+    SELECT 1 FROM {default} WHERE created_at >= %(start)s AND created_at < %(stop)s
+)
+"""
+# Rows of the month that landed in the default partition (e.g. after a missed
+# run) would make CREATE ... PARTITION OF fail, so the partition is built as a
+# plain table, filled from the default one and attached once they are gone.
+MOVE_DEFAULT_ROWS_SQL = (
+    "CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+    """
+    INSERT INTO {partition}
+    SELECT * FROM {default} WHERE created_at >= %(start)s AND created_at < %(stop)s
+    """,
+    "DELETE FROM {default} WHERE created_at >= %(start)s AND created_at < %(stop)s",
+    """
+    ALTER TABLE {table} ATTACH PARTITION {partition}
+    FOR VALUES FROM (%(start)s) TO (%(stop)s)
+    """,
+)
+
+
+def month_start(value):
+    value = value.astimezone(datetime.timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value):
+    return (value + datetime.timedelta(days=32)).replace(day=1)
+
+
+def create_partitions(months, start=None):
+    """
+    Make sure monthly partitions of the order table exist from the month of
+    ``start`` (now by default) for ``months`` months ahead. Returns the names
+    of the partitions created.
+
+    A month whose partition can't be created is logged and skipped, so one
+    bad month doesn't fail every later run.
+    """
+    month = month_start(start or timezone.now())
+    created = []
+    with connection.cursor() as cursor:
+        cursor.execute(PARTITIONS_SQL, [TABLE])
+        existing = {row[0] for row in cursor.fetchall()}
+    for _ in range(months + 1):
+        stop = next_month(month)
+        partition = PARTITION_NAME.format(month=month)
+        if partition not in existing:
+            try:
+                with transaction.atomic():
+                    create_partition(partition, month, stop)
+                created.append(partition)
+            except DatabaseError:
+                logger.exception("Could not create order partition %s", partition)
+        month = stop
+    return created
+
+
+def create_partition(partition, start, stop):
+    names = {
+        "partition": connection.ops.quote_name(partition),
+        "table": TABLE,
+        "default": DEFAULT_PARTITION,
+    }
+    params = {"start": start, "stop": stop}
+    with connection.cursor() as cursor:
+        cursor.execute(DEFAULT_ROWS_SQL.format(**names), params)
+        if not cursor.fetchone()[0]:
+            cursor.execute(CREATE_PARTITION_SQL.format(**names), params)
+            return
+        for sql in MOVE_DEFAULT_ROWS_SQL:
+            cursor.execute(sql.format(**names), params)
+        logger.warning("Moved default partition rows into %s", partition)
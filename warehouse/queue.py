@@ -0,0 +1,202 @@
+"""
+Open orders per delivery point, kept in Redis for the pickup terminals.
+
+Every change to an order gets the next value of a global sequence and is
+stored as ``order_queue:{point}`` ZSET member (scored by that sequence) plus
+its JSON in the ``order_queue:{point}:orders`` hash. Terminals poll with the
+last sequence they saw and get only the orders changed since. Delivered and
+cancelled orders stay as tombstones, indexed by age in
+``order_queue:{point}:closed``, until pruned; a terminal whose watermark is
+older than the pruned ``floor`` gets a fresh snapshot instead. Every point
+pushed to is listed in ``order_queue:points`` for the pruning task.
+"""
+import json
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from marketplace import settings
+from marketplace.choices import SupplyStatus
+from marketplace.redis import client
+
+SEQUENCE_KEY = "order_queue:seq"
+QUEUE_KEY = "order_queue:{point}"
+ORDERS_KEY = "order_queue:{point}:orders"
+FLOOR_KEY = "order_queue:{point}:floor"
+CLOSED_KEY = "order_queue:{point}:closed"
+POINTS_KEY = "order_queue:points"
+PRUNE_BATCH_SIZE = 1000
+CLOSED_STATUSES = (SupplyStatus.DELIVERED, SupplyStatus.CANCELED)
+FIELDS = (
+    "id",
+    "delivery_point",
+    "product",
+    "quantity",
+    "status",
+    "created_at",
+    "updated_at",
+)
+
+PUSH_SCRIPT = client.register_script(
+    """
+    local current = redis.call('HGET', KEYS[3], ARGV[1])
+    if current and cjson.decode(current)['version'] > tonumber(ARGV[3]) then
+        return 0
+    end
+    local sequence = redis.call('INCR', KEYS[1])
+    redis.call('ZADD', KEYS[2], sequence, ARGV[1])
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+    if ARGV[4] == '1' then
+        redis.call('ZADD', KEYS[4], ARGV[3], ARGV[1])
+    else
+        redis.call('ZREM', KEYS[4], ARGV[1])
+    end
+    redis.call('SADD', KEYS[5], ARGV[5])
+    return sequence
+    """
+)
+
+# Removes up to ARGV[2] tombstones older than ARGV[1] and returns how many.
+# The floor only moves on queues that were built; an unbuilt queue gets a
+# floor above every pruned entry when it is rebuilt.
+PRUNE_SCRIPT = client.register_script(
+    """
+    local orders = redis.call(
+        'ZRANGEBYSCORE', KEYS[4], '-inf', '(' .. ARGV[1], 'LIMIT', 0, ARGV[2]
+    )
+    local floor = tonumber(redis.call('GET', KEYS[3]) or '0')
+    for _, order in ipairs(orders) do
+        floor = math.max(floor, tonumber(redis.call('ZSCORE', KEYS[1], order) or '0'))
+        redis.call('ZREM', KEYS[1], order)
+        redis.call('ZREM', KEYS[4], order)
+        redis.call('HDEL', KEYS[2], order)
+    end
+    if #orders > 0 and redis.call('EXISTS', KEYS[3]) == 1 then
+        redis.call('SET', KEYS[3], floor)
+    end
+    if redis.call('ZCARD', KEYS[1]) == 0 then
+        redis.call('SREM', KEYS[5], ARGV[3])
+    end
+    return #orders
+    """
+)
+
+
+def queue_keys(point):
+    return (
+        QUEUE_KEY.format(point=point),
+        ORDERS_KEY.format(point=point),
+        FLOOR_KEY.format(point=point),
+    )
+
+
+def prune_keys(point):
+    return (*queue_keys(point), CLOSED_KEY.format(point=point), POINTS_KEY)
+
+
+def order_model():
+    return apps.get_model("warehouse", "OrderingGoods")
+
+
+def push_orders(ids):
+    """Publish the current state of the orders ``ids`` to their queues."""
+    orders = (
+        order_model()
+        .objects.filter(id__in=ids, delivery_point__isnull=False)
+        .values(*FIELDS)
+    )
+    for order in orders:
+        push(order)
+
+
+def push(order):
+    point = order["delivery_point"]
+    queue, orders, _ = queue_keys(point)
+    order["closed"] = order["status"] in CLOSED_STATUSES
+    # A late push of an older state must not overwrite a newer one.
+    order["version"] = order["updated_at"].timestamp() if order["updated_at"] else 0
+    PUSH_SCRIPT(
+        keys=[SEQUENCE_KEY, queue, orders, CLOSED_KEY.format(point=point), POINTS_KEY],
+        args=[
+            order["id"],
+            json.dumps(order, cls=DjangoJSONEncoder),
+            order["version"],
+            int(order["closed"]),
+            point,
+        ],
+    )
+
+
+def sync_orders(ids):
+    """Push the orders ``ids`` once the surrounding transaction commits."""
+    ids = list(ids)
+    if ids:
+        transaction.on_commit(lambda: push_orders(ids))
+
+
+def rebuild(point):
+    """Load the open orders of ``point`` from Postgres into an empty queue."""
+    sequence = int(client.get(SEQUENCE_KEY) or 0)
+    orders = (
+        order_model()
+        .objects.filter(delivery_point_id=point)
+        .exclude(status__in=CLOSED_STATUSES)
+    )
+    for order in orders.values(*FIELDS):
+        push(order)
+    # Any watermark from before the rebuild gets a snapshot.
+    client.set(FLOOR_KEY.format(point=point), sequence + 1, nx=True)
+
+
+def read(point, since=None):
+    """
+    Changes of the ``point`` queue after the ``since`` watermark, or a
+    snapshot of its open orders when ``since`` is missing or too old.
+    """
+    queue, orders, floor = queue_keys(point)
+    if not client.exists(floor):
+        rebuild(point)
+    pipeline = client.pipeline()
+    pipeline.get(SEQUENCE_KEY)
+    pipeline.get(floor)
+    pipeline.zrangebyscore(queue, f"({since or 0}", "+inf", withscores=True)
+    sequence, floor, changed = pipeline.execute()
+
+    # A watermark ahead of the sequence was issued before Redis lost its data.
+    reset = since is None or not int(floor) <= since <= int(sequence or 0)
+    if reset:
+        changed = client.zrange(queue, 0, -1, withscores=True)
+    entries = []
+    if changed:
+        ids = [order for order, _ in changed]
+        # Entries pruned after the ZSET read come back as None.
+        entries = [json.loads(e) for e in client.hmget(orders, ids) if e is not None]
+    if reset:
+        entries = [entry for entry in entries if not entry["closed"]]
+    watermark = int(sequence or 0) if reset else since
+    if changed:
+        watermark = max(watermark, int(changed[-1][1]))
+    return {"watermark": watermark, "reset": reset, "orders": entries}
+
+
+def prune(point):
+    """
+    Drop tombstones older than ``ORDER_QUEUE_TOMBSTONE_TTL`` seconds,
+    ``PRUNE_BATCH_SIZE`` at a time. Returns how many were dropped.
+    """
+    horizon = timezone.now().timestamp() - settings.ORDER_QUEUE_TOMBSTONE_TTL
+    pruned = 0
+    while True:
+        batch = PRUNE_SCRIPT(
+            keys=prune_keys(point), args=[horizon, PRUNE_BATCH_SIZE, point]
+        )
+        pruned += batch
+        if batch < PRUNE_BATCH_SIZE:
+            return pruned
+
+
+def tracked_points():
+    """Delivery points with a queue, whether or not a terminal reads it."""
+    return [int(point) for point in client.smembers(POINTS_KEY)]
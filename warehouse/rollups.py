@@ -0,0 +1,178 @@
+import datetime
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from marketplace import settings
+from marketplace.choices import SupplyStatus
+from product.models import Product
+from warehouse.models import (
+    OrderingGoods,
+    OrderingGoodsArchive,
+    RollupWatermark,
+    SupplierSalesDaily,
+    SupplierSalesHourly,
+)
+
+WATERMARK = "supplier_sales"
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+# ``{changed}`` selects the (hour, product_id) buckets to recompute; each one
+# is rebuilt from all of its live and archived orders.
+ROLLUP_HOURLY_SQL = """
+WITH changed AS ({changed}),
+orders AS (
+    SELECT changed.hour, source.product_id, source.quantity, source.status
+    FROM changed
+    JOIN {orders} AS source ON source.product_id = changed.product_id
+        AND source.created_at >= changed.hour
+        AND source.created_at < changed.hour + interval '1 hour'
+    UNION ALL
+    SELECT changed.hour, source.product_id, source.quantity, source.status
+    FROM changed
+    JOIN {archive} AS source ON source.product_id = changed.product_id
+        AND source.created_at >= changed.hour
+        AND source.created_at < changed.hour + interval '1 hour'
+)
+INSERT INTO {hourly} AS hourly (
+    bucket, product_id, supplier_id, warehouse_id, orders, units, revenue,
+    cancelled_orders, cancelled_units
+)
+SELECT
+    orders.hour,
+    product.article,
+    product.supplier_id,
+    product.warehouse_id,
+    count(*) FILTER (WHERE orders.status <> %(cancelled)s),
+    coalesce(sum(orders.quantity) FILTER (WHERE orders.status <> %(cancelled)s), 0),
+    coalesce(
+        sum(orders.quantity * product.cost) FILTER (WHERE orders.status <> %(cancelled)s),
+        0
+    ),
+    count(*) FILTER (WHERE orders.status = %(cancelled)s),
+    coalesce(sum(orders.quantity) FILTER (WHERE orders.status = %(cancelled)s), 0)
+FROM orders
+JOIN {product} AS product ON product.article = orders.product_id
+GROUP BY orders.hour, product.article
+ON CONFLICT (bucket, product_id) DO UPDATE SET
+    supplier_id = excluded.supplier_id,
+    warehouse_id = excluded.warehouse_id,
+    orders = excluded.orders,
+    units = excluded.units,
+    revenue = excluded.revenue,
+    cancelled_orders = excluded.cancelled_orders,
+    cancelled_units = excluded.cancelled_units
+RETURNING hourly.bucket::date, hourly.product_id
+"""
+
+CHANGED_SINCE_SQL = """
+SELECT DISTINCT date_trunc('hour', created_at) AS hour, product_id
+FROM {orders}
+WHERE updated_at > %(since)s
+"""
+
+CREATED_BETWEEN_SQL = """
+SELECT DISTINCT date_trunc('hour', created_at) AS hour, product_id
+FROM {orders}
+WHERE created_at >= %(start)s AND created_at < %(stop)s
+UNION
+SELECT DISTINCT date_trunc('hour', created_at) AS hour, product_id
+FROM {archive}
+WHERE created_at >= %(start)s AND created_at < %(stop)s
+"""
+
+ROLLUP_DAILY_SQL = """
+INSERT INTO {daily} AS daily (
+    bucket, product_id, supplier_id, warehouse_id, orders, units, revenue,
+    cancelled_orders, cancelled_units
+)
+SELECT
+    hourly.bucket::date,
+    hourly.product_id,
+    product.supplier_id,
+    product.warehouse_id,
+    sum(hourly.orders),
+    sum(hourly.units),
+    sum(hourly.revenue),
+    sum(hourly.cancelled_orders),
+    sum(hourly.cancelled_units)
+FROM unnest(%(days)s::date[], %(products)s::integer[]) AS changed (day, product_id)
+JOIN {hourly} AS hourly ON hourly.product_id = changed.product_id
+    AND hourly.bucket >= changed.day
+    AND hourly.bucket < changed.day + 1
+JOIN {product} AS product ON product.article = hourly.product_id
+GROUP BY hourly.bucket::date, hourly.product_id, product.supplier_id, product.warehouse_id
+ON CONFLICT (bucket, product_id) DO UPDATE SET
+    supplier_id = excluded.supplier_id,
+    warehouse_id = excluded.warehouse_id,
+    orders = excluded.orders,
+    units = excluded.units,
+    revenue = excluded.revenue,
+    cancelled_orders = excluded.cancelled_orders,
+    cancelled_units = excluded.cancelled_units
+"""
+
+
+def rollup(changed, params):
+    """
+    Recompute the hourly rows of the buckets selected by the ``changed``
+    query, then the daily rows of their days. Returns the number of
+    (day, product) pairs touched.
+    """
+    tables = {
+        "orders": OrderingGoods._meta.db_table,
+        "archive": OrderingGoodsArchive._meta.db_table,
+        "hourly": SupplierSalesHourly._meta.db_table,
+        "daily": SupplierSalesDaily._meta.db_table,
+        "product": Product._meta.db_table,
+    }
+    with connection.cursor() as cursor:
+        cursor.execute(
+            ROLLUP_HOURLY_SQL.format(changed=changed.format(**tables), **tables),
+            {"cancelled": SupplyStatus.CANCELED, **params},
+        )
+        days = set(cursor.fetchall())
+        if days:
+            cursor.execute(
+                ROLLUP_DAILY_SQL.format(**tables),
+                {
+                    "days": [day for day, _ in days],
+                    "products": [product for _, product in days],
+                },
+            )
+    return len(days)
+
+
+def refresh_sales_rollups():
+    """
+    Fold the orders changed since the watermark into the rollups.
+
+    The window reaches back ``SUPPLIER_SALES_ROLLUP_LAG`` seconds before the
+    watermark so rows committed late by long transactions are still seen;
+    recomputing a bucket twice is harmless. A missing watermark rolls up the
+    whole live table.
+    """
+    with transaction.atomic():
+        watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(
+            name=WATERMARK,
+            defaults={"position": EPOCH},
+        )
+        now = timezone.now()
+        since = watermark.position
+        if since > EPOCH:
+            since -= datetime.timedelta(seconds=settings.SUPPLIER_SALES_ROLLUP_LAG)
+        touched = rollup(CHANGED_SINCE_SQL, {"since": since})
+        watermark.position = now
+        watermark.save(update_fields=["position"])
+    return touched
+
+
+def backfill_sales_rollups(start, stop, step=datetime.timedelta(days=1)):
+    """Rebuild the rollups of orders created in [start, stop), a ``step`` at a time."""
+    touched = 0
+    while start < stop:
+        end = min(start + step, stop)
+        with transaction.atomic():
+            touched += rollup(CREATED_BETWEEN_SQL, {"start": start, "stop": end})
+        start = end
+    return touched
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from warehouse import queue
+from warehouse.models import OrderingGoods
+
+
+@receiver(post_save, sender=OrderingGoods)
+def sync_delivery_point_queue(sender, instance, **kwargs):
+    queue.sync_orders([instance.pk])
@@ -0,0 +1,136 @@
+import datetime
+import time
+from collections import Counter
+
+from django.db import transaction
+from django.utils import timezone
+
+from marketplace import settings
+from marketplace.celery_app import app
+from product import stock
+from product.cache import invalidate_product_detail
+from product.models import Product
+from product.tasks import reconcile_stock
+from warehouse import inventory, queue
+from warehouse.models import OrderingGoods
+from warehouse.partitions import create_partitions
+from warehouse.rollups import refresh_sales_rollups
+
+
+@app.task
+def create_order_partitions(months=3):
+    return create_partitions(months)
+
+
+@app.task
+def archive_orders():
+    """Move old completed orders to the archive, pausing between chunks."""
+    before = timezone.now() - datetime.timedelta(days=settings.ORDER_ARCHIVE_AGE_DAYS)
+    archived = 0
+    for _ in range(settings.ORDER_ARCHIVE_MAX_CHUNKS):
+        moved = OrderingGoods.objects.archive_chunk(
+            before, settings.ORDER_ARCHIVE_CHUNK_SIZE
+        )
+        archived += moved
+        if moved < settings.ORDER_ARCHIVE_CHUNK_SIZE:
+            break
+        time.sleep(settings.ORDER_ARCHIVE_PAUSE)
+    return archived
+
+
+@app.task
+def write_stock_holds(batch_size=None):
+    """Turn a batch of Redis stock holds into orders in one transaction."""
+    holds = {}
+    for hold in stock.pending_holds(batch_size or settings.STOCK_HOLD_BATCH_SIZE):
+        fields = stock.claim(hold)
+        if fields:
+            holds[hold] = fields
+    if not holds:
+        return 0
+
+    try:
+        written = write_orders(holds)
+    except Exception:
+        for hold, fields in holds.items():
+            stock.release(hold, fields)
+        raise
+
+    failed = set()
+    for hold, fields in holds.items():
+        if hold in written:
+            stock.finish(hold, fields, written[hold])
+        else:
+            stock.release(hold, fields)
+            failed.add(fields["article"])
+    for article in {fields["article"] for fields in holds.values()}:
+        invalidate_product_detail(article)
+    if failed:
+        # Redis let through more than Postgres had, so its counters drifted.
+        reconcile_stock(sorted(failed))
+    return len(written)
+
+
+@transaction.atomic
+def write_orders(holds):
+    """Create the orders of the holds that get stock; returns hold to order id."""
+    quantities = Counter()
+    for fields in holds.values():
+        quantities[fields["article"]] += fields["quantity"]
+    reserved = Product.objects.reserve_stock_lines(quantities)
+    written = {hold for hold, fields in holds.items() if fields["article"] in reserved}
+
+    # Articles that can't cover the whole batch are taken one hold at a time.
+    slots = dict(
+        Product.objects.filter(article__in=set(quantities) - set(reserved)).values_list(
+            "article", "stock_slots"
+        )
+    )
+    for hold, fields in holds.items():
+        if fields["article"] in slots:
+            amount = Product.objects.reserve_stock(
+                fields["article"], fields["quantity"], slots=slots[fields["article"]]
+            )
+            if amount is not None:
+                written.add(hold)
+
+    written = sorted(written)
+    orders = OrderingGoods.objects.bulk_create(
+        OrderingGoods(
+            user_id=holds[hold]["user"],
+            delivery_point_id=holds[hold]["delivery_point"],
+            product_id=holds[hold]["article"],
+            quantity=holds[hold]["quantity"],
+        )
+        for hold in written
+    )
+    queue.sync_orders(order.id for order in orders)
+    return {hold: order.id for hold, order in zip(written, orders)}
+
+
+@app.task
+def prune_order_queues():
+    """Drop old delivered and cancelled orders from the delivery point queues."""
+    for point in queue.tracked_points():
+        queue.prune(point)
+
+
+@app.task
+def rollup_supplier_sales():
+    return refresh_sales_rollups()
+
+
+@app.task
+def fold_inventory_deltas():
+    """Fold the pending stock deltas into the inventory summaries."""
+    folded = 0
+    while True:
+        batch = inventory.fold_deltas(settings.INVENTORY_FOLD_BATCH_SIZE)
+        folded += batch
+        if batch < settings.INVENTORY_FOLD_BATCH_SIZE:
+            return folded
+
+
+@app.task
+def recompute_inventory():
+    return inventory.recompute()